@@ -0,0 +1,81 @@
+# benchmarks/bench_align.py
+"""
+Alineación por ventanas (Transcriber.align_iter) frente a la ruta anterior,
+que pasaba el waveform completo a whisperx.align en cada lote, sobre audio
+sintético de 1, 5, 15 y 30 minutos con un segmento cada ~5 s.
+
+La ruta anterior crece con lotes × duración (cada lote vuelve a convertir y
+recorrer el archivo entero); la de ventanas sólo con la duración de cada lote.
+
+    python -m benchmarks.bench_align
+    python -m benchmarks.bench_align --minutes 1 10 60 --align-batch 32 --device cuda
+"""
+import argparse
+import copy
+import time
+
+import numpy as np
+import whisperx
+from whisperx.audio import SAMPLE_RATE
+
+from src.asr.align_cache import align_cache
+from src.asr.transcriber import Transcriber, batch
+
+SEGMENT_SECONDS = 5.0
+TEXT = " hola qué tal estás hoy"
+
+
+def synthetic(minutes: float, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    duration = minutes * 60
+    audio = (rng.standard_normal(int(duration * SAMPLE_RATE)) * 0.05).astype(np.float32)
+    segments = [
+        {"start": float(s), "end": float(round(s + SEGMENT_SECONDS - 0.5, 3)), "text": TEXT}
+        for s in np.arange(0.0, duration - SEGMENT_SECONDS, SEGMENT_SECONDS)
+    ]
+    return audio, {"segments": segments, "language": "es"}
+
+
+def full_waveform(transcriber, result, audio, device):
+    """Ruta anterior: cada lote se alinea contra el audio completo."""
+    chosen, model_dir = transcriber.align_model_choice()
+    model, meta = align_cache.get(result["language"], chosen, model_dir, device, transcriber.align_dtype)
+    for chunk in batch(result["segments"], transcriber.align_batch):
+        whisperx.align(chunk, model, meta, audio, device=device)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de alineación por ventanas")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 5, 15, 30])
+    parser.add_argument("--align-batch", type=int, default=32)
+    parser.add_argument("--align-model", default=None, help="Modelo wav2vec2 (por defecto, el de whisperx para es)")
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args(argv)
+
+    t = object.__new__(Transcriber)            # sin cargar Whisper: sólo se alinea
+    t.model_name, t.align_model_name, t.language = "small", args.align_model, "es"
+    t.align_batch, t.align_dtype, t.align_emission_s, t.allow_tf32 = args.align_batch, "float32", 0.0, False
+    chosen, model_dir = t.align_model_choice()
+    align_cache.get("es", chosen, model_dir, args.device, t.align_dtype)   # carga fuera del cronómetro
+
+    print(f"{'min':>5} {'segmentos':>9} {'lotes':>6} {'completo s':>11} {'ventanas s':>11} {'speedup':>8}")
+    for minutes in args.minutes:
+        audio, result = synthetic(minutes)
+        n = len(result["segments"])
+
+        t0 = time.perf_counter()
+        full_waveform(t, copy.deepcopy(result), audio, args.device)
+        t_full = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for _ in t.align_iter(copy.deepcopy(result), audio, args.device, False):
+            pass
+        t_win = time.perf_counter() - t0
+
+        print(f"{minutes:>5g} {n:>9} {-(-n // args.align_batch):>6} {t_full:>11.2f} {t_win:>11.2f} "
+              f"{t_full / max(t_win, 1e-12):>7.1f}×")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
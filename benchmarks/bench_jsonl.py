@@ -0,0 +1,95 @@
+# benchmarks/bench_jsonl.py
+"""
+Escritura JSONL (formatting/jsonl.py) frente a la ruta anterior (json.dumps
+por segmento y un write() de texto por línea), sobre transcripciones
+sintéticas de 1 y 10 horas (~2.5 palabras/s, 10 palabras por segmento).
+
+Mide el backend json estándar y, si está instalado, orjson; con y sin
+--jsonl-precision y con --compress gzip/zstd.
+
+    python -m benchmarks.bench_jsonl
+    python -m benchmarks.bench_jsonl --hours 1 10 --repeat 3
+"""
+import argparse
+import copy
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.formatting import jsonl
+from src.formatting.jsonl import write_jsonl
+
+WORDS_PER_SEGMENT = 10
+WORD_SECONDS = 0.4
+
+
+def synthetic(hours: float, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    seg_seconds = WORDS_PER_SEGMENT * WORD_SECONDS
+    segments = []
+    for s in np.arange(0, hours * 3600, seg_seconds):
+        w0 = s + np.arange(WORDS_PER_SEGMENT) * WORD_SECONDS + rng.uniform(0, 0.05, WORDS_PER_SEGMENT)
+        words = [{"word": "palabra", "start": float(a), "end": float(a + 0.3), "score": float(rng.uniform())}
+                 for a in w0]
+        segments.append({"start": words[0]["start"], "end": words[-1]["end"], "speaker": "SPEAKER_00",
+                         "text": " " + " ".join(w["word"] for w in words), "words": words})
+    return segments
+
+
+def baseline(segments, path: str) -> str:
+    """Ruta anterior a formatting/jsonl.py."""
+    with open(path, "w", encoding="utf-8") as f:
+        for seg in segments:
+            if seg["text"].strip():
+                f.write(json.dumps(seg, ensure_ascii=False) + "\n")
+    return path
+
+
+def timed(fn, segments, path: str, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        data = copy.deepcopy(segments)          # el redondeo es in situ
+        t0 = time.perf_counter()
+        out = fn(data, path)
+        best = min(best, time.perf_counter() - t0)
+    return best, os.path.getsize(out)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark de la escritura JSONL")
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    fast = jsonl.orjson
+    cases = [("anterior", None, lambda s, p: baseline(s, p))]
+    for backend in (("json", "orjson") if fast is not None else ("json",)):
+        for precision, compress in ((None, "none"), (3, "none"), (3, "gzip"), (3, "zstd")):
+            label = f"{backend} p={precision} {compress}"
+            cases.append((label, backend, lambda s, p, pr=precision, c=compress: write_jsonl(s, p, pr, c)))
+
+    print(f"{'horas':>5} {'segmentos':>9}  {'caso':<24} {'s':>7} {'MB':>7} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "out.jsonl")
+        for hours in args.hours:
+            segments = synthetic(hours)
+            t_ref = None
+            for label, backend, fn in cases:
+                jsonl.orjson = fast if backend == "orjson" else None
+                try:
+                    t, size = timed(fn, segments, path, args.repeat)
+                except ImportError as e:        # zstd sin zstandard
+                    print(f"{hours:>5g} {len(segments):>9}  {label:<24} {e}")
+                    continue
+                t_ref = t_ref or t
+                print(f"{hours:>5g} {len(segments):>9}  {label:<24} {t:>7.3f} {size / 2**20:>7.1f} "
+                      f"{t_ref / max(t, 1e-12):>7.1f}×")
+    jsonl.orjson = fast
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
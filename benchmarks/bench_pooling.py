@@ -0,0 +1,63 @@
+# benchmarks/bench_pooling.py
+"""
+StatsPool vectorizado (una bmm para todos los hablantes) frente al bucle por
+hablante anterior, por número de hablantes y de frames.
+
+    python -m benchmarks.bench_pooling
+    python -m benchmarks.bench_pooling --speakers 1 3 7 --frames 200 589 2000 --batch 32
+"""
+import argparse
+import time
+
+import torch
+
+from benchmarks.reference import reference_pool_forward
+from src.utils.monkeypatch_pooling import _patched_forward
+
+
+def _time(fn, repeat: int) -> float:
+    fn()                                    # calentamiento
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark de StatsPool ponderado")
+    parser.add_argument("--speakers", type=int, nargs="+", default=[1, 2, 3, 5, 7])
+    parser.add_argument("--frames", type=int, nargs="+", default=[200, 589, 2000])
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--features", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args(argv)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    print(f"{'hablantes':>9} {'frames':>7} {'bucle ms':>9} {'bmm ms':>8} {'speedup':>8} {'máx |Δ|':>9}")
+    with torch.inference_mode():
+        for frames in args.frames:
+            seq = torch.randn(args.batch, args.features, frames, device=args.device)
+            for speakers in args.speakers:
+                w = torch.rand(args.batch, speakers, frames, device=args.device)
+                sync = torch.cuda.synchronize if args.device == "cuda" else (lambda: None)
+
+                def ref():
+                    reference_pool_forward(None, seq, w)
+                    sync()
+
+                def new():
+                    _patched_forward(None, seq, w)
+                    sync()
+
+                t_ref, t_new = _time(ref, args.repeat), _time(new, args.repeat)
+                delta = (_patched_forward(None, seq, w) - reference_pool_forward(None, seq, w)).abs().max().item()
+                print(f"{speakers:>9} {frames:>7} {t_ref * 1000:>9.2f} {t_new * 1000:>8.2f} "
+                      f"{t_ref / max(t_new, 1e-12):>7.2f}× {delta:>9.1e}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+# benchmarks/bench_speaker_assign.py
+"""
+Asignación de hablantes vectorizada (SpeakerIndex) frente al bucle de
+whisperx.diarize.assign_word_speakers, sobre transcripciones sintéticas de
+1, 5 y 10 horas (~12 turnos/min, ~2.5 palabras/s, 10 palabras por segmento).
+
+El bucle es O(consultas · turnos): por encima de --reference-queries se mide
+sobre un prefijo de los segmentos y se extrapola linealmente (marcado con ~).
+
+    python -m benchmarks.bench_speaker_assign
+    python -m benchmarks.bench_speaker_assign --hours 1 5 10 --speakers 4 --reference-queries 5000
+"""
+import argparse
+import copy
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.reference import reference_assign_word_speakers
+from src.formatting.speaker_assign import assign_word_speakers
+
+TURNS_PER_HOUR = 720
+WORDS_PER_SEGMENT = 10
+WORD_SECONDS = 0.4
+
+
+def synthetic(hours: float, speakers: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    duration = hours * 3600
+    n_turns = int(hours * TURNS_PER_HOUR)
+    start = np.round(np.sort(rng.uniform(0, duration, n_turns)), 3)
+    end = np.round(start + rng.uniform(0.5, 10.0, n_turns), 3)
+    labels = [f"SPEAKER_{k:02d}" for k in rng.integers(0, speakers, n_turns)]
+    diarize_df = pd.DataFrame({"start": start, "end": end, "speaker": labels})
+
+    seg_seconds = WORDS_PER_SEGMENT * WORD_SECONDS
+    segments = []
+    for s in np.arange(0, duration, seg_seconds):
+        w0 = np.round(s + np.arange(WORDS_PER_SEGMENT) * WORD_SECONDS, 3)
+        words = [{"word": "x", "start": float(a), "end": float(round(a + 0.3, 3))} for a in w0]
+        segments.append({"start": float(s), "end": words[-1]["end"], "words": words})
+    return diarize_df, {"segments": segments}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark de la asignación de hablantes")
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--speakers", type=int, default=4)
+    parser.add_argument("--reference-queries", type=int, default=5000,
+                        help="Consultas máximas del bucle de referencia antes de extrapolar")
+    parser.add_argument("--whisperx", action="store_true",
+                        help="Usar whisperx.diarize.assign_word_speakers como referencia")
+    args = parser.parse_args(argv)
+
+    reference = reference_assign_word_speakers
+    if args.whisperx:
+        from whisperx.diarize import assign_word_speakers as reference
+
+    print(f"{'horas':>5} {'turnos':>7} {'consultas':>9} {'bucle s':>10} {'vector s':>9} {'speedup':>9}")
+    for hours in args.hours:
+        diarize_df, result = synthetic(hours, args.speakers)
+        segments = result["segments"]
+        queries = len(segments) * (WORDS_PER_SEGMENT + 1)
+
+        t0 = time.perf_counter()
+        assign_word_speakers(diarize_df, copy.deepcopy(result))
+        t_new = time.perf_counter() - t0
+
+        n_ref = min(len(segments), max(1, args.reference_queries // (WORDS_PER_SEGMENT + 1)))
+        sample = {"segments": copy.deepcopy(segments[:n_ref])}
+        t0 = time.perf_counter()
+        reference(diarize_df.copy(), sample)
+        t_ref = (time.perf_counter() - t0) * len(segments) / n_ref
+        mark = "~" if n_ref < len(segments) else " "
+
+        print(f"{hours:>5g} {len(diarize_df):>7} {queries:>9} {mark}{t_ref:>9.2f} {t_new:>9.3f} "
+              f"{t_ref / max(t_new, 1e-12):>8.0f}×")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+# benchmarks/reference.py
+"""
+Implementaciones de referencia (los bucles originales) frente a las que se
+comparan las versiones optimizadas: las usan tanto los benchmarks como los
+tests de equivalencia (tests/ importa este módulo desde la raíz del repo).
+"""
+import numpy as np
+import pandas as pd
+
+
+def reference_assign_word_speakers(diarize_df: pd.DataFrame, transcript_result: dict,
+                                   fill_nearest: bool = False) -> dict:
+    """
+    Bucle de whisperx.diarize.assign_word_speakers (un filtrado del DataFrame
+    por segmento/palabra), sin importar whisperx: referencia de
+    src/formatting/speaker_assign.py.
+    """
+    starts = diarize_df["start"].to_numpy(dtype=np.float64)
+    ends = diarize_df["end"].to_numpy(dtype=np.float64)
+
+    def _speaker(item):
+        inter = np.minimum(ends, item["end"]) - np.maximum(starts, item["start"])
+        df = diarize_df.assign(intersection=inter)
+        intersected = df[df["intersection"] > 0]
+        if len(intersected) > 0:
+            return intersected.groupby("speaker")["intersection"].sum().sort_values(ascending=False).index[0]
+        if fill_nearest:
+            return df.sort_values(by=["intersection"], ascending=False)["speaker"].values[0]
+        return None
+
+    for seg in transcript_result["segments"]:
+        spk = _speaker(seg)
+        if spk is not None:
+            seg["speaker"] = spk
+        for word in seg.get("words", ()):
+            if "start" in word:
+                spk = _speaker(word)
+                if spk is not None:
+                    word["speaker"] = spk
+    return transcript_result
+
+
+def reference_pool_forward(self, sequences, weights=None):
+    """
+    StatsPool.forward anterior, un _pool por hablante: referencia de
+    src/utils/monkeypatch_pooling.py. torch y pyannote se importan aquí, no
+    arriba: la otra referencia no los necesita.
+    """
+    import torch
+    import torch.nn.functional as F
+    from src.utils.monkeypatch_pooling import _patched_forward
+
+    if weights is None:
+        return _patched_forward(self, sequences)
+
+    if weights.dim() == 2:
+        has_speaker_dimension = False
+        weights = weights.unsqueeze(dim=1)
+    else:
+        has_speaker_dimension = True
+
+    _, _, num_frames = sequences.size()
+    _, num_speakers, num_weights = weights.size()
+    if num_frames != num_weights:
+        weights = F.interpolate(weights, size=num_frames, mode="nearest")
+
+    def _pool(seq, w):
+        w = w / (w.sum(dim=-1, keepdim=True) + 1e-8)
+        mean = (seq * w.unsqueeze(1)).sum(dim=-1)
+        if seq.size(-1) > 1:
+            std = (((seq - mean.unsqueeze(-1)) ** 2) * w.unsqueeze(1)).sum(dim=-1).sqrt()
+        else:
+            std = torch.zeros_like(mean)
+        return torch.cat([mean, std], dim=-1)
+
+    output = torch.stack(
+        [_pool(sequences, weights[:, speaker, :]) for speaker in range(num_speakers)],
+        dim=1,
+    )
+
+    if not has_speaker_dimension:
+        return output.squeeze(dim=1)
+
+    return output
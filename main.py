@@ -25,7 +25,6 @@ for handler in logger.handlers:
 
 import types, sys, os
 sys.path.insert(0, os.path.abspath("./src"))
-import torch
 
 # --- silencia warning molesto ------------------------------------
 def _quiet_check(*a, **k):
@@ -37,11 +36,38 @@ sys.modules["pyannote.audio.utils.version"] = mod
 
 import contextlib
 import argparse
-from pipelines.full_pipeline import run_pipeline
-from utils.hooks import ForcedProgressHook
-import utils.monkeypatch_pooling
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+from src.utils.events import events
 
-def main():
+if TYPE_CHECKING:
+    from src.utils.telemetry import PrometheusSink
+
+# torch, whisperx, pyannote y pandas se importan dentro de main(), después de
+# argparse, y cada etapa importa sólo lo suyo: `-h` o un argumento erróneo no
+# cargan ningún modelo y --no-diarize no toca la pila de diarización (ni el
+# parche de StatsPool, que aplica diarization/pipeline_loader.py).
+# `python -m src.utils.importtime` mide el arranque frente a un presupuesto.
+
+
+def default_device() -> str:
+    """'cuda' si está disponible; se resuelve al ejecutar, no al construir el parser."""
+    import torch
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def set_torch_threads(n: int) -> None:
+    import torch
+
+    torch.set_num_threads(n)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Construye el parser de la CLI. El servidor lo reutiliza para que los
+    trabajos acepten exactamente las mismas opciones.
+    """
     parser = argparse.ArgumentParser(
         description="Pipeline de transcripción y diarización",
         epilog=(
@@ -56,13 +82,57 @@ def main():
     io_group = parser.add_argument_group("Opciones de I/O")
     io_group.add_argument(
         "audio",
-        help="Archivo WAV de entrada"
+        nargs="*",
+        help="Archivo(s) de audio de entrada; admite globs y directorios (modo lote). No se usa con --serve"
+    )
+    io_group.add_argument(
+        "--manifest",
+        default=None,
+        help="Archivo de texto con una ruta de audio por línea (modo lote)"
+    )
+    io_group.add_argument(
+        "--output-dir",
+        default=None,
+        help="Directorio de salida en modo lote (<nombre>.jsonl); por defecto, junto a cada audio"
     )
     io_group.add_argument(
         "-o", "--output",
         default="transcripcion_diarizada.jsonl",
         help="Ruta de salida JSONL"
     )
+    io_group.add_argument(
+        "--output-format",
+        choices=["jsonl", "parquet", "arrow"],
+        default="jsonl",
+        help="Formato de salida: JSONL, o tablas planas <base>.segments/.words en Parquet o Arrow IPC (requiere pyarrow)"
+    )
+    io_group.add_argument(
+        "--jsonl-precision",
+        type=int,
+        default=None,
+        help="Decimales de start/end/score en el JSONL (por defecto, sin redondeo adicional)"
+    )
+    io_group.add_argument(
+        "--compress",
+        choices=["none", "gzip", "zstd"],
+        default="none",
+        help="Comprime la salida JSONL (.gz / .zst añadido a la ruta; zstd requiere zstandard)"
+    )
+    io_group.add_argument(
+        "--stream-output",
+        action="store_true",
+        help="Escribe cada segmento en cuanto está alineado y con hablante (<salida>.part, renombrado al terminar)"
+    )
+    io_group.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continúa un <salida>.part previo sin volver a transcribir el audio ya escrito (implica --stream-output)"
+    )
+    io_group.add_argument(
+        "--audio-cache-dir",
+        default=None,
+        help="Directorio donde guardar el audio decodificado (16 kHz float32, memory-mapped) para reutilizarlo"
+    )
 
     # — Grupo ASR —
     asr_group = parser.add_argument_group("Opciones ASR")
@@ -83,15 +153,15 @@ def main():
     )
     asr_group.add_argument(
         "--device",
-        default="cuda" if torch.cuda.is_available() else "cpu",
+        default=None,
         choices=["cuda", "cpu"],
-        help="Dispositivo de cómputo ('cuda' o 'cpu')"
+        help="Dispositivo de cómputo ('cuda' o 'cpu'); por defecto 'cuda' si está disponible"
     )
     asr_group.add_argument(
         "--asr-batch",
         type=int,
         default=None, #96
-        help="Tamaño de lote para transcripción WhisperX (frames por batch). Si no se especifica, será 8 en GPU y 4 en CPU"
+        help="Tamaño de lote para transcripción WhisperX (frames por batch). Si no se especifica, se calcula con la memoria medida en ejecuciones previas"
     )
     asr_group.add_argument(
         "--compute-type",
@@ -104,6 +174,11 @@ def main():
         default="models/whisper",
         help="Directorio donde están o se descargarán los modelos Whisper"
     )
+    asr_group.add_argument(
+        "--calibration-file",
+        default="models/batch_calibration.json",
+        help="Archivo donde se guarda la memoria medida por elemento de lote (planificador de lotes)"
+    )
     asr_group.add_argument(
         "--allow-tf32",
         action="store_true",
@@ -151,6 +226,26 @@ def main():
         default=None,                 # ← None indica “calcular”
         help="Segmentos por lote durante la alineación; " "si se omite, se ajusta automáticamente según la RAM disponible"
     )
+    align_group.add_argument(
+        "--align-cache-mb",
+        type=int,
+        default=4096,
+        help="Memoria máxima (MiB) para modelos de alineación en caché (expulsión LRU)"
+    )
+    align_group.add_argument(
+        "--align-dtype",
+        choices=["auto", "float32", "int8"],
+        default="auto",
+        help="Precisión del wav2vec2 de alineación: 'int8' cuantiza sus capas lineales (sólo CPU); "
+             "'auto' = int8 en CPU, float32 en CUDA"
+    )
+    align_group.add_argument(
+        "--align-emission-s",
+        type=float,
+        default=None,
+        help="Segundos de audio (con relleno) por forward del wav2vec2: agrupa varios segmentos "
+             "en un lote; 0 = un segmento por forward (por defecto 30 en CPU, 0 en CUDA)"
+    )
     align_group.add_argument(
         "--no-align",
         action="store_true",
@@ -207,112 +302,484 @@ def main():
         action="store_true",
         help="Muestra la barra de progreso unificada"
     )
+    util_group.add_argument(
+        "--log-progress",
+        action="store_true",
+        help="Registra en el log el inicio y fin de cada etapa (con su pico de memoria)"
+    )
+    util_group.add_argument(
+        "--metrics-file",
+        default=None,
+        help="Añade cada evento de progreso (etapas, lotes, audio, memoria) a este archivo JSON-lines"
+    )
+    util_group.add_argument(
+        "--profile",
+        action="store_true",
+        help="Perfil por etapa (reloj, CPU, RSS y CUDA pico, RTF, palabras/s) en JSON, más una traza de Chrome (.trace.json)"
+    )
+    util_group.add_argument(
+        "--profile-out",
+        default=None,
+        metavar="RUTA",
+        help="Ruta del perfil; por defecto <salida>.profile.json, o profile.json del directorio de salida en modo lote"
+    )
+    util_group.add_argument(
+        "--profile-torch",
+        action="store_true",
+        help="Con --profile, exporta además la traza de torch.profiler (<perfil>.torch.json) con las etapas marcadas"
+    )
+    util_group.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Expone métricas Prometheus en http://127.0.0.1:PUERTO/metrics (con --serve, también en GET /metrics)"
+    )
+    util_group.add_argument(
+        "--checkpoint-dir",
+        default=None,
+        help="Guarda ASR, alineación y diarización por etapa y reutiliza las ya calculadas al re-ejecutar"
+    )
+    util_group.add_argument(
+        "--result-cache-dir",
+        default=None,
+        help="Caché de resultados por contenido: si el audio y las opciones coinciden, copia el JSONL guardado"
+    )
+    util_group.add_argument(
+        "--result-cache-mb",
+        type=int,
+        default=2048,
+        help="Tamaño máximo del caché de resultados en MiB (expulsión LRU)"
+    )
     util_group.add_argument(
         "--no-diarize",
         action="store_true",
         help="Omite la fase de diarización, solo transcribe (y alinea si no está activado --no_align)",
     )
-    args = parser.parse_args()
-    progress_hook = ForcedProgressHook(transient=True) if args.show_progress else None
 
-    if progress_hook:
-        for h in list(logger.handlers):
-            logger.removeHandler(h)
-        logger.addHandler(
-            RichHandler(console=progress_hook.console, markup=False, show_path=False)
-        )
+    diar_group.add_argument(
+        "--concurrency",
+        default="sequential",
+        choices=["sequential", "parallel"],
+        help="'parallel' ejecuta la diarización en paralelo con ASR/alineación y las une en la fusión"
+    )
+    diar_group.add_argument(
+        "--asr-threads",
+        type=int,
+        default=0,
+        help="Hilos CPU para Whisper (CTranslate2); con --threads permite repartir núcleos entre ASR y diarización (0 = por defecto)"
+    )
+    diar_group.add_argument(
+        "--diarize-workers",
+        type=int,
+        default=0,
+        help="Diariza por ventanas en N hilos con un clustering global; habilita la diarización en CPU (0 = pasada única)"
+    )
+    diar_group.add_argument(
+        "--diarize-full-audio",
+        action="store_true",
+        help="Diariza el audio completo; por defecto se omiten los silencios largos que detecta el VAD"
+    )
+    diar_group.add_argument(
+        "--diarize-backend",
+        choices=["auto", "torch", "onnx", "onnx-int8"],
+        default="auto",
+        help="Backend de segmentación y embeddings en CPU: 'onnx' usa ONNX Runtime (exporta los "
+             "checkpoints a models/pyannote/onnx), 'onnx-int8' con pesos int8; 'auto' elige onnx si "
+             "onnxruntime está instalado (por defecto auto; en CUDA siempre torch)"
+    )
+    diar_group.add_argument(
+        "--embedding-cache-dir",
+        default=None,
+        help="Directorio donde guardar segmentación + embeddings por ventana para no recalcularlos en audio ya visto"
+    )
+    diar_group.add_argument(
+        "--speaker-index",
+        default=None,
+        help="Índice .npz de identidades inscritas (python -m src.diarization.identity); renombra los clusters reconocidos"
+    )
+    diar_group.add_argument(
+        "--speaker-threshold",
+        type=float,
+        default=0.5,
+        help="Similitud coseno mínima para asignar una identidad del índice"
+    )
+    diar_group.add_argument(
+        "--asr-workers",
+        type=int,
+        default=0,
+        help="Solo CPU: procesos Whisper (int8) que se reparten las regiones VAD; --asr-threads fija los hilos de cada uno (0 = un proceso)"
+    )
 
-    # ------------------------------------------------------------------
-    # ➊ Ajuste dinámico de --asr-batch
-    # ------------------------------------------------------------------
-    if args.asr_batch is None:
-        if args.device == "cpu":
-            cores = os.cpu_count() or 1
-            args.asr_batch = max(1, min(8, cores))  # RTX 3090 Ti no usa CPU
-        else:
-            props       = torch.cuda.get_device_properties(0)
-            total_vram  = props.total_memory // 2**20          # MiB
-            target_vram = int(total_vram * 0.80)               # 80 % seguro
-
-            # Consumo base (MiB por frame @ FP16) – valores refinados
-            base_mem = {
-                "tiny":      22,
-                "base":      35,
-                "small":     55,
-                "medium":    90,
-                "large":    135,
-                "large-v2": 210,
-                "large-v3": 285,
-                "turbo":    150,
-            }[args.model]
-
-            factor = {"float16": 1.30, "float32": 2.00, "int8": 0.70}[args.compute_type]
-            est_per_frame = base_mem * factor
-
-            batch_calc = max(4, int(target_vram // est_per_frame))
-            # Redondea al múltiplo de 4 más próximo y nunca sobrepasa 512
-            args.asr_batch = min(512, (batch_calc + 3) // 4 * 4)
-
-    logging.info(f"asr_batch dinámico = {args.asr_batch}")
+    # — Grupo Servidor —
+    srv_group = parser.add_argument_group("Modo servidor")
+    srv_group.add_argument(
+        "--serve",
+        action="store_true",
+        help="Inicia un servicio HTTP local que mantiene los modelos cargados entre trabajos"
+    )
+    srv_group.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Interfaz donde escucha el servidor"
+    )
+    srv_group.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="Puerto del servidor"
+    )
+
+    # — Grupo En vivo —
+    live_group = parser.add_argument_group("Modo en vivo")
+    live_group.add_argument(
+        "--live",
+        metavar="FUENTE",
+        default=None,
+        help="Transcribe PCM mono 16 kHz en vivo desde - (stdin), un FIFO, unix:/ruta.sock o tcp:HOST:PUERTO; "
+             "escribe segmentos parciales y finales en -o (- = stdout)"
+    )
+    live_group.add_argument(
+        "--live-format",
+        choices=["s16le", "f32le"],
+        default="s16le",
+        help="Formato de las muestras (una cabecera WAV, si la hay, lo determina)"
+    )
+    live_group.add_argument(
+        "--live-step",
+        type=float,
+        default=1.0,
+        help="Segundos de audio nuevo entre pasadas de VAD/ASR (menos = parciales más frecuentes, más CPU)"
+    )
+    live_group.add_argument(
+        "--live-silence",
+        type=float,
+        default=0.6,
+        help="Silencio (s) tras una región de voz para finalizarla (más = menos cortes, más latencia)"
+    )
+    live_group.add_argument(
+        "--live-max-segment",
+        type=float,
+        default=10.0,
+        help="Voz continua máxima (s) antes de forzar un segmento final; acota la latencia (máx. 30)"
+    )
+    live_group.add_argument(
+        "--live-context",
+        type=int,
+        default=200,
+        help="Caracteres del texto final previo usados como prompt de la ventana siguiente (0 = sin contexto)"
+    )
+    live_group.add_argument(
+        "--live-no-partials",
+        action="store_true",
+        help="Sólo escribe segmentos finales (sin transcripciones provisionales)"
+    )
+    return parser
+
+
+def resolve_args(args: argparse.Namespace) -> argparse.Namespace:
+    """
+    Aplica los ajustes de CPU (el asr_batch automático lo calcula el planificador).
+    """
+    if args.device is None:
+        args.device = default_device()
+    # --asr-batch sin fijar → lo decide el planificador con el modelo ya
+    # cargado (memoria calibrada en ejecuciones previas o tabla estimada)
+    if args.asr_batch is not None:
+        logging.info(f"asr_batch fijo = {args.asr_batch}")
 
     if args.device == "cpu" and args.compute_type in ("float16", "float32"):
         logging.warning("float16 no soportado en CPU y float32 muy lento → usando int8 en su lugar")
         args.compute_type = "int8"
+    if args.align_dtype == "auto":
+        args.align_dtype = "int8" if args.device == "cpu" else "float32"
+    elif args.align_dtype == "int8" and args.device != "cpu":
+        logging.warning("--align-dtype int8 solo se aplica en CPU; usando float32")
+        args.align_dtype = "float32"
+    if args.align_emission_s is None:
+        args.align_emission_s = 30.0 if args.device == "cpu" else 0.0
+    if args.asr_workers > 1 and args.device != "cpu":
+        logging.warning("--asr-workers solo se aplica en CPU; se ignora")
+        args.asr_workers = 0
     if args.device == "cpu":
-        logging.warning("Diarización y alineación no soportadas en CPU, solo transcripción")
-        logging.warning("Usando batch_size de 4 debido a uso de CPU")
+        # Sin diarizar no se mira pyannote ni onnxruntime
+        if not args.no_diarize:
+            from src.diarization.onnx_backend import resolve_backend
+
+            backend = resolve_backend(args.diarize_backend, args.device)
+            if backend != "torch":
+                logging.info(f"Diarización en CPU con ONNX Runtime ({backend})")
+            elif args.diarize_workers > 1:
+                logging.info(f"Diarización en CPU por ventanas ({args.diarize_workers} workers)")
+            else:
+                logging.warning("Diarización en CPU requiere onnxruntime o --diarize-workers, solo transcripción")
         logging.warning("Usando chunk_size size de 15 debido a uso de CPU")
         logging.warning("Usando vad_method silero debido a uso de CPU")
-        logging.warning("Usando modelo tiny debido a uso de CPU")
-        args.model        = "tiny"
+        if args.asr_workers > 1:
+            # Con varios procesos, modelos mayores son viables: se respeta --model
+            cores = os.cpu_count() or args.asr_workers
+            args.asr_threads = args.asr_threads or max(1, cores // args.asr_workers)
+            logging.info(f"ASR multiproceso: {args.asr_workers} workers × {args.asr_threads} hilos, modelo {args.model}")
+        else:
+            logging.warning("Usando modelo tiny debido a uso de CPU")
+            args.model    = "tiny"
         #args.no_align = True
         args.threads      = os.cpu_count()
         args.chunk_size   = 15
         args.vad_method   = "silero"
+        # En paralelo, reparte los núcleos: mitad Whisper, mitad torch (diarización)
+        if args.concurrency == "parallel" and not args.asr_threads:
+            cores = os.cpu_count() or 2
+            args.asr_threads = max(1, cores // 2)
+            args.threads     = max(1, cores - args.asr_threads)
+    return args
 
 
+def pipeline_kwargs(args: argparse.Namespace) -> dict:
+    """
+    Traduce los argumentos de la CLI a los parámetros de run_pipeline.
+    """
+    return dict(
+        model_name    = args.model,
+        audio_file    = args.audio,
+        output_jsonl  = args.output,
+        device        = args.device,
+        asr_batch     = args.asr_batch,
+        compute_type  = args.compute_type,
+        min_speakers  = args.min_speakers,
+        max_speakers  = args.max_speakers,
+        model_dir     = args.model_dir,
+        allow_tf32    = args.allow_tf32,
+        vad_method  = args.vad_method,
+        vad_onset   = args.vad_onset,
+        vad_offset  = args.vad_offset,
+        chunk_size  = args.chunk_size,
+        no_align    = args.no_align,
+        align_model_name    = args.align_model,
+        align_batch = args.align_batch,
+        align_dtype = args.align_dtype,
+        align_emission_s = args.align_emission_s,
+        return_char_alignments = args.return_char_alignments,
+        no_diarize    = args.no_diarize,
+        temperature = args.temperature,
+        beam_size   = args.beam_size,
+        initial_prompt = args.initial_prompt,
+        audio_cache_dir = args.audio_cache_dir,
+        concurrency = args.concurrency,
+        asr_threads = args.asr_threads,
+        asr_workers = args.asr_workers,
+        diarize_workers = args.diarize_workers,
+        diarize_backend = args.diarize_backend,
+        diarize_speech_only = not args.diarize_full_audio,
+        embedding_cache_dir = args.embedding_cache_dir,
+        speaker_index = args.speaker_index,
+        speaker_threshold = args.speaker_threshold,
+        stream_output = args.stream_output,
+        resume = args.resume,
+        checkpoint_dir = args.checkpoint_dir,
+        result_cache_dir = args.result_cache_dir,
+        result_cache_mb = args.result_cache_mb,
+        output_format = args.output_format,
+        jsonl_precision = args.jsonl_precision,
+        compress = args.compress,
+    )
+
+
+def live_kwargs(args: argparse.Namespace) -> dict:
+    """Parámetros de run_live (modo en vivo)."""
+    return dict(
+        output        = args.output,
+        device        = args.device,
+        model_name    = args.model,
+        compute_type  = args.compute_type,
+        model_dir     = args.model_dir,
+        allow_tf32    = args.allow_tf32,
+        vad_method    = args.vad_method,
+        vad_onset     = args.vad_onset,
+        vad_offset    = args.vad_offset,
+        chunk_size    = args.chunk_size,
+        temperature   = args.temperature,
+        beam_size     = args.beam_size,
+        initial_prompt = args.initial_prompt,
+        no_align      = args.no_align,
+        align_model_name = args.align_model,
+        align_batch   = args.align_batch,
+        align_dtype   = args.align_dtype,
+        align_emission_s = args.align_emission_s,
+        asr_threads   = args.asr_threads,
+        jsonl_precision = args.jsonl_precision,
+        live_format   = args.live_format,
+        step_s        = args.live_step,
+        silence_s     = args.live_silence,
+        max_segment_s = args.live_max_segment,
+        context_chars = args.live_context,
+        partials      = not args.live_no_partials,
+    )
+
+
+def telemetry_sinks(args: argparse.Namespace, prometheus: Optional["PrometheusSink"] = None) -> list:
+    """
+    Sinks del bus de eventos pedidos por la CLI (además de la barra Rich).
+    Sin ninguno, el pipeline no crea eventos.
+    """
+    from src.utils.telemetry import JsonlMetricsSink, LogSink, PrometheusSink
+
+    sinks = []
+    if args.log_progress:
+        sinks.append(LogSink())
+    if args.metrics_file:
+        sinks.append(JsonlMetricsSink(args.metrics_file))
+    if args.metrics_port is not None:
+        prometheus = prometheus or PrometheusSink()
+        prometheus.serve(args.metrics_port)
+    if prometheus is not None:
+        sinks.append(prometheus)
+    return sinks
+
+
+def profile_paths(args: argparse.Namespace, batch: bool) -> tuple:
+    """(informe, traza de torch.profiler o None) según --profile-out/--profile-torch."""
+    report = args.profile_out
+    if report is None:
+        if batch:
+            report = str(Path(args.output_dir or ".") / "profile.json")
+        else:
+            base = args.output[:-len(".jsonl")] if args.output.endswith(".jsonl") else args.output
+            report = base + ".profile.json"
+    torch_path = (report[:-len(".json")] if report.endswith(".json") else report) + ".torch.json"
+    return report, torch_path if args.profile_torch else None
+
+
+def profile_meta(args: argparse.Namespace) -> dict:
+    return {
+        "argv": sys.argv[1:],
+        "model": args.model,
+        "device": args.device,
+        "compute_type": args.compute_type,
+        "asr_workers": args.asr_workers,
+        "diarize_workers": args.diarize_workers,
+        "diarize_backend": args.diarize_backend,
+    }
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    from src.asr.align_cache import align_cache
+    from src.utils.batch_planner import planner
+    from src.utils.profiler import StageProfiler, torch_trace
+    from pipelines.batch import collect_inputs, output_paths
+
     logging.getLogger("pytorch_lightning").setLevel(logging.ERROR)
+    align_cache.max_bytes = args.align_cache_mb * 2**20
+    planner.path = args.calibration_file
+
+    if args.serve:
+        from service.server import serve
+        from src.utils.telemetry import PrometheusSink
+        prometheus = PrometheusSink()       # GET /metrics del propio servidor
+        with events.subscribed(*telemetry_sinks(args, prometheus)):
+            serve(parser, resolve_args, pipeline_kwargs, host=args.host, port=args.port,
+                  metrics=prometheus, base=args, set_threads=set_torch_threads)
+        return
+    if args.live:
+        from pipelines.live import run_live
+
+        if args.output_format != "jsonl" or args.compress != "none":
+            parser.error("--live escribe JSONL sin comprimir")
+        if not args.no_diarize:
+            logging.info("Modo en vivo sin diarización")
+        args.no_diarize = True
+        resolve_args(args)
+        if args.threads:
+            set_torch_threads(args.threads)
+        with events.subscribed(*telemetry_sinks(args)):
+            run_live(args.live, **live_kwargs(args))
+        return
+    args.profile = args.profile or args.profile_torch or args.profile_out is not None
+    if args.resume and args.output_format != "jsonl":
+        parser.error("--resume sólo está disponible con --output-format jsonl")
+    if args.resume and args.compress != "none":
+        parser.error("--resume no admite --compress")
+    inputs = collect_inputs(args.audio, args.manifest)
+    if not inputs:
+        parser.error("falta el archivo de audio (o use --serve o --live)")
+
+    # Más de un archivo, directorio, glob o manifiesto → modo lote
+    if args.manifest or len(args.audio) > 1 or inputs != args.audio:
+        from pipelines.batch import run_batch, unsupported_options
+
+        bad = unsupported_options(pipeline_kwargs(args))
+        if bad:
+            flags = ", ".join("--" + k.replace("_", "-") for k in bad)
+            parser.error(f"el modo lote (varios archivos, globs, directorios o --manifest) no admite {flags}")
+        resolve_args(args)
+        if args.threads:
+            set_torch_threads(args.threads)
+        try:
+            targets = output_paths(inputs, args.output_dir)
+        except ValueError as e:
+            parser.error(str(e))
+        logging.info(f"Modo lote: {len(inputs)} archivos, model={args.model}")
+        jobs = []
+        for audio_file, output_jsonl in zip(inputs, targets):
+            kw = pipeline_kwargs(args)
+            kw.update(audio_file=audio_file, output_jsonl=output_jsonl)
+            jobs.append(kw)
+        profiler = StageProfiler(torch_ranges=args.profile_torch) if args.profile else None
+        report, torch_path = profile_paths(args, batch=True) if profiler else (None, None)
+        sinks = telemetry_sinks(args) + ([profiler] if profiler else [])
+        with events.subscribed(*sinks), profiler or contextlib.nullcontext(), torch_trace(torch_path):
+            outputs = run_batch(jobs)
+        if profiler:
+            profiler.write(report, inputs=inputs, outputs=outputs, **profile_meta(args))
+        return
+    args.audio = inputs[0]
+
+    progress_hook = None
+    if args.show_progress:
+        from utils.hooks import ForcedProgressHook
+        progress_hook = ForcedProgressHook(transient=True)
+
+    if progress_hook:
+        for h in list(logger.handlers):
+            logger.removeHandler(h)
+        logger.addHandler(
+            RichHandler(console=progress_hook.console, markup=False, show_path=False)
+        )
+
+    resolve_args(args)
+
     logging.info(f"Procesando {args.audio}")
     logging.info(f"model={args.model}")
-    logging.info(f"Procesando {args.audio}")
 
     # 3. Ejecuta el pipeline dentro del contexto del hook
+    from pipelines.full_pipeline import run_pipeline
+
     if args.threads:
-        torch.set_num_threads(args.threads)
+        set_torch_threads(args.threads)
 
+    sinks = telemetry_sinks(args)
+    if progress_hook:
+        sinks.append(progress_hook.on_event)
+    profiler = StageProfiler(torch_ranges=args.profile_torch) if args.profile else None
+    report, torch_path = profile_paths(args, batch=False) if profiler else (None, None)
+    if profiler:
+        sinks.append(profiler)
     ctx = progress_hook or contextlib.nullcontext()
-    with ctx:
-        out = run_pipeline(
-            model_name    = args.model,
-            audio_file    = args.audio,
-            output_jsonl  = args.output,
-            device        = args.device,
-            asr_batch     = args.asr_batch,
-            compute_type  = args.compute_type,
-            min_speakers  = args.min_speakers,
-            max_speakers  = args.max_speakers,
-            model_dir     = args.model_dir,
-            allow_tf32    = args.allow_tf32,
-            progress_hook = progress_hook,
-            vad_method  = args.vad_method,
-            vad_onset   = args.vad_onset,
-            vad_offset  = args.vad_offset,
-            chunk_size  = args.chunk_size,
-            no_align    = args.no_align,
-            align_model_name    = args.align_model,
-            align_batch = args.align_batch,
-            return_char_alignments = args.return_char_alignments,
-            no_diarize    = args.no_diarize,
-            temperature = args.temperature,
-            beam_size   = args.beam_size,
-            initial_prompt = args.initial_prompt,
-            
-        )
+    with ctx, events.subscribed(*sinks), profiler or contextlib.nullcontext(), torch_trace(torch_path):
+        out = run_pipeline(**pipeline_kwargs(args))
+    if profiler:
+        profiler.write(report, audio_file=args.audio, output=out, **profile_meta(args))
 
     logging.info(f"→ Transcripción guardada en {out}")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        # Cierra lo que el registro mantiene vivo (p. ej. los workers de --asr-workers)
+        from src.utils.registry import registry
+        registry.clear()
 
 # -----------------------------------------------------------------------------
 # Copyright (c) 2022-2025 Max Bain et al. (whisperX)
@@ -0,0 +1,138 @@
+# src/asr/align_cache.py
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Hashable, List, Optional, Tuple
+
+from src.utils.batch_planner import memory_activity
+
+logger = logging.getLogger(__name__)
+
+
+def _model_bytes(model) -> int:
+    """
+    Tamaño aproximado de los pesos en bytes (state_dict: incluye los pesos
+    int8 empaquetados de las capas cuantizadas, que no son parámetros).
+    """
+    def size(v) -> int:
+        if hasattr(v, "element_size"):
+            return v.numel() * v.element_size()
+        if isinstance(v, (tuple, list)):
+            return sum(size(x) for x in v)
+        return 0
+
+    return sum(size(v) for v in model.state_dict().values())
+
+
+class AlignModelCache:
+    """
+    Caché de modelos de alineación (wav2vec2) para todo el proceso.
+
+    • Clave: (idioma, nombre de modelo, device, dtype); dtype "int8" guarda
+      el modelo con las capas lineales cuantizadas (CPU).
+    • Expulsión LRU cuando la suma de pesos supera `max_bytes`
+      (el modelo recién usado nunca se expulsa).
+    • preload(...) inicia la carga en segundo plano; un get(...) posterior
+      con la misma clave espera a esa carga en vez de repetirla.
+    • La carga cuenta como memory_activity: un MemorySampler que coincide
+      con ella no calibra (ver utils/batch_planner.py); wait_pending()
+      espera a las precargas en curso.
+    """
+
+    def __init__(self, max_bytes: int = 4 * 2**30) -> None:
+        self.max_bytes = max_bytes
+        self._models: "OrderedDict[Hashable, Tuple[object, dict, int]]" = OrderedDict()
+        self._pending: dict = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(language: str, model_name: Optional[str], device: str, dtype: str = "float32") -> tuple:
+        return (language, model_name, device, dtype)
+
+    def _load(self, key: tuple, model_dir: str) -> Tuple[object, dict]:
+        import whisperx
+
+        language, model_name, device, dtype = key
+        t0 = time.perf_counter()
+        with memory_activity():
+            model, meta = whisperx.load_align_model(
+                language_code=language,
+                device=device,
+                model_name=model_name,
+                model_dir=model_dir,
+            )
+            if dtype == "int8":
+                from src.asr.emissions import quantize_int8
+
+                model = quantize_int8(model)
+        size = _model_bytes(model)
+        logger.info(
+            f"Modelo de alineación {model_name or 'por defecto'} ({language}, {dtype}) cargado en "
+            f"{time.perf_counter() - t0:.1f} s, {size / 2**20:.0f} MiB"
+        )
+        with self._lock:
+            self._models[key] = (model, meta, size)
+            self._models.move_to_end(key)
+            self._evict()
+        return model, meta
+
+    def _evict(self) -> None:
+        total = sum(size for _, _, size in self._models.values())
+        while total > self.max_bytes and len(self._models) > 1:
+            old_key, (_, _, size) = self._models.popitem(last=False)
+            total -= size
+            logger.info(f"Modelo de alineación {old_key} expulsado del caché")
+
+    def _future(self, key: tuple, model_dir: str, background: bool) -> Future:
+        """Devuelve el Future de la carga de `key`, iniciándola si hace falta."""
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                fut: Future = Future()
+                model, meta, _ = self._models[key]
+                fut.set_result((model, meta))
+                return fut
+            if key in self._pending:
+                return self._pending[key]
+            fut = Future()
+            self._pending[key] = fut
+
+        def _run() -> None:
+            try:
+                fut.set_result(self._load(key, model_dir))
+            except BaseException as err:
+                fut.set_exception(err)
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+
+        if background:
+            threading.Thread(target=_run, name="align-preload", daemon=True).start()
+        else:
+            _run()
+        return fut
+
+    def get(self, language: str, model_name: Optional[str], model_dir: str,
+            device: str, dtype: str = "float32") -> Tuple[object, dict]:
+        return self._future(self.key(language, model_name, device, dtype), model_dir, False).result()
+
+    def preload(self, language: str, model_name: Optional[str], model_dir: str,
+                device: str, dtype: str = "float32") -> None:
+        self._future(self.key(language, model_name, device, dtype), model_dir, True)
+
+    def wait_pending(self) -> None:
+        """Espera a que terminen las precargas en curso (sin propagar sus errores)."""
+        with self._lock:
+            pending = list(self._pending.values())
+        for fut in pending:
+            fut.exception()
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._models)
+
+
+# Instancia única del proceso
+align_cache = AlignModelCache()
@@ -0,0 +1,197 @@
+# src/asr/emissions.py
+"""
+Emisiones wav2vec2 por lotes para whisperx.align.
+
+whisperx.align ejecuta el modelo una vez por segmento. BatchedEmissions se
+le pasa en lugar del modelo: antes de cada lote de alineación, precompute()
+calcula las emisiones de todos sus segmentos en pocos forwards con relleno
+(ordenados por duración, hasta `max_batch_s` segundos de audio rellenado
+por forward) y, cuando whisperx pide la emisión de un segmento, la devuelve
+ya calculada.
+
+El relleno con ceros sólo es inocuo si el modelo lo enmascara de verdad:
+un extractor con group norm (los wav2vec2 base, entre ellos el de español
+por defecto de WhisperX) normaliza cada canal sobre todo el eje temporal,
+relleno incluido, y los modelos que normalizan la forma de onda completa
+tampoco lo toleran. Con ellos cada forward agrupa sólo segmentos de la
+misma longitud (sin relleno): se conservan int8 y el proxy, no el lote.
+
+Los segmentos se reconocen por su posición dentro del tensor de audio
+(whisperx recorta vistas audio[:, f1:f2]); cualquier otra llamada (p. ej.
+segmentos de menos de 400 muestras, que whisperx copia y rellena) va al
+modelo real.
+
+CLI (precisión de marcas de tiempo frente a fp32 por segmento):
+    python -m src.asr.emissions tests/data/test_audio.wav [--dtype int8] [--emission-s 30]
+"""
+import types
+from typing import Dict, Tuple
+
+import torch
+from whisperx.audio import SAMPLE_RATE
+
+MIN_SAMPLES = 400           # mínimo de wav2vec2; whisperx rellena los más cortos
+
+
+def quantize_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """Cuantización dinámica de las capas lineales (pesos int8; sólo CPU)."""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def padding_invariant(model: torch.nn.Module, model_type: str) -> bool:
+    """
+    True si la emisión de un segmento rellenado con ceros (con su máscara o
+    longitudes) es la misma que sin relleno.
+    """
+    if model_type == "torchaudio":
+        if getattr(model, "normalize_waveform", False):     # layer_norm sobre toda la forma de onda
+            return False
+        inner = getattr(model, "model", model)                # _Wav2Vec2Model de los bundles
+        layers = getattr(getattr(inner, "feature_extractor", None), "conv_layers", ())
+        return not any(isinstance(getattr(layer, "layer_norm", None), torch.nn.GroupNorm) for layer in layers)
+    return getattr(model.config, "feat_extract_norm", "group") == "layer"
+
+
+class BatchedEmissions:
+    def __init__(self, model: torch.nn.Module, model_type: str, max_batch_s: float):
+        self.model = model
+        self.model_type = model_type            # "torchaudio" | "huggingface" (metadatos de whisperx)
+        self.max_samples = max(1, int(max_batch_s * SAMPLE_RATE))
+        self.padding = padding_invariant(model, model_type)
+        self._base = 0
+        self._emissions: Dict[Tuple[int, int], torch.Tensor] = {}
+        self.forwards = 0
+
+    def _forward(self, batch: torch.Tensor, lengths: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """(B, T) con relleno → (logits (B, frames, V), frames válidos por elemento)."""
+        if self.model_type == "torchaudio":
+            return self.model(batch, lengths=lengths)
+        mask = None
+        if self.padding:
+            mask = (torch.arange(batch.shape[1], device=batch.device)[None] < lengths[:, None]).long()
+        logits = self.model(batch, attention_mask=mask).logits
+        return logits, self.model._get_feat_extract_output_lengths(lengths)
+
+    def precompute(self, audio: torch.Tensor, segments: list) -> None:
+        """
+        `audio` (1, N) debe ser el mismo tensor (y en el mismo device) que
+        recibirá whisperx.align, para que sus recortes coincidan.
+        """
+        self._emissions.clear()
+        self._base = audio.data_ptr()
+        n = audio.shape[-1]
+        spans = set()
+        for seg in segments:
+            f1 = int(seg["start"] * SAMPLE_RATE)
+            length = min(int(seg["end"] * SAMPLE_RATE), n) - f1
+            if 0 <= f1 < n and length >= MIN_SAMPLES:
+                spans.add((f1, length))
+
+        # De mayor a menor: cada forward rellena hasta el primero de su grupo
+        pending = sorted(spans, key=lambda s: -s[1])
+        with torch.inference_mode():
+            while pending:
+                width = pending[0][1]
+                size = max(1, self.max_samples // width)
+                if not self.padding:
+                    # Sin relleno: sólo los de la misma longitud (contiguos al estar ordenados)
+                    size = min(size, sum(1 for _, length in pending if length == width))
+                group, pending = pending[:size], pending[size:]
+                batch = audio.new_zeros(len(group), width)
+                for i, (f1, length) in enumerate(group):
+                    batch[i, :length] = audio[0, f1:f1 + length]
+                lengths = torch.tensor([length for _, length in group], device=audio.device)
+                logits, frames = self._forward(batch, lengths)
+                self.forwards += 1
+                for i, key in enumerate(group):
+                    self._emissions[key] = logits[i:i + 1, :int(frames[i])]
+
+    def __call__(self, waveform: torch.Tensor, **kwargs):
+        key = ((waveform.data_ptr() - self._base) // waveform.element_size(), waveform.shape[-1])
+        emission = self._emissions.pop(key, None)
+        if emission is None:
+            return self.model(waveform, **kwargs)
+        if self.model_type == "torchaudio":
+            return emission, None
+        return types.SimpleNamespace(logits=emission)
+
+
+# ----------------------------------------------------------------------
+# CLI: marcas de tiempo int8/por lotes frente a fp32 por segmento
+# ----------------------------------------------------------------------
+def compare_alignment(audio: str, model: str = "tiny", model_dir: str = "models/whisper",
+                      align_model=None, align_batch: int = 32, dtype: str = "int8",
+                      emission_s: float = 30.0) -> dict:
+    """
+    Alinea el mismo texto con fp32 por segmento (referencia) y con `dtype`
+    por lotes de `emission_s` s. Devuelve {"delta_ms": |Δ| de inicios y
+    fines de las palabras alineadas por ambas, "words": cuántas,
+    "seconds": (referencia, nueva)}. Lo usan la CLI y tests/test_emissions.py.
+    """
+    import time
+
+    import numpy as np
+    from whisperx.audio import load_audio
+
+    from src.asr.transcriber import Transcriber
+
+    t = Transcriber(
+        model_name=model, device="cpu", compute_type="int8", language="es",
+        download_root=model_dir, allow_tf32=False, vad_method="silero",
+        vad_onset=0.5, vad_offset=0.363, chunk_size=15, temperature=0.0, beam_size=5,
+        initial_prompt=None, align_batch=align_batch, align_model_name=align_model,
+    )
+    samples = load_audio(audio)
+    result = t.transcribe(samples, batch_size=4)
+
+    words, seconds = [], []
+    for dt, es in (("float32", 0.0), (dtype, emission_s)):
+        t.align_dtype, t.align_emission_s = dt, es
+        t.align(result, samples, "cpu", False)            # calentamiento y carga del modelo
+        t0 = time.perf_counter()
+        cols = t.align(result, samples, "cpu", False).word_columns()
+        seconds.append(time.perf_counter() - t0)
+        words.append(cols)
+
+    ref, new = words
+    both = np.isfinite(ref["start"]) & np.isfinite(new["start"])
+    delta = np.abs(np.concatenate([ref["start"][both] - new["start"][both],
+                                   ref["end"][both] - new["end"][both]])) * 1000
+    return {"delta_ms": delta, "words": int(both.sum()), "seconds": tuple(seconds)}
+
+
+def main(argv=None) -> int:
+    import argparse
+    import logging
+
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="Compara la alineación en CPU con la de referencia fp32")
+    parser.add_argument("audio")
+    parser.add_argument("--model", default="tiny", help="Modelo Whisper para el texto (común a ambas)")
+    parser.add_argument("--model-dir", default="models/whisper")
+    parser.add_argument("--align-model", default=None)
+    parser.add_argument("--align-batch", type=int, default=32)
+    parser.add_argument("--dtype", default="int8", choices=["float32", "int8"])
+    parser.add_argument("--emission-s", type=float, default=30.0)
+    parser.add_argument("--tolerance-ms", type=float, default=50.0,
+                        help="Umbral para contar una palabra como coincidente (por defecto 50 ms)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    r = compare_alignment(args.audio, args.model, args.model_dir, args.align_model,
+                          args.align_batch, args.dtype, args.emission_s)
+    delta, seconds = r["delta_ms"], r["seconds"]
+    within = float(np.mean(delta <= args.tolerance_ms)) if delta.size else 0.0
+    print(f"fp32 por segmento : {seconds[0]:8.2f} s")
+    print(f"{args.dtype} lotes {args.emission_s:g} s : {seconds[1]:8.2f} s  "
+          f"(speedup {seconds[0] / max(seconds[1], 1e-9):.2f}×)")
+    if delta.size:
+        print(f"|Δ| inicio/fin    : media {delta.mean():.1f} ms, p95 {np.percentile(delta, 95):.1f} ms, "
+              f"máx {delta.max():.1f} ms")
+    print(f"palabras ≤ {args.tolerance_ms:g} ms : {within:.1%} de {r['words']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
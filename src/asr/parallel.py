@@ -0,0 +1,132 @@
+# src/asr/parallel.py
+"""
+ASR multiproceso para CPU.
+
+Un único proceso con CTranslate2 deja de escalar pasadas unas pocas
+decenas de hilos. Aquí las regiones VAD (las mismas ventanas de
+chunk_size s) se reparten entre N procesos, cada uno con su propio modelo
+int8 y un número fijo de hilos, y los segmentos se recomponen en orden.
+
+El audio se comparte una sola vez mediante memoria compartida: los workers
+sólo reciben el nombre del bloque y la lista de regiones de su tramo.
+"""
+import logging
+import math
+import multiprocessing as mp
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterator, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SHARDS_PER_WORKER = 4       # tramos por worker: equilibra carga sin trocear los lotes
+
+_worker_transcriber = None  # Transcriber propio de cada proceso worker
+
+
+def split_chunks(chunks: list, n_shards: int) -> List[list]:
+    """
+    Divide las regiones VAD en `n_shards` tramos contiguos de duración
+    similar (el coste de decodificar es proporcional a la duración).
+    """
+    if not chunks:
+        return []
+    n_shards = max(1, min(n_shards, len(chunks)))
+    dur = np.array([c["end"] - c["start"] for c in chunks], dtype=np.float64)
+    cum = np.cumsum(dur)
+    cuts = np.searchsorted(cum, cum[-1] * np.arange(1, n_shards) / n_shards, side="right")
+    bounds = [0, *sorted(set(int(c) for c in cuts if 0 < c < len(chunks))), len(chunks)]
+    return [chunks[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Abre el bloque del proceso principal sin registrarlo en el resource_tracker:
+    los workers (spawn) comparten el del principal, y registrar + desregistrar
+    aquí borraría la entrada del principal (KeyError en el tracker al liberar).
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _init_worker(transcriber_kwargs: dict, threads: int) -> None:
+    global _worker_transcriber
+    import torch
+    from src.asr.transcriber import Transcriber
+
+    torch.set_num_threads(threads)
+    _worker_transcriber = Transcriber(**transcriber_kwargs, threads=threads)
+
+
+def _run_shard(shm_name: str, n_samples: int, chunks: list, batch_size: int) -> list:
+    shm = _attach(shm_name)
+    try:
+        audio = np.ndarray((n_samples,), dtype=np.float32, buffer=shm.buf)
+        segments = list(_worker_transcriber.transcribe_chunks(audio, chunks, batch_size))
+        del audio
+        return segments
+    finally:
+        shm.close()
+
+
+class AsrWorkerPool:
+    """
+    Procesos worker con el modelo Whisper ya cargado; se crean una vez y se
+    reutilizan entre trabajos (el Transcriber que los posee vive en el registro
+    y registry.clear() los cierra con Transcriber.shutdown).
+    """
+
+    def __init__(self, workers: int, threads: int, transcriber_kwargs: dict):
+        self.workers = workers
+        self.threads = threads
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context("spawn"),     # sin heredar estado de torch/CUDA
+            initializer=_init_worker,
+            initargs=(transcriber_kwargs, threads),
+        )
+        logger.info(f"ASR multiproceso: {workers} workers × {threads} hilos")
+
+    def transcribe_chunks(self, audio: np.ndarray, chunks: list, batch_size: int,
+                          on_batch_end=lambda: None) -> Iterator[dict]:
+        """
+        Mismo contrato que Transcriber.transcribe_chunks: entrega los segmentos
+        en el orden de `chunks`, tramo a tramo según van terminando en orden
+        (on_batch_end, por cada lote de cada tramo).
+        """
+        if not chunks:
+            return
+        shards = split_chunks(chunks, min(self.workers * SHARDS_PER_WORKER,
+                                          math.ceil(len(chunks) / max(1, batch_size))))
+        shm = shared_memory.SharedMemory(create=True, size=max(1, audio.nbytes))
+        futures = []
+        try:
+            np.ndarray(audio.shape, dtype=np.float32, buffer=shm.buf)[:] = audio
+            futures = [
+                self.executor.submit(_run_shard, shm.name, audio.shape[0], shard, batch_size)
+                for shard in shards
+            ]
+            step = max(1, batch_size or 1)
+            for fut in futures:
+                segments = fut.result()
+                for i, seg in enumerate(segments, 1):
+                    yield seg
+                    if i % step == 0 or i == len(segments):
+                        on_batch_end()
+        finally:
+            for fut in futures:
+                fut.cancel()
+            shm.close()
+            shm.unlink()
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
@@ -1,21 +1,30 @@
 # src/asr/transcriber.py
 
+from contextlib import redirect_stdout
 from itertools import islice
-from contextlib import contextmanager
-import builtins
-import re
 import whisperx
+import inspect
 import logging
 import os
+import sys
+import time
 import torch
 import warnings
-from pyannote.audio.utils.reproducibility import ReproducibilityWarning
-import math, torchaudio
-from typing import Optional
-warnings.filterwarnings("ignore", category=ReproducibilityWarning)
+import math
+import numpy as np
+from typing import Optional, Union
+from whisperx.audio import SAMPLE_RATE
+from src.asr.align_cache import align_cache
+from src.asr.vad import get_vad, merge_regions, speech_regions
+from src.formatting.transcript import Transcript
+from src.utils.events import ProgressPrints, events
+# ReproducibilityWarning de pyannote (VAD), filtrada por mensaje para no importar pyannote aquí
+warnings.filterwarnings("ignore", message="Please disable TensorFloat-32")
 
 logger = logging.getLogger(__name__)
 
+ALIGN_PAD_S = 1.0   # margen (s) alrededor de cada ventana de alineación
+
 def batch(iterable, chunk_size):
     """
     Divide `iterable` en listas de longitud <= chunk_size.
@@ -27,6 +36,26 @@ def batch(iterable, chunk_size):
             break
         yield block
 
+
+def shift_times(items, offset: float) -> None:
+    """Suma `offset` a start/end de cada elemento que los tenga (in situ)."""
+    for it in items or ():
+        for k in ("start", "end"):
+            if it.get(k) is not None:
+                it[k] = round(it[k] + offset, 3)
+
+
+def align_window(audio: np.ndarray, chunk: list, pad: float = ALIGN_PAD_S):
+    """
+    Recorta del buffer compartido sólo la ventana que cubre los segmentos de
+    `chunk` (más `pad` s a cada lado). Devuelve (vista, offset_en_segundos);
+    la vista no copia muestras.
+    """
+    s0 = max(0, int((min(seg["start"] for seg in chunk) - pad) * SAMPLE_RATE))
+    s1 = min(audio.shape[-1], int(math.ceil((max(seg["end"] for seg in chunk) + pad) * SAMPLE_RATE)))
+    return audio[s0:s1], s0 / SAMPLE_RATE
+
+
 class Transcriber:
     def __init__(
         self,
@@ -45,16 +74,45 @@ class Transcriber:
         initial_prompt,
         align_batch,
         align_model_name: Optional[str] = None,
+        threads: int = 0,
+        workers: int = 0,
     ):
         self.model_name = model_name
+        self.device = device
+        self.compute_type = compute_type
+        self.language = language
         self.align_model_name = align_model_name
         self.align_batch = align_batch
+        self.align_dtype = "float32"        # "int8": wav2vec2 cuantizado (CPU)
+        self.align_emission_s = 0.0         # > 0: emisiones por lotes (asr/emissions.py)
         self.allow_tf32 = allow_tf32
+        self.vad_onset = vad_onset
+        self.vad_offset = vad_offset
+        self.chunk_size = chunk_size
 
         # --- NUEVO: bloquea el fix de reproducibilidad ----
         if self.allow_tf32:
             self._enable_tf32()          # activa flags antes de cualquier import
             
+        # --- ASR multiproceso (CPU): los workers cargan Whisper, aquí sólo el VAD ---
+        self.pool = None
+        if workers > 1:
+            from src.asr.parallel import AsrWorkerPool
+
+            worker_kwargs = dict(
+                model_name=model_name, device=device, compute_type=compute_type,
+                language=language, download_root=download_root, allow_tf32=allow_tf32,
+                vad_method=vad_method, vad_onset=vad_onset, vad_offset=vad_offset,
+                chunk_size=chunk_size, temperature=temperature, beam_size=beam_size,
+                initial_prompt=initial_prompt, align_batch=align_batch,
+                align_model_name=align_model_name,
+            )
+            per_worker = threads or max(1, (os.cpu_count() or workers) // workers)
+            self.pool = AsrWorkerPool(workers, per_worker, worker_kwargs)
+            self.model = None
+            self.vad_model = get_vad(vad_method, device, vad_onset, vad_offset, chunk_size)
+            return
+
         # --- opciones ASR que SÍ entiende TranscriptionOptions --- 
         asr_opts = {}
         if beam_size is not None:
@@ -71,6 +129,8 @@ class Transcriber:
             language=language,
             #local_files_only=True,
             download_root=download_root,
+            # ← VAD del registro: el mismo modelo que usa la etapa VAD compartida (asr/vad.py)
+            vad_model    = get_vad(vad_method, device, vad_onset, vad_offset, chunk_size),
             vad_method   = vad_method,
 
             # ← VAD
@@ -81,7 +141,10 @@ class Transcriber:
             },
             # ← Opciones de decodificación
             asr_options = asr_opts,
+            # ← Hilos CPU de CTranslate2 (independientes de torch.set_num_threads)
+            **({"threads": threads} if threads else {}),
         )
+        self.vad_model = self.model.vad_model
     def _enable_tf32(self):
         """
         Anula el fix de reproducibilidad de Pyannote y fuerza TF32
@@ -91,46 +154,41 @@ class Transcriber:
         torch.backends.cuda.matmul.allow_tf32 = True
         torch.backends.cudnn.allow_tf32     = True
 
-    @contextmanager
-    def _capture_progress(self, advance):
-        """
-        Intercepta los prints de progreso de WhisperX y llama a `advance(…)`.
-        """
-        original_print = builtins.print
-        # Coincide líneas que empiecen por "Progress: "
-        pattern = re.compile(r"^Progress:\s*([\d\.]+)%")
-
-        def patched(*args, **kwargs):
-            if args and isinstance(args[0], str):
-                m = pattern.match(args[0])
-                if m:
-                    # extraigo porcentaje y avanzo proporcionalmente
-                    pct = float(m.group(1))
-                    advance(pct)
-                    return
-            original_print(*args, **kwargs)
-
-        builtins.print = patched
-        try:
-            yield
-        finally:
-            builtins.print = original_print
-
-    def transcribe(self, audio_path: str, batch_size: int, on_batch_end=lambda *_: None, ) -> dict:
+    def transcribe(self, audio: Union[str, np.ndarray], batch_size: int, on_batch_end=lambda *_: None, ) -> dict:
         """
         Ejecuta la transcripción y devuelve el dict con keys: language, segments, etc.
+        `audio` puede ser una ruta o el waveform 16 kHz ya decodificado.
+        El avance (porcentaje acumulado de WhisperX) llega a `on_batch_end` y
+        al bus de eventos como etapa "transcribe" de 100 %.
         """
+        if self.pool is not None:
+            raise RuntimeError("transcribe() no admite workers; use vad_chunks + transcribe_chunks")
         if self.allow_tf32:
             self._enable_tf32()
 
-        # Capturamos el print “Progress: xx%”
-        with self._capture_progress(on_batch_end):
-            result = self.model.transcribe(
-                audio_path,
-                batch_size=batch_size,
-                print_progress=True,
-                verbose=False,
-            )
+        with events.stage("transcribe", 100, "%", label="ASR-Transcribe") as advance:
+            done = 0.0
+
+            def on_progress(pct: float) -> None:
+                nonlocal done
+                advance(pct - done)
+                done = pct
+                on_batch_end(pct)
+
+            params = inspect.signature(self.model.transcribe).parameters
+            if "progress_callback" in params:
+                result = self.model.transcribe(
+                    audio,
+                    batch_size=batch_size,
+                    verbose=False,
+                    progress_callback=on_progress,
+                )
+            else:
+                # WhisperX sin progress_callback: el avance sólo llega como
+                # «Progress: N%...» por stdout (print_progress), que se intercepta
+                extra = {"print_progress": True} if "print_progress" in params else {}
+                with redirect_stdout(ProgressPrints(on_progress, sys.stdout)):
+                    result = self.model.transcribe(audio, batch_size=batch_size, verbose=False, **extra)
 
         on_batch_end(1)
         if self.allow_tf32:
@@ -141,61 +199,144 @@ class Transcriber:
         return result
     
 
-    def align(self, result, audio_path, device, return_char_alignments, on_chunk_end=lambda *_: None) -> dict:
+    def speech_regions(self, audio: np.ndarray) -> np.ndarray:
+        """Regiones de voz (N, 2) del VAD de este Transcriber, sin agrupar."""
+        return speech_regions(self.vad_model, audio, self.chunk_size, self.vad_onset, self.vad_offset)
+
+    def vad_chunks(self, audio: np.ndarray, regions: Optional[np.ndarray] = None) -> list:
+        """
+        Regiones de voz fusionadas en ventanas de ≤ chunk_size s, con el mismo
+        merge_chunks que usa WhisperX internamente. Con `regions` (etapa VAD
+        compartida) no se vuelve a ejecutar el VAD.
+        """
+        if regions is None:
+            regions = self.speech_regions(audio)
+        return merge_regions(regions, self.chunk_size, self.vad_onset, self.vad_offset)
+
+    def transcribe_chunks(self, audio: np.ndarray, chunks: list, batch_size: int,
+                          on_batch_end=lambda: None):
         """
-        Reemplaza result["segments"] por segmentos alineados palabra a palabra.
+        Decodifica regiones VAD ya calculadas (mismo bucle que
+        FasterWhisperPipeline.transcribe, sin repetir el VAD) y entrega los
+        segmentos uno a uno. Si un lote falla, los ya entregados son válidos:
+        el llamador puede continuar desde chunks[n_entregados:].
+        `on_batch_end()` se llama al completar cada lote, una vez consumidos
+        sus segmentos.
+        Con workers, las regiones se reparten entre procesos (ver asr/parallel.py).
         """
+        if self.pool is not None:
+            yield from self.pool.transcribe_chunks(audio, chunks, batch_size, on_batch_end)
+            return
         if self.allow_tf32:
             self._enable_tf32()
 
-        # Determinar qué nombre de modelo pasar a load_align_model
-        # Prioridad: --align_model (self.align_model_name) > forced para large-v2/turbo > None
+        def data():
+            for c in chunks:
+                yield {"inputs": audio[int(c["start"] * SAMPLE_RATE):int(c["end"] * SAMPLE_RATE)]}
+
+        for idx, out in enumerate(self.model(data(), batch_size=batch_size, num_workers=0)):
+            text = out["text"]
+            avg_logprob = out.get("avg_logprob")
+            if batch_size in (0, 1, None):
+                text = text[0]
+                avg_logprob = avg_logprob[0] if avg_logprob is not None else None
+            seg = {
+                "text": text,
+                "start": round(chunks[idx]["start"], 3),
+                "end": round(chunks[idx]["end"], 3),
+            }
+            if avg_logprob is not None:
+                seg["avg_logprob"] = avg_logprob
+            yield seg
+            if (idx + 1) % max(1, batch_size or 1) == 0 or idx + 1 == len(chunks):
+                on_batch_end()
+
+    def shutdown(self) -> None:
+        """Cierra los procesos worker de --asr-workers (si los hay)."""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def align_model_choice(self):
+        """
+        Determinar qué nombre de modelo pasar a load_align_model.
+        Prioridad: --align_model (self.align_model_name) > forced para large-v2/turbo > None
+        """
+        model_dir = "models/align/w2v_spanish"
         if self.align_model_name:
-            chosen = self.align_model_name
-            model_dir = "models/align/w2v_spanish"
-        elif self.model_name in ("large-v2", "turbo"):
-            chosen = "WAV2VEC2_ASR_LARGE_LV60K_960H"
-            model_dir = "models/align/w2v_spanish"
-        else:
-            chosen = None
-            model_dir = "models/align/w2v_spanish"
+            return self.align_model_name, model_dir
+        if self.model_name in ("large-v2", "turbo"):
+            return "WAV2VEC2_ASR_LARGE_LV60K_960H", model_dir
+        return None, model_dir
 
-        align_model, meta = whisperx.load_align_model(
-            language_code=result["language"],
-            device=device,
-            model_name=chosen,
-            model_dir=model_dir,
-        )
+    def preload_align_model(self, device) -> None:
+        """
+        Inicia en segundo plano la carga del modelo de alineación, para que
+        esté listo cuando termine el ASR.
+        """
+        chosen, model_dir = self.align_model_choice()
+        align_cache.preload(self.language, chosen, model_dir, device, self.align_dtype)
 
+    def align_iter(self, result, audio, device, return_char_alignments):
+        """
+        Alinea lote a lote y entrega (n_segmentos_entrada, segmentos_alineados)
+        por lote, sin acumularlos (base de la salida incremental).
+        """
+        if self.allow_tf32:
+            self._enable_tf32()
+
+        chosen, model_dir = self.align_model_choice()
+        align_model, meta = align_cache.get(result["language"], chosen, model_dir, device, self.align_dtype)
+        batched = None
+        if self.align_emission_s > 0:
+            from src.asr.emissions import BatchedEmissions
+
+            batched = BatchedEmissions(align_model, meta["type"], self.align_emission_s)
+
+        if isinstance(audio, str):
+            audio = whisperx.load_audio(audio)
 
         segs = [seg for seg in result["segments"] if seg["text"].strip()]
-        aligned = []
+        t0 = time.perf_counter()
         for chunk in batch(segs, self.align_batch):
+            # Cada lote se alinea contra su propia ventana de audio: el coste
+            # depende de la duración de sus segmentos, no de la del archivo.
+            window, offset = align_window(audio, chunk)
+            local = [dict(seg, start=seg["start"] - offset, end=seg["end"] - offset) for seg in chunk]
+            if batched is not None:
+                # whisperx recorta sus segmentos de este mismo tensor (ya en el device)
+                window = torch.from_numpy(window).unsqueeze(0).to(device)
+                batched.precompute(window, local)
             out = whisperx.align(
-                chunk,
-                align_model,
+                local,
+                batched or align_model,
                 meta,
-                audio_path,
+                window,
                 device=device,
                 return_char_alignments=return_char_alignments
             )
-            aligned.extend(out["segments"])
-            on_chunk_end(len(chunk)) 
-        result["segments"] = aligned
-        return result
-
+            for seg in out["segments"]:
+                shift_times([seg], offset)
+                shift_times(seg.get("words"), offset)
+                shift_times(seg.get("chars"), offset)
+            yield len(chunk), out["segments"]
+        logger.info(
+            f"Alineación: {len(segs)} segmentos en {time.perf_counter() - t0:.1f} s "
+            f"(lotes de {self.align_batch}, {self.align_dtype}"
+            + (f", {batched.forwards} forwards" if batched is not None else "") + ")"
+        )
 
-    def estimate_batches(self, audio_path: str, batch_size: int) -> int:
+    def align(self, result, audio, device, return_char_alignments, on_chunk_end=lambda *_: None) -> Transcript:
         """
-        Devuelve cuántos lotes (aprox.) procesará WhisperX.
-
-        Cálculo simple: duración del audio / 30 s  ÷  batch_size.
-        Ajusta '30' si usas otra ventana (valores típicos: 30 s o 15 s).
+        Alinea result["segments"] palabra a palabra y devuelve un Transcript
+        columnar: cada lote se vuelca a arrays y sus dicts se liberan.
+        Con un waveform en memoria, cada lote lo reutiliza sin volver a decodificar.
         """
-        info = torchaudio.info(audio_path)
-        duration = info.num_frames / info.sample_rate           # en segundos
-        frames = math.ceil(duration / 30)
-        return max(1, math.ceil(frames / batch_size))
+        aligned = Transcript(language=result["language"], has_chars=return_char_alignments)
+        for n_in, segs in self.align_iter(result, audio, device, return_char_alignments):
+            aligned.extend(segs)
+            on_chunk_end(n_in)
+        return aligned
 
 
 # -----------------------------------------------------------------------------
@@ -0,0 +1,152 @@
+# src/asr/vad.py
+"""
+Etapa VAD compartida.
+
+Las regiones de voz se calculan una sola vez por audio (y se guardan como
+checkpoint "vad" si hay --checkpoint-dir) y las consumen:
+• el ASR: merge_regions() las agrupa en ventanas de ≤ chunk_size s con el
+  mismo merge_chunks de WhisperX;
+• la diarización: SpeechCompactor quita los silencios largos del audio
+  antes de diarizar y devuelve los tiempos a la escala original.
+
+Regiones: array (N, 2) float64 de [inicio, fin] en segundos, ordenadas.
+"""
+import logging
+from typing import List, Tuple
+
+import numpy as np
+from whisperx.audio import SAMPLE_RATE
+
+from src.utils.registry import registry
+
+logger = logging.getLogger(__name__)
+
+COMPACT_MIN_GAP_S = 2.0     # silencios más cortos se conservan (contexto para la diarización)
+COMPACT_PAD_S = 0.5         # margen que se conserva a cada lado de cada región
+
+
+def load_vad(vad_method: str, device: str, vad_onset: float, vad_offset: float, chunk_size: int):
+    """
+    VAD independiente del modelo Whisper (igual que lo construye
+    whisperx.load_model), para quien sólo necesita las regiones de voz.
+    """
+    import torch
+    from whisperx.vads import Pyannote, Silero
+
+    opts = {"vad_onset": vad_onset, "vad_offset": vad_offset, "chunk_size": chunk_size}
+    if vad_method == "silero":
+        return Silero(**opts)
+    if vad_method == "pyannote":
+        return Pyannote(torch.device(device), **opts)
+    raise ValueError(f"vad_method no válido: {vad_method}")
+
+
+def get_vad(vad_method: str, device: str, vad_onset: float, vad_offset: float, chunk_size: int):
+    """Modelo VAD único por proceso y opciones (lo comparten Transcriber y la etapa VAD)."""
+    return registry.get(
+        ("vad", vad_method, device, vad_onset, vad_offset, chunk_size),
+        lambda: load_vad(vad_method, device, vad_onset, vad_offset, chunk_size),
+    )
+
+
+def speech_regions(vad, audio: np.ndarray, chunk_size: float, onset: float, offset: float) -> np.ndarray:
+    """
+    Regiones de voz del VAD antes de agruparlas: para pyannote, la
+    binarización de sus puntuaciones (con max_duration=chunk_size, como en
+    WhisperX); para silero, sus segmentos tal cual.
+    """
+    from whisperx.vads import Pyannote
+
+    if hasattr(vad, "preprocess_audio"):            # whisperx.vads.Vad
+        waveform = vad.preprocess_audio(audio)
+    else:                                          # VAD pyannote asignado a mano
+        waveform = Pyannote.preprocess_audio(audio)
+    out = vad({"waveform": waveform, "sample_rate": SAMPLE_RATE})
+    if isinstance(vad, Pyannote) or not hasattr(vad, "preprocess_audio"):
+        from whisperx.vads.pyannote import Binarize
+
+        out = Binarize(max_duration=chunk_size, onset=onset, offset=offset)(out).get_timeline()
+    return np.array([(seg.start, seg.end) for seg in out], dtype=np.float64).reshape(-1, 2)
+
+
+def merge_regions(regions: np.ndarray, chunk_size: float, onset: float, offset: float) -> list:
+    """Ventanas ASR de ≤ chunk_size s (merge_chunks de WhisperX sobre las regiones)."""
+    from whisperx.diarize import Segment as SegmentX
+    from whisperx.vads import Vad
+
+    if len(regions) == 0:
+        logger.warning("No se detectó voz en el audio")
+        return []
+    segments = [SegmentX(float(s), float(e), "UNKNOWN") for s, e in regions]
+    return Vad.merge_chunks(segments, chunk_size, onset=onset, offset=offset)
+
+
+def shift_regions(regions: np.ndarray, offset: float) -> np.ndarray:
+    """Regiones posteriores a `offset`, relativas a él (audio recortado al reanudar)."""
+    kept = regions[regions[:, 1] > offset] - offset
+    kept[:, 0] = np.maximum(kept[:, 0], 0.0)
+    return kept
+
+
+def regions_to_json(regions: np.ndarray) -> list:
+    return regions.tolist()
+
+
+def regions_from_json(obj: list) -> np.ndarray:
+    return np.asarray(obj, dtype=np.float64).reshape(-1, 2)
+
+
+class SpeechCompactor:
+    """
+    Audio sin los silencios de más de `min_gap` s (cada región conserva
+    `pad` s a cada lado) y la correspondencia inversa de tiempos.
+
+    spans: (N, 3) [inicio_original, inicio_compacto, duración] de cada tramo conservado.
+    """
+
+    def __init__(self, regions: np.ndarray, duration: float,
+                 min_gap: float = COMPACT_MIN_GAP_S, pad: float = COMPACT_PAD_S):
+        kept: List[Tuple[float, float]] = []
+        for s, e in regions:
+            s, e = max(0.0, s - pad), min(duration, e + pad)
+            if kept and s - kept[-1][1] < min_gap:
+                kept[-1] = (kept[-1][0], max(kept[-1][1], e))
+            elif e > s:
+                kept.append((s, e))
+        self.duration = duration
+        lengths = np.array([e - s for s, e in kept], dtype=np.float64)
+        starts = np.array([s for s, _ in kept], dtype=np.float64)
+        self.spans = np.stack([starts, np.concatenate([[0.0], np.cumsum(lengths)[:-1]]), lengths], axis=1) \
+            if kept else np.zeros((0, 3))
+
+    @property
+    def kept_seconds(self) -> float:
+        return float(self.spans[:, 2].sum())
+
+    def worthwhile(self) -> bool:
+        """Compensa si quita al menos un silencio largo."""
+        return len(self.spans) > 0 and self.duration - self.kept_seconds >= COMPACT_MIN_GAP_S
+
+    def compact(self, audio: np.ndarray) -> np.ndarray:
+        return np.concatenate([
+            audio[int(round(s * SAMPLE_RATE)):int(round((s + d) * SAMPLE_RATE))]
+            for s, _, d in self.spans
+        ])
+
+    def expand(self, records: list) -> list:
+        """
+        Devuelve a la escala original los turnos {start, end, speaker, ...}
+        del audio compacto; un turno que cruza una unión se parte en ella.
+        """
+        out = []
+        bounds = self.spans[:, 1]
+        for rec in records:
+            i = max(0, int(np.searchsorted(bounds, rec["start"], side="right")) - 1)
+            start = rec["start"]
+            while i < len(self.spans) and start < rec["end"]:
+                orig, comp, length = self.spans[i]
+                end = min(rec["end"], comp + length)
+                if end > start:
+                    out.append(dict(rec, start=float(orig + start - comp), end=float(orig + end - comp)))
+                start, i = max(start, end), i + 1
+        return out
@@ -0,0 +1,61 @@
+# src/audio/loader.py
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+from whisperx.audio import SAMPLE_RATE, load_audio
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_key(audio_path: str) -> str:
+    """
+    Clave del caché: ruta absoluta + tamaño + mtime (no relee el archivo).
+    """
+    st = os.stat(audio_path)
+    raw = f"{os.path.abspath(audio_path)}|{st.st_size}|{st.st_mtime_ns}|{SAMPLE_RATE}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def load_waveform(audio_path: str, cache_dir: Optional[str] = None) -> Tuple[np.ndarray, float]:
+    """
+    Decodifica `audio_path` UNA sola vez a 16 kHz mono float32.
+
+    • Sin cache_dir: devuelve el array en memoria (ffmpeg vía whisperx).
+    • Con cache_dir: vuelca las muestras a <cache_dir>/<clave>.f32 y devuelve
+      un np.memmap copy-on-write, de modo que torch.from_numpy(...) no copia
+      y las páginas sólo ocupan RSS cuando se leen.
+
+    Retorna (waveform, segundos_de_decodificación).
+    """
+    t0 = time.perf_counter()
+    if cache_dir is None:
+        audio = load_audio(audio_path, sr=SAMPLE_RATE)
+        return audio, time.perf_counter() - t0
+
+    cache = Path(cache_dir)
+    cache.mkdir(parents=True, exist_ok=True)
+    f32_path = cache / f"{_cache_key(audio_path)}.f32"
+
+    if f32_path.exists():
+        logger.info(f"Audio decodificado reutilizado desde {f32_path}")
+    else:
+        audio = load_audio(audio_path, sr=SAMPLE_RATE)
+        tmp = f32_path.with_suffix(".f32.tmp")
+        audio.tofile(tmp)
+        os.replace(tmp, f32_path)      # escritura atómica
+        del audio
+
+    if f32_path.stat().st_size == 0:
+        return np.zeros(0, dtype=np.float32), time.perf_counter() - t0
+    audio = np.memmap(f32_path, dtype=np.float32, mode="c")
+    return audio, time.perf_counter() - t0
+
+
+def duration_seconds(audio: np.ndarray) -> float:
+    """Duración en segundos de un waveform a SAMPLE_RATE."""
+    return audio.shape[-1] / SAMPLE_RATE
@@ -1,10 +1,21 @@
 #./src/diarization/diarizer.py
+import numpy as np
 import pandas as pd
+import torch
 import torchaudio
-from pyannote.core import Annotation
 from src.diarization.pipeline_loader import load_local_pipeline
-from typing import Optional
-from pyannote.audio.pipelines.utils.hook import ProgressHook
+from src.utils.registry import registry
+from typing import Optional, Union
+from whisperx.audio import SAMPLE_RATE, load_audio
+from src.diarization.embedding_cache import EmbeddingCache
+from src.asr.vad import SpeechCompactor
+from src.diarization.identity import DEFAULT_THRESHOLD, VoiceprintIndex
+from src.pipelines.checkpoint import stage_key
+from src.utils.events import PyannoteHook, events
+from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
 
 class Diarizer:
     def __init__(
@@ -14,41 +25,125 @@ class Diarizer:
         device,
         models_root: str = "models/pyannote",
         allow_tf32: bool = False,
-        progress_hook: Optional[ProgressHook] = None,
+        workers: int = 0,
+        embedding_cache_dir: Optional[str] = None,
+        speaker_index: Optional[str] = None,
+        speaker_threshold: float = DEFAULT_THRESHOLD,
+        backend: str = "torch",
     ):
         self.min_speakers = min_speakers
         self.max_speakers = max_speakers
-        self.use_cuda = device
+        self.use_cuda = device != "cpu"     # "cpu" no debe mover el pipeline a la GPU
         self.models_root = models_root
         self.allow_tf32 = allow_tf32
-        self.progress_hook = progress_hook
+        self.workers = workers          # > 1 → diarización por ventanas (windowed.py)
+        self.embedding_cache_dir = embedding_cache_dir
+        self.speaker_index = speaker_index
+        self.speaker_threshold = speaker_threshold
+        self.backend = backend          # "onnx"/"onnx-int8": ONNX Runtime en CPU (onnx_backend.py)
+
+    def _embedding_cache(self, pipeline) -> EmbeddingCache:
+        # Todo lo que cambia segmentación/embeddings de una ventana forma parte de la clave
+        model_key = stage_key(
+            str(Path(self.models_root).resolve()),
+            step=pipeline._segmentation.step,
+            exclude_overlap=pipeline.embedding_exclude_overlap,
+            threshold=None if pipeline._segmentation.model.specifications.powerset
+            else pipeline.segmentation.threshold,
+            # Sólo si no es torch: no invalida las entradas previas
+            **({"backend": self.backend} if self.backend != "torch" else {}),
+        )
+        return EmbeddingCache(self.embedding_cache_dir, model_key)
 
-    def _run_diarization(self, audio_path: str) -> Annotation:
+    def _run_diarization(self, audio: Union[str, np.ndarray], return_embeddings: bool = False):
         """
-        Devuelve objeto Annotation con los segmentos por hablante.
+        Devuelve objeto Annotation con los segmentos por hablante (y, con
+        return_embeddings, los centroides por etiqueta).
         Usa YAML y pesos locales desde models/pyannote.
+        Si `audio` ya es el waveform 16 kHz mono, se envuelve sin copiar.
+        Con workers > 1 (o caché de embeddings), segmentación y embeddings se
+        calculan por ventanas y se agrupan en un único clustering global.
         """
-        pipeline = load_local_pipeline(
-            models_root=self.models_root,
-            use_cuda=self.use_cuda,
-            allow_tf32=self.allow_tf32
-        )
-        waveform, sample_rate = torchaudio.load(audio_path)
-        return pipeline(
-            {"waveform": waveform, "sample_rate": sample_rate},
-            min_speakers=self.min_speakers,
-            max_speakers=self.max_speakers,
-            hook=self.progress_hook
+        pipeline = registry.get(
+            ("pyannote", self.models_root, self.use_cuda, self.allow_tf32, self.backend),
+            lambda: load_local_pipeline(
+                models_root=self.models_root,
+                use_cuda=self.use_cuda,
+                allow_tf32=self.allow_tf32,
+                backend=self.backend,
+                # Las ventanas en paralelo se reparten los núcleos
+                threads=max(1, torch.get_num_threads() // max(1, self.workers)),
+            ),
         )
+        if self.workers > 1 or self.embedding_cache_dir:
+            from src.diarization.windowed import WindowedDiarization
 
-    def diarize(self, audio_path: str) -> pd.DataFrame:
-        annotation = self._run_diarization(audio_path)
+            if isinstance(audio, str):
+                audio = load_audio(audio)           # la rejilla de ventanas asume 16 kHz
+            cache = self._embedding_cache(pipeline) if self.embedding_cache_dir else None
+            # Con torch, cada hilo lleva su copia de los modelos; las sesiones ONNX se comparten
+            return WindowedDiarization(pipeline, self.workers, cache=cache,
+                                       copy_models=self.backend == "torch")(
+                torch.from_numpy(audio).unsqueeze(0), SAMPLE_RATE,
+                self.min_speakers, self.max_speakers,
+                return_embeddings=return_embeddings,
+            )
+        if isinstance(audio, np.ndarray):
+            waveform, sample_rate = torch.from_numpy(audio).unsqueeze(0), SAMPLE_RATE
+        else:
+            waveform, sample_rate = torchaudio.load(audio)
+        # Los pasos internos de pyannote se publican en el bus (sólo si hay suscriptores)
+        hook = PyannoteHook(events) if events.enabled else None
+        try:
+            return pipeline(
+                {"waveform": waveform, "sample_rate": sample_rate},
+                min_speakers=self.min_speakers,
+                max_speakers=self.max_speakers,
+                return_embeddings=return_embeddings,
+                hook=hook
+            )
+        finally:
+            if hook is not None:
+                hook.close()
+
+    def diarize(self, audio: Union[str, np.ndarray], regions: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        DataFrame start/end/speaker. Con speaker_index, los clusters que se
+        parecen a una identidad inscrita llevan su nombre en lugar de SPEAKER_0x.
+        Con `regions` (etapa VAD compartida) se diariza el audio sin sus
+        silencios largos y los tiempos se devuelven a la escala original.
+        """
+        compactor = None
+        if regions is not None:
+            if isinstance(audio, str):
+                audio = load_audio(audio)
+            compactor = SpeechCompactor(regions, audio.shape[-1] / SAMPLE_RATE)
+            if compactor.worthwhile():
+                logger.info(
+                    f"Diarización sobre {compactor.kept_seconds / 60:.1f} de "
+                    f"{compactor.duration / 60:.1f} min (silencios largos omitidos)"
+                )
+                audio = compactor.compact(audio)
+            else:
+                compactor = None
+        names = {}
+        if self.speaker_index:
+            annotation, centroids = self._run_diarization(audio, return_embeddings=True)
+            index = VoiceprintIndex(self.speaker_index)
+            labels = annotation.labels()
+            names = {labels[k]: name for k, name in index.match(centroids, self.speaker_threshold).items()}
+            if names:
+                logger.info("Identidades reconocidas: " + ", ".join(f"{k} → {v}" for k, v in names.items()))
+        else:
+            annotation = self._run_diarization(audio)
         records = [
             {
                 "start": seg.start,
                 "end": seg.end,
-                "speaker": speaker,
+                "speaker": names.get(speaker, speaker),
             }
             for seg, _, speaker in annotation.itertracks(yield_label=True) # type: ignore
         ]
-        return pd.DataFrame.from_records(records)
+        if compactor is not None:
+            records = compactor.expand(records)
+        return pd.DataFrame.from_records(records, columns=["start", "end", "speaker"])
@@ -0,0 +1,61 @@
+# src/diarization/embedding_cache.py
+"""
+Caché en disco de segmentación + embeddings WeSpeaker por ventana.
+
+La clave es el hash del audio de la ventana (más la identidad del modelo y
+de las opciones que afectan a los embeddings), así que volver a diarizar un
+audio ya visto — con otros min/max_speakers, o un programa que repite
+fragmentos alineados con la rejilla — sólo repite el clustering.
+
+Disposición: <root>/<clave[:2]>/<clave>.npz
+"""
+import hashlib
+import logging
+import os
+import zipfile
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    def __init__(self, root: str, model_key: str):
+        self.root = Path(root)
+        self.model_key = model_key
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, samples: np.ndarray) -> str:
+        h = hashlib.blake2b(self.model_key.encode(), digest_size=20)
+        h.update(np.ascontiguousarray(samples, dtype=np.float32).data)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.npz"
+
+    def load(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]]:
+        path = self._path(key)
+        try:
+            with np.load(path) as z:
+                emb = z["embeddings"] if "embeddings" in z.files else None
+                out = (z["segmentations"], z["binarized"], emb)
+        except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile):     # ausente o corrupta
+            self.misses += 1
+            return None
+        self.hits += 1
+        return out
+
+    def save(self, key: str, segmentations: np.ndarray, binarized: np.ndarray,
+             embeddings: Optional[np.ndarray]) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {"segmentations": segmentations, "binarized": binarized}
+        if embeddings is not None:
+            arrays["embeddings"] = embeddings
+        tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
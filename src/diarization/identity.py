@@ -0,0 +1,158 @@
+# src/diarization/identity.py
+"""
+Índice de identidades de hablante entre archivos.
+
+Guarda una huella (embedding WeSpeaker medio, normalizado L2) por persona
+inscrita en un único .npz. Tras diarizar, cada cluster se compara por
+coseno (búsqueda exacta con NumPy: una matmul K×N) con las huellas y, si
+supera el umbral, SPEAKER_0x se renombra con el nombre inscrito. Cada
+identidad se asigna como mucho a un cluster por archivo.
+
+CLI:
+    python -m src.diarization.identity --index hablantes.npz enroll "Ana" audio.wav --start 12 --end 45
+    python -m src.diarization.identity --index hablantes.npz list
+    python -m src.diarization.identity --index hablantes.npz remove "Ana"
+"""
+import argparse
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.5     # similitud coseno mínima para aceptar una identidad
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    norm = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norm, 1e-12)
+
+
+def index_fingerprint(path: Optional[str]) -> Optional[str]:
+    """Hash del archivo de índice (para claves de caché); None si no existe."""
+    if not path or not Path(path).exists():
+        return None
+    return hashlib.sha1(Path(path).read_bytes()).hexdigest()
+
+
+class VoiceprintIndex:
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.names: list = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.counts = np.zeros(0, dtype=np.int64)
+        if self.path.exists():
+            with np.load(self.path, allow_pickle=False) as z:
+                self.names = [str(n) for n in z["names"]]
+                self.vectors = z["vectors"].astype(np.float32)
+                self.counts = z["counts"].astype(np.int64)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, name: str, embedding: np.ndarray) -> None:
+        """Inscribe (o refuerza con media ponderada) la huella de `name`."""
+        emb = _normalize(embedding.reshape(-1))
+        if name in self.names:
+            i = self.names.index(name)
+            n = self.counts[i]
+            self.vectors[i] = _normalize(self.vectors[i] * n + emb)
+            self.counts[i] = n + 1
+            return
+        self.vectors = emb[None] if len(self) == 0 else np.vstack([self.vectors, emb[None]])
+        self.names.append(name)
+        self.counts = np.append(self.counts, 1)
+
+    def remove(self, name: str) -> bool:
+        if name not in self.names:
+            return False
+        i = self.names.index(name)
+        del self.names[i]
+        self.vectors = np.delete(self.vectors, i, axis=0)
+        self.counts = np.delete(self.counts, i)
+        return True
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("wb") as f:
+            np.savez(f, names=np.array(self.names, dtype=str), vectors=self.vectors, counts=self.counts)
+        os.replace(tmp, self.path)
+
+    def match(self, centroids: np.ndarray, threshold: float = DEFAULT_THRESHOLD) -> Dict[int, str]:
+        """
+        Asigna identidades a clusters: {índice de cluster: nombre}.
+        Emparejamiento voraz por similitud decreciente, uno a uno.
+        """
+        if len(self) == 0 or centroids is None or len(centroids) == 0:
+            return {}
+        sims = _normalize(centroids) @ self.vectors.T            # (K, N)
+        sims = np.nan_to_num(sims, nan=-np.inf)                   # centroide NaN: sin identidad
+        out: Dict[int, str] = {}
+        used = set()
+        for flat in np.argsort(sims, axis=None)[::-1]:
+            k, n = divmod(int(flat), sims.shape[1])
+            if sims[k, n] < threshold:
+                break
+            if k in out or n in used:
+                continue
+            out[k] = self.names[n]
+            used.add(n)
+        return out
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+def _embed(audio_file: str, start: Optional[float], end: Optional[float], models_root: str) -> np.ndarray:
+    import torch
+    from whisperx.audio import SAMPLE_RATE, load_audio
+
+    from src.diarization.pipeline_loader import load_local_pipeline
+
+    audio = load_audio(audio_file)
+    s0 = int((start or 0.0) * SAMPLE_RATE)
+    s1 = int(end * SAMPLE_RATE) if end is not None else audio.shape[-1]
+    pipeline = load_local_pipeline(models_root=models_root, use_cuda=torch.cuda.is_available())
+    waveform = torch.from_numpy(audio[s0:s1]).reshape(1, 1, -1)
+    return pipeline._embedding(waveform)[0]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Índice de identidades de hablante")
+    parser.add_argument("--index", required=True, help="Archivo .npz del índice")
+    parser.add_argument("--models-root", default="models/pyannote")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_enroll = sub.add_parser("enroll", help="Inscribe a una persona desde un tramo de audio con su voz")
+    p_enroll.add_argument("name")
+    p_enroll.add_argument("audio")
+    p_enroll.add_argument("--start", type=float, default=None)
+    p_enroll.add_argument("--end", type=float, default=None)
+    sub.add_parser("list", help="Lista las identidades inscritas")
+    p_remove = sub.add_parser("remove", help="Elimina una identidad")
+    p_remove.add_argument("name")
+    args = parser.parse_args(argv)
+
+    index = VoiceprintIndex(args.index)
+    if args.cmd == "enroll":
+        index.add(args.name, _embed(args.audio, args.start, args.end, args.models_root))
+        index.save()
+        print(f"{args.name}: inscrita ({len(index)} identidades)")
+    elif args.cmd == "list":
+        for name, n in zip(index.names, index.counts):
+            print(f"{name}\t{n} muestras")
+    elif args.cmd == "remove":
+        if index.remove(args.name):
+            index.save()
+            print(f"{args.name}: eliminada")
+        else:
+            print(f"{args.name}: no existe")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# src/diarization/onnx_backend.py
+"""
+Backend ONNX Runtime (CPU) para la segmentación y los embeddings de pyannote.
+
+Los checkpoints de la config (segmentation-3.0 y WeSpeaker ResNet34) se
+exportan una vez a `models/pyannote/onnx/` y el pipeline ya cargado pasa a
+ejecutarlos con ONNX Runtime: optimizaciones de grafo completas, hilos
+intra-op configurables y, opcionalmente, pesos int8 (cuantización dinámica).
+
+Sólo se sustituye la parte de red neuronal; el resto del pipeline no cambia:
+• segmentación: forward(waveforms) del modelo que usa Inference
+• embeddings: el tronco convolucional de la ResNet (fbank → frames); fbank,
+  StatsPool ponderado (utils/monkeypatch_pooling.py) y capas lineales siguen
+  en torch, así que las máscaras por hablante funcionan igual.
+
+Requiere una pyannote.audio cuya ResNet separe tronco y cabeza
+(forward_frames / forward_embedding); con versiones anteriores
+resolve_backend vuelve a torch.
+
+CLI (paridad DER y velocidad frente a torch en CPU):
+    python -m src.diarization.onnx_backend tests/data/test_audio.wav [--int8] [--max-der 0.02]
+(tests/test_onnx_backend.py aplica el mismo umbral si hay modelos y audio de prueba)
+"""
+import importlib.util
+import logging
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("auto", "torch", "onnx", "onnx-int8")
+OPSET = 17
+MAX_DER = 0.02              # DER máximo de ONNX frente a torch (CLI y tests)
+
+
+def _onnxruntime():
+    try:
+        import onnxruntime as ort
+    except ImportError as e:
+        raise ImportError(
+            "--diarize-backend onnx requiere onnxruntime (pip install onnxruntime)"
+        ) from e
+    return ort
+
+
+@lru_cache(maxsize=None)
+def onnx_supported() -> bool:
+    """
+    ¿Tiene la ResNet de WeSpeaker de la pyannote.audio instalada
+    forward_frames y forward_embedding? No todas las versiones que admite
+    requirements.txt los tienen.
+    """
+    try:
+        from pyannote.audio.models.embedding.wespeaker.resnet import ResNet
+    except ImportError:
+        ok = False
+    else:
+        ok = hasattr(ResNet, "forward_frames") and hasattr(ResNet, "forward_embedding")
+    if not ok:
+        logger.warning("Esta versión de pyannote.audio no separa tronco y cabeza de la ResNet "
+                       "(forward_frames/forward_embedding): diarización con torch")
+    return ok
+
+
+def resolve_backend(backend: str, device: str) -> str:
+    """
+    Backend efectivo: ONNX sólo en CPU; "auto" lo elige si onnxruntime está
+    instalado y, si no, vuelve a torch. Con una pyannote.audio sin
+    forward_frames/forward_embedding, siempre torch.
+    """
+    if device != "cpu":
+        return "torch"
+    if backend == "auto":
+        backend = "onnx" if importlib.util.find_spec("onnxruntime") is not None else "torch"
+    if backend != "torch" and not onnx_supported():
+        return "torch"
+    return backend
+
+
+# ----------------------------------------------------------------------
+# Exportación
+# ----------------------------------------------------------------------
+class _EmbeddingTrunk(torch.nn.Module):
+    """fbank (B, T, 80) → frames (B, C, F', T') de la ResNet de WeSpeaker."""
+
+    def __init__(self, resnet: torch.nn.Module):
+        super().__init__()
+        self.resnet = resnet
+
+    def forward(self, fbank: torch.Tensor) -> torch.Tensor:
+        return self.resnet.forward_frames(fbank)
+
+
+def _export(module: torch.nn.Module, example: torch.Tensor, path: Path,
+            input_name: str, output_name: str, dynamic: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    module.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            module, (example,), str(tmp),
+            input_names=[input_name], output_names=[output_name],
+            dynamic_axes={input_name: dynamic, output_name: {0: "batch"}},
+            opset_version=OPSET, do_constant_folding=True,
+        )
+    tmp.replace(path)          # atómico: una exportación interrumpida no deja un .onnx a medias
+
+
+def export_segmentation(model: torch.nn.Module, path: Path) -> None:
+    num_samples = int(model.specifications.duration * model.hparams.sample_rate)
+    example = torch.zeros(1, model.hparams.num_channels, num_samples)
+    _export(model, example, path, "waveforms", "scores", {0: "batch", 2: "samples"})
+
+
+def export_embedding(model: torch.nn.Module, path: Path) -> None:
+    example = torch.zeros(1, 200, model.hparams.num_mel_bins)      # 2 s de fbank
+    _export(_EmbeddingTrunk(model.resnet), example, path, "fbank", "frames", {0: "batch", 1: "frames"})
+
+
+def quantize(src: Path, dst: Path) -> None:
+    """Cuantización dinámica: pesos int8, activaciones cuantizadas al vuelo."""
+    _onnxruntime()
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp = dst.with_suffix(".tmp")
+    quantize_dynamic(str(src), str(tmp), weight_type=QuantType.QInt8)
+    tmp.replace(dst)
+
+
+def ensure_onnx(model: torch.nn.Module, checkpoint: str, onnx_dir: Path, kind: str, int8: bool) -> Path:
+    """
+    Ruta del .onnx de `checkpoint`; lo exporta (y cuantiza) si falta o si el
+    checkpoint es más reciente.
+    """
+    ckpt = Path(checkpoint)
+    fp32 = onnx_dir / f"{ckpt.stem}.onnx"
+    stale = not fp32.exists() or (ckpt.exists() and ckpt.stat().st_mtime > fp32.stat().st_mtime)
+    if stale:
+        t0 = time.perf_counter()
+        (export_segmentation if kind == "segmentation" else export_embedding)(model, fp32)
+        logger.info(f"{kind} exportado a {fp32} en {time.perf_counter() - t0:.1f} s")
+    if not int8:
+        return fp32
+    q = onnx_dir / f"{ckpt.stem}.int8.onnx"
+    if stale or not q.exists():
+        quantize(fp32, q)
+        logger.info(f"{kind} cuantizado a int8 en {q}")
+    return q
+
+
+# ----------------------------------------------------------------------
+# Sesiones y conexión con el pipeline
+# ----------------------------------------------------------------------
+def make_session(path: Path, threads: int):
+    ort = _onnxruntime()
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    return ort.InferenceSession(str(path), sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def apply_onnx_backend(pipeline, onnx_dir: str = "models/pyannote/onnx", int8: bool = False,
+                       threads: Optional[int] = None):
+    """
+    Sustituye in situ las redes de segmentación y embeddings de un
+    SpeakerDiarization cargado en CPU por sesiones de ONNX Runtime.
+    InferenceSession.run es thread-safe: las ventanas de windowed.py pueden
+    compartir el pipeline.
+    """
+    threads = threads or torch.get_num_threads()
+    onnx_dir = Path(onnx_dir)
+    emb_model = pipeline._embedding.model_
+    # Antes de tocar nada: sin ellos quedaría el pipeline a medio sustituir
+    if not (hasattr(emb_model.resnet, "forward_frames") and hasattr(emb_model.resnet, "forward_embedding")):
+        raise RuntimeError("El backend ONNX requiere una pyannote.audio con ResNet.forward_frames/forward_embedding")
+
+    seg_model = pipeline._segmentation.model
+    seg = make_session(ensure_onnx(seg_model, pipeline.segmentation_model, onnx_dir, "segmentation", int8),
+                       threads)
+
+    def segmentation_forward(waveforms: torch.Tensor) -> torch.Tensor:
+        return torch.from_numpy(seg.run(None, {"waveforms": waveforms.contiguous().numpy()})[0])
+
+    seg_model.forward = segmentation_forward
+
+    emb = make_session(ensure_onnx(emb_model, pipeline.embedding, onnx_dir, "embedding", int8), threads)
+    resnet = emb_model.resnet
+
+    def resnet_forward(fbank: torch.Tensor, weights: Optional[torch.Tensor] = None):
+        frames = torch.from_numpy(emb.run(None, {"fbank": fbank.contiguous().numpy()})[0])
+        return resnet.forward_embedding(frames, weights=weights)
+
+    resnet.forward = resnet_forward
+    logger.info(f"Diarización con ONNX Runtime ({'int8' if int8 else 'fp32'}, {threads} hilos)")
+    return pipeline
+
+
+# ----------------------------------------------------------------------
+# CLI: paridad (DER) y velocidad frente al backend torch
+# ----------------------------------------------------------------------
+def compare_backends(audio: str, models_root: str = "models/pyannote", int8: bool = False,
+                     min_speakers: Optional[int] = None, max_speakers: Optional[int] = None) -> dict:
+    """
+    Diariza `audio` en CPU con torch y con ONNX Runtime. Devuelve
+    {"der": DER de ONNX tomando torch como referencia, "duration": s,
+     "runs": {backend: (Annotation, segundos)}}.
+    """
+    from pyannote.metrics.diarization import DiarizationErrorRate
+    from whisperx.audio import SAMPLE_RATE, load_audio
+
+    from src.diarization.pipeline_loader import load_local_pipeline
+
+    waveform = torch.from_numpy(load_audio(audio)).unsqueeze(0)
+    runs = {}
+    for backend in ("torch", "onnx-int8" if int8 else "onnx"):
+        pipeline = load_local_pipeline(models_root=models_root, use_cuda=False, backend=backend)
+        t0 = time.perf_counter()
+        runs[backend] = (pipeline(
+            {"waveform": waveform, "sample_rate": SAMPLE_RATE},
+            min_speakers=min_speakers, max_speakers=max_speakers,
+        ), time.perf_counter() - t0)
+
+    (reference, _), (hypothesis, _) = runs.values()
+    return {
+        "der": float(DiarizationErrorRate()(reference, hypothesis)),
+        "duration": waveform.shape[1] / SAMPLE_RATE,
+        "runs": runs,
+    }
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compara el backend ONNX Runtime con torch en CPU")
+    parser.add_argument("audio")
+    parser.add_argument("--int8", action="store_true", help="Pesos cuantizados a int8")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--models-root", default="models/pyannote")
+    parser.add_argument("--max-der", type=float, default=MAX_DER,
+                        help=f"DER máximo de ONNX respecto a torch (por defecto {MAX_DER})")
+    parser.add_argument("--min-speakers", type=int, default=None)
+    parser.add_argument("--max-speakers", type=int, default=None)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    report = compare_backends(args.audio, args.models_root, args.int8, args.min_speakers, args.max_speakers)
+    (_, t_torch), (_, t_onnx) = report["runs"].values()
+    for backend, (annotation, seconds) in report["runs"].items():
+        print(f"{backend:10s}: {seconds:8.1f} s  RTF {seconds / report['duration']:6.3f}  "
+              f"({len(annotation.labels())} hablantes)")
+    print(f"speedup   : {t_torch / max(t_onnx, 1e-9):8.2f}×")
+    print(f"DER rel.  : {report['der']:8.2%}  (máx. {args.max_der:.2%})")
+    return 0 if report["der"] <= args.max_der else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
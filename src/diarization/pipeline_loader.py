@@ -1,5 +1,6 @@
 #./src/diarization/pipeline_loader.py
 from pathlib import Path
+from typing import Optional
 from pyannote.audio import Pipeline
 import torch, logging
 import os
@@ -13,6 +14,8 @@ def load_local_pipeline(
     models_root: str = "models/pyannote",
     use_cuda: bool = True,
     allow_tf32: bool = False,
+    backend: str = "torch",
+    threads: Optional[int] = None,
 ) -> Pipeline:
     """
     Carga un pipeline de diarización desde config local.
@@ -23,21 +26,34 @@ def load_local_pipeline(
       - use_cuda: si es False, fuerza CPU.
       - allow_tf32: si es True, habilita TF32 para optimizar rendimiento,
         aunque los resultados pueden variar ligeramente.
+      - backend: "onnx"/"onnx-int8" ejecuta segmentación y embeddings con
+        ONNX Runtime cuando el pipeline queda en CPU (ver onnx_backend.py).
+      - threads: hilos intra-op de ONNX Runtime (por defecto los de torch).
 
     Retorna:
       Instancia de pyannote.audio.Pipeline en CPU o GPU.
     """
+    import src.utils.monkeypatch_pooling  # noqa: F401  (parche de StatsPool, sólo al diarizar)
+
     cfg = Path(models_root) / cfg_name
     pipeline = Pipeline.from_pretrained(cfg)
 
+    def on_cpu() -> Pipeline:
+        if backend.startswith("onnx"):
+            from src.diarization.onnx_backend import apply_onnx_backend
+
+            apply_onnx_backend(pipeline, onnx_dir=str(Path(models_root) / "onnx"),
+                               int8=backend == "onnx-int8", threads=threads)
+        return pipeline
+
     # Decide si usar GPU o no
     if not use_cuda:
         logging.info("Forzando CPU por opción del usuario")
-        return pipeline
+        return on_cpu()
 
     if not torch.cuda.is_available():
         logging.info("CUDA no disponible → se usará CPU")
-        return pipeline
+        return on_cpu()
 
     try:
         idx = 0
@@ -57,5 +73,6 @@ def load_local_pipeline(
             logging.info("TF32 deshabilitado para máxima reproducibilidad en Speaker Diarization")
     except Exception as err:
         logging.warning("Fallo al activar GPU, continúo en CPU (%s)", err)
+        return on_cpu()
 
     return pipeline
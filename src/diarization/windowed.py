@@ -0,0 +1,298 @@
+# src/diarization/windowed.py
+"""
+Diarización por ventanas con re-clustering global.
+
+El pipeline de pyannote recorre el audio con ventanas de segmentación de
+`duration` s y paso `step`; para cada ventana (chunk) extrae embeddings por
+hablante local y al final agrupa TODOS los embeddings en un único
+clustering. Las dos primeras etapas son independientes por chunk, así que
+aquí el audio se corta en ventanas largas alineadas con la rejilla de chunks
+(el inicio de cada una es múltiplo de `step`, con solape de duration − step):
+
+    ventana 0: chunks [0, n)      ventana 1: chunks [n, 2n)      …
+
+Cada ventana calcula segmentación + embeddings en un pool de hilos, cada hilo
+con su propia copia de los modelos de inferencia (ver _WorkerView); los
+resultados se concatenan en el mismo orden y el resto de
+SpeakerDiarization.apply (conteo, clustering, reconstrucción) se ejecuta una
+sola vez sobre el conjunto. Al ser la misma rejilla, la entrada del clustering
+coincide con la de una pasada única (salvo redondeos de lote).
+
+Uso directo para comparar con la pasada única:
+    python -m src.diarization.windowed audio.wav --workers 8
+"""
+import copy
+import logging
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+import numpy as np
+import torch
+from pyannote.audio.utils.signal import binarize
+from pyannote.core import Annotation, SlidingWindow, SlidingWindowFeature
+
+from src.diarization.embedding_cache import EmbeddingCache
+from src.utils.events import events
+
+logger = logging.getLogger(__name__)
+
+WINDOW_S = 600.0        # duración aproximada de cada ventana (s)
+
+
+def window_bounds(num_samples: int, window_size: int, step_size: int,
+                  chunks_per_window: int) -> List[Tuple[int, int]]:
+    """
+    Rangos de muestras [s0, s1) de cada ventana. Todas salvo la última
+    contienen exactamente `chunks_per_window` chunks completos; la última
+    llega al final del audio y reproduce el chunk final con relleno.
+    """
+    if num_samples < window_size:
+        return [(0, num_samples)]
+    n_full = (num_samples - window_size) // step_size + 1
+    bounds = []
+    for k0 in range(0, n_full, chunks_per_window):
+        k1 = min(n_full, k0 + chunks_per_window)
+        s1 = num_samples if k1 == n_full else (k1 - 1) * step_size + window_size
+        bounds.append((k0 * step_size, s1))
+    return bounds
+
+
+@contextmanager
+def _torch_threads(n: int):
+    prev = torch.get_num_threads()
+    torch.set_num_threads(n)
+    try:
+        yield
+    finally:
+        torch.set_num_threads(prev)
+
+
+class _WorkerView:
+    """
+    El pipeline visto desde un hilo worker: sus propias copias de los objetos
+    de inferencia de segmentación y embeddings (Inference y el modelo de
+    embeddings guardan estado propio y pyannote no los garantiza reentrantes);
+    el resto de atributos (umbrales, audio, opciones) se leen del original.
+    """
+
+    def __init__(self, pipeline):
+        self._base = pipeline
+        self._segmentation = copy.deepcopy(pipeline._segmentation)
+        self._embedding = copy.deepcopy(pipeline._embedding)
+
+    def __getattr__(self, name):
+        return getattr(self._base, name)
+
+    # Los métodos de pyannote, con esta vista como self
+    def get_segmentations(self, file):
+        return type(self._base).get_segmentations(self, file)
+
+    def get_embeddings(self, file, binary_segmentations, exclude_overlap: bool = False):
+        return type(self._base).get_embeddings(self, file, binary_segmentations, exclude_overlap=exclude_overlap)
+
+
+class WindowedDiarization:
+    """
+    Envoltorio de un SpeakerDiarization ya cargado (load_local_pipeline) que
+    reparte segmentación y embeddings por ventanas entre `workers` hilos.
+    Cada hilo usa cores / workers hilos de torch y el pipeline original o una
+    copia propia de sus modelos (_WorkerView): nunca dos hilos el mismo.
+    Con copy_models=False los hilos comparten el pipeline: sólo para modelos
+    reentrantes (backend ONNX: InferenceSession.run es thread-safe).
+    """
+
+    def __init__(self, pipeline, workers: int, window_s: float = WINDOW_S,
+                 cache: Optional[EmbeddingCache] = None, copy_models: bool = True):
+        self.pipeline = pipeline
+        self.workers = max(1, workers)
+        self.window_s = window_s
+        self.cache = cache      # segmentación + embeddings por ventana ya vista
+        self.copy_models = copy_models
+
+    def _local(self, file: dict, need_embeddings: bool, pipeline=None):
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(file["waveform"].numpy())
+            hit = self.cache.load(key)
+            if hit is not None and (hit[2] is not None or not need_embeddings):
+                return hit
+        out = self._compute(file, need_embeddings, pipeline or self.pipeline)
+        if key is not None:
+            self.cache.save(key, *out)
+        return out
+
+    @staticmethod
+    def _compute(file: dict, need_embeddings: bool, p):
+        seg = p.get_segmentations(file)
+        if p._segmentation.model.specifications.powerset:
+            binarized = seg
+        else:
+            binarized = binarize(seg, onset=p.segmentation.threshold, initial_state=False)
+        emb = None
+        if need_embeddings:
+            emb = p.get_embeddings(file, binarized, exclude_overlap=p.embedding_exclude_overlap)
+        return seg.data, binarized.data, emb
+
+    def __call__(self, waveform: torch.Tensor, sample_rate: int,
+                 min_speakers: Optional[int] = None, max_speakers: Optional[int] = None,
+                 return_embeddings: bool = False):
+        """
+        Devuelve la Annotation; con return_embeddings, (Annotation, centroides)
+        con una fila por etiqueta en el orden de diarization.labels().
+        """
+        p = self.pipeline
+        t0 = time.perf_counter()
+        num_speakers, min_speakers, max_speakers = p.set_num_speakers(
+            num_speakers=None, min_speakers=min_speakers, max_speakers=max_speakers,
+        )
+        seg_inf = p._segmentation
+        window_size = seg_inf.model.audio.get_num_samples(seg_inf.duration)
+        step_size = round(seg_inf.step * sample_rate)
+        per_window = max(1, int(self.window_s * sample_rate) // step_size)
+        bounds = window_bounds(waveform.shape[-1], window_size, step_size, per_window)
+        need_embeddings = return_embeddings or (max_speakers >= 2 and p.klustering != "OracleClustering")
+
+        # Un pipeline por hilo a la vez: el original y sus copias, creadas aquí
+        # antes de que ningún hilo use los modelos
+        views: queue.SimpleQueue = queue.SimpleQueue()
+        views.put(p)
+        for _ in range(min(self.workers, len(bounds)) - 1):
+            views.put(_WorkerView(p) if self.copy_models else p)
+
+        def run(b):
+            s0, s1 = b
+            view = views.get()
+            try:
+                return self._local(
+                    {"waveform": waveform[:, s0:s1], "sample_rate": sample_rate, "uri": f"w{s0}"},
+                    need_embeddings, view,
+                )
+            finally:
+                views.put(view)
+
+        cores = os.cpu_count() or self.workers
+        parts = []
+        with events.stage("diarize/windows", len(bounds), "vent", label="Diarize-Ventanas") as adv, \
+                _torch_threads(max(1, cores // self.workers)), \
+                ThreadPoolExecutor(self.workers, thread_name_prefix="diar-win") as pool:
+            for part in pool.map(run, bounds):     # map conserva el orden
+                parts.append(part)
+                adv(1)
+
+        sw = SlidingWindow(start=0.0, duration=seg_inf.duration, step=seg_inf.step)
+        segmentations = SlidingWindowFeature(np.concatenate([x[0] for x in parts]), sw)
+        binarized = SlidingWindowFeature(np.concatenate([x[1] for x in parts]), sw)
+        embeddings = np.concatenate([x[2] for x in parts]) if need_embeddings else None
+        file = {"waveform": waveform, "sample_rate": sample_rate, "uri": "waveform"}
+        t_local = time.perf_counter() - t0
+
+        diarization, centroids = self._global(
+            file, segmentations, binarized, embeddings,
+            num_speakers, min_speakers, max_speakers,
+        )
+        cached = f", caché {self.cache.hits}/{len(bounds)}" if self.cache is not None else ""
+        logger.info(
+            f"Diarización por ventanas: {len(bounds)} ventanas × {self.workers} workers, "
+            f"local {t_local:.1f} s + global {time.perf_counter() - t0 - t_local:.1f} s{cached}"
+        )
+        return (diarization, centroids) if return_embeddings else diarization
+
+    def _global(self, file, segmentations, binarized, embeddings,
+                num_speakers, min_speakers, max_speakers) -> Tuple[Annotation, Optional[np.ndarray]]:
+        """
+        Tramo final de SpeakerDiarization.apply (pyannote.audio 3.x) sobre los
+        resultados concatenados: conteo, clustering único y reconstrucción.
+        Los centroides se devuelven en el orden de diarization.labels().
+        """
+        p = self.pipeline
+        num_chunks, _, local_num_speakers = binarized.data.shape
+        with events.stage("diarize/speaker_counting", progress=False):
+            count = p.speaker_count(binarized, p._segmentation.model.receptive_field, warm_up=(0.0, 0.0))
+        if np.nanmax(count.data) == 0.0:
+            return Annotation(uri=file["uri"]), None
+
+        centroids = None
+        if embeddings is None and max_speakers < 2:
+            hard_clusters = np.zeros((num_chunks, local_num_speakers), dtype=np.int8)
+        else:
+            with events.stage("diarize/clustering", progress=False):
+                hard_clusters, _, centroids = p.clustering(
+                    embeddings=embeddings,
+                    segmentations=binarized,
+                    num_clusters=num_speakers,
+                    min_clusters=min_speakers,
+                    max_clusters=max_speakers,
+                    file=file,
+                    frames=p._segmentation.model.receptive_field,
+                )
+
+        count.data = np.minimum(count.data, max_speakers).astype(np.int8)
+        inactive = np.sum(binarized.data, axis=1) == 0
+        hard_clusters[inactive] = -2
+        with events.stage("diarize/reconstruct", progress=False):
+            discrete = p.reconstruct(segmentations, hard_clusters, count)
+            diarization = p.to_annotation(
+                discrete, min_duration_on=0.0, min_duration_off=p.segmentation.min_duration_off,
+            )
+        diarization.uri = file["uri"]
+        mapping = {label: expected for label, expected in zip(diarization.labels(), p.classes())}
+        diarization = diarization.rename_labels(mapping=mapping)
+
+        if centroids is not None:
+            if len(diarization.labels()) > centroids.shape[0]:
+                centroids = np.pad(centroids, ((0, len(diarization.labels()) - centroids.shape[0]), (0, 0)))
+            inverse = {label: index for index, label in mapping.items()}
+            centroids = centroids[[inverse[label] for label in diarization.labels()]]
+        return diarization, centroids
+
+
+# ----------------------------------------------------------------------
+# CLI: speedup frente a la pasada única de load_local_pipeline
+# ----------------------------------------------------------------------
+def main(argv=None) -> None:
+    import argparse
+    from pyannote.metrics.diarization import DiarizationErrorRate
+    from whisperx.audio import SAMPLE_RATE, load_audio
+
+    from src.diarization.pipeline_loader import load_local_pipeline
+
+    parser = argparse.ArgumentParser(description="Compara diarización por ventanas con la pasada única")
+    parser.add_argument("audio")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--window-s", type=float, default=WINDOW_S)
+    parser.add_argument("--device", default="cpu", choices=["cpu", "cuda"])
+    parser.add_argument("--models-root", default="models/pyannote")
+    parser.add_argument("--min-speakers", type=int, default=None)
+    parser.add_argument("--max-speakers", type=int, default=None)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    pipeline = load_local_pipeline(models_root=args.models_root, use_cuda=args.device == "cuda")
+    waveform = torch.from_numpy(load_audio(args.audio)).unsqueeze(0)
+
+    t0 = time.perf_counter()
+    single = pipeline(
+        {"waveform": waveform, "sample_rate": SAMPLE_RATE},
+        min_speakers=args.min_speakers, max_speakers=args.max_speakers,
+    )
+    t_single = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    windowed = WindowedDiarization(pipeline, args.workers, args.window_s)(
+        waveform, SAMPLE_RATE, args.min_speakers, args.max_speakers,
+    )
+    t_windowed = time.perf_counter() - t0
+
+    der = DiarizationErrorRate()(single, windowed)
+    print(f"pasada única : {t_single:8.1f} s  ({len(single.labels())} hablantes)")
+    print(f"por ventanas : {t_windowed:8.1f} s  ({len(windowed.labels())} hablantes)")
+    print(f"speedup      : {t_single / max(t_windowed, 1e-9):8.2f}×")
+    print(f"DER relativo : {der:8.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# src/formatting/columnar.py
+"""
+Salida columnar (Parquet / Arrow IPC) para análisis sin parsear JSON.
+
+Se escriben dos tablas planas junto a la ruta de salida:
+
+    <base>.segments.<ext>   segment, start, end, text, speaker, avg_logprob, n_words
+    <base>.words.<ext>      segment, start, end, score, word, speaker
+
+`speaker` es una columna dictionary<int32, string>; `segment` enlaza cada
+palabra con su segmento. Cada write() añade un row group (Parquet) o un
+record batch (Arrow), así que la salida incremental funciona igual que con
+JSONL. Como JsonlStreamWriter, se escribe en .part y close() renombra.
+
+pyarrow es una dependencia opcional: sólo se importa al usar estos formatos.
+"""
+import logging
+import os
+from pathlib import Path
+from typing import Iterable, Union
+
+import numpy as np
+
+from src.formatting.transcript import Transcript
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ("jsonl", "parquet", "arrow")
+_EXT = {"parquet": "parquet", "arrow": "arrow"}
+ROW_GROUP_SEGMENTS = 4096       # segmentos por row group en escritura no incremental
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "--output-format parquet/arrow requiere pyarrow (pip install pyarrow)"
+        ) from e
+    return pa, pq
+
+
+def columnar_paths(output: str, fmt: str) -> tuple:
+    """(ruta segmentos, ruta palabras) derivadas de la salida pedida."""
+    base = Path(output)
+    if base.suffix in (".jsonl", "." + _EXT[fmt]):
+        base = base.with_suffix("")
+    return (
+        base.with_name(f"{base.name}.segments.{_EXT[fmt]}"),
+        base.with_name(f"{base.name}.words.{_EXT[fmt]}"),
+    )
+
+
+class ColumnarWriter:
+    """
+    Mismo contrato que JsonlStreamWriter (write / abort / close) para Parquet
+    o Arrow IPC. No admite reanudación: resume_from siempre es 0.
+    """
+
+    def __init__(self, output: str, fmt: str):
+        pa, pq = _pyarrow()
+        self._pa, self._pq, self.fmt = pa, pq, fmt
+        self.seg_path, self.word_path = columnar_paths(output, fmt)
+        self.resume_from = 0.0
+        self.count = 0
+        self.speakers: list = []    # diccionario global (sólo crece → deltas válidos en IPC)
+
+        spk = pa.dictionary(pa.int32(), pa.string())
+        self.seg_schema = pa.schema([
+            ("segment", pa.int32()), ("start", pa.float64()), ("end", pa.float64()),
+            ("text", pa.string()), ("speaker", spk), ("avg_logprob", pa.float64()),
+            ("n_words", pa.int32()),
+        ])
+        self.word_schema = pa.schema([
+            ("segment", pa.int32()), ("start", pa.float64()), ("end", pa.float64()),
+            ("score", pa.float64()), ("word", pa.string()), ("speaker", spk),
+        ])
+        self._parts = [self._part(p) for p in (self.seg_path, self.word_path)]
+        self._writers = [
+            self._open(part, schema)
+            for part, schema in zip(self._parts, (self.seg_schema, self.word_schema))
+        ]
+
+    @staticmethod
+    def _part(path: Path) -> Path:
+        return path.with_name(path.name + ".part")
+
+    def _open(self, path: Path, schema):
+        if self.fmt == "parquet":
+            return self._pq.ParquetWriter(str(path), schema)
+        opts = self._pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        return self._pa.ipc.new_file(str(path), schema, options=opts)
+
+    def _speaker_array(self, codes: np.ndarray, local: list):
+        """Traduce códigos locales del Transcript al diccionario global."""
+        for s in local:
+            if s not in self.speakers:
+                self.speakers.append(s)
+        lut = np.array([self.speakers.index(s) for s in local] + [-1], dtype=np.int32)
+        idx = lut[codes]                     # código -1 → último elemento → -1
+        pa = self._pa
+        return pa.DictionaryArray.from_arrays(
+            pa.array(idx, mask=idx < 0, type=pa.int32()),
+            pa.array(self.speakers, type=pa.string()),
+        )
+
+    def _write(self, writer, table) -> None:
+        if self.fmt == "parquet":
+            writer.write_table(table)
+        else:
+            for rb in table.to_batches():
+                writer.write_batch(rb)
+
+    def write(self, segments: Union[Iterable[dict], Transcript]) -> None:
+        """Añade un lote de segmentos (dicts o Transcript) como un row group."""
+        pa = self._pa
+        tr = segments if isinstance(segments, Transcript) else Transcript.from_result({"segments": list(segments)})
+        seg, words = tr.segment_columns(), tr.word_columns()
+
+        # Como en JSONL, se omiten los segmentos sin texto (y sus palabras)
+        keep = np.fromiter((bool(t.strip()) for t in seg["text"]), dtype=bool, count=len(tr))
+        if not keep.any():
+            return
+        seg_id = np.cumsum(keep, dtype=np.int32) - 1 + self.count
+        w_keep = keep[words["segment"]]
+
+        seg_tbl = pa.Table.from_arrays([
+            pa.array(seg_id[keep]),
+            pa.array(seg["start"][keep]), pa.array(seg["end"][keep]),
+            pa.array([t for t, k in zip(seg["text"], keep) if k], type=pa.string()),
+            self._speaker_array(seg["speaker"][keep], tr.speakers),
+            pa.array(seg["avg_logprob"][keep], from_pandas=True),
+            pa.array(seg["n_words"][keep]),
+        ], schema=self.seg_schema)
+        word_tbl = pa.Table.from_arrays([
+            pa.array(seg_id[words["segment"][w_keep]]),
+            pa.array(words["start"][w_keep], from_pandas=True),
+            pa.array(words["end"][w_keep], from_pandas=True),
+            pa.array(words["score"][w_keep], from_pandas=True),
+            pa.array([w for w, k in zip(words["word"], w_keep) if k], type=pa.string()),
+            self._speaker_array(words["speaker"][w_keep], tr.speakers),
+        ], schema=self.word_schema)
+
+        self._write(self._writers[0], seg_tbl)
+        if word_tbl.num_rows:
+            self._write(self._writers[1], word_tbl)
+        self.count += int(keep.sum())
+
+    def abort(self) -> None:
+        """Cierra sin renombrar (los .part quedan para inspección)."""
+        for w in self._writers:
+            w.close()
+
+    def close(self) -> str:
+        for w in self._writers:
+            w.close()
+        for part, final in zip(self._parts, (self.seg_path, self.word_path)):
+            os.replace(part, final)
+        logger.info(f"Salida {self.fmt}: {self.seg_path} y {self.word_path} ({self.count} segmentos)")
+        return str(self.seg_path)
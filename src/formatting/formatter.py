@@ -1,25 +1,141 @@
 # src/formatting/formatter.py
 
 import json
+import logging
+import os
 from pathlib import Path
-from whisperx.diarize import assign_word_speakers
+from typing import Iterable, Optional, Union
+from src.formatting.speaker_assign import SpeakerIndex, assign_word_speakers
+from src.formatting.transcript import Transcript
+from src.formatting.columnar import ColumnarWriter, ROW_GROUP_SEGMENTS
+from src.formatting.jsonl import SegmentEncoder, compressed_path, open_binary, write_jsonl
+
+logger = logging.getLogger(__name__)
+
+
+class JsonlStreamWriter:
+    """
+    Escritura incremental de JSONL.
+    • Los segmentos se escriben en <salida>.part y se vuelcan a disco en cada
+      write(), así que un fallo conserva todo lo ya finalizado.
+    • close() renombra .part → salida de forma atómica.
+    • resume=True reutiliza un .part previo: descarta una última línea
+      incompleta y expone en `resume_from` el fin (s) del último segmento.
+    • precision / compress: ver formatting/jsonl.py (sin reanudación si se comprime).
+    """
+
+    def __init__(self, output_jsonl: str, resume: bool = False,
+                 precision: Optional[int] = None, compress: str = "none"):
+        if resume and compress != "none":
+            raise ValueError("--resume no admite salida comprimida")
+        self.out_path = Path(compressed_path(output_jsonl, compress))
+        self.part_path = self.out_path.with_name(self.out_path.name + ".part")
+        self.resume_from = 0.0
+        self.count = 0
+        self._enc = SegmentEncoder(precision)
+        if resume and self.part_path.exists():
+            self._recover()
+            self._f = open_binary(self.part_path, compress, "ab")
+            logger.info(
+                f"Reanudando {self.part_path}: {self.count} segmentos, "
+                f"desde {self.resume_from:.2f} s"
+            )
+        else:
+            self._f = open_binary(self.part_path, compress, "wb")
+
+    def _recover(self) -> None:
+        valid = []
+        # En bytes: el corte puede caer a mitad de un carácter UTF-8 (ñ, tildes)
+        with self.part_path.open("rb") as f:
+            for line in f:
+                try:
+                    seg = json.loads(line)
+                except ValueError:
+                    break           # línea truncada por el corte: se descarta
+                valid.append(line if line.endswith(b"\n") else line + b"\n")
+                self.resume_from = max(self.resume_from, float(seg.get("end", 0.0)))
+        tmp = self.part_path.with_name(self.part_path.name + ".tmp")
+        with tmp.open("wb") as f:
+            f.writelines(valid)
+        os.replace(tmp, self.part_path)
+        self.count = len(valid)
+
+    def write(self, segments: Iterable[dict]) -> None:
+        data, n = self._enc.encode_many(segments)
+        self._f.write(data)
+        self._f.flush()
+        self.count += n
+
+    def abort(self) -> None:
+        """Cierra sin renombrar: el .part queda disponible para --resume."""
+        if not self._f.closed:
+            self._f.close()
+
+    def close(self) -> str:
+        self._f.close()
+        os.replace(self.part_path, self.out_path)
+        return str(self.out_path)
+
 
 class Formatter:
-    def assign_speakers(self, diarize_df, asr_result: dict) -> dict:
+    def __init__(self):
+        self._index = None      # (diarize_df, SpeakerIndex) reutilizado entre lotes
+
+    def assign_speakers(self, diarize_df, asr_result: Union[dict, Transcript]):
+        """
+        Fusiona DataFrame de dia­rización con segmentos ASR y devuelve el resultado
+        (dict o Transcript, el mismo tipo recibido).
+        El índice de turnos se construye una vez por DataFrame (salida incremental).
+        """
+        if diarize_df is None or len(diarize_df) == 0:
+            return asr_result
+        if self._index is None or self._index[0] is not diarize_df:
+            self._index = (diarize_df, SpeakerIndex(diarize_df))
+        if isinstance(asr_result, Transcript):
+            return asr_result.assign_speakers(self._index[1])
+        return assign_word_speakers(diarize_df, asr_result, index=self._index[1])
+
+    def save_jsonl(self, merged: Union[dict, Transcript], output_jsonl: str,
+                   precision: Optional[int] = None, compress: str = "none") -> str:
+        """
+        Guarda los segmentos de `merged` en formato JSONL y retorna la ruta de salida.
+        Con un Transcript, los dicts se reconstruyen de uno en uno al escribir.
+        """
+        if isinstance(merged, Transcript):
+            if precision is not None:
+                merged.round_times(precision)       # vectorizado sobre las columnas
+                precision = None
+            segments = merged.iter_segments()
+        else:
+            segments = merged["segments"]
+        return write_jsonl(segments, output_jsonl, precision=precision, compress=compress)
+
+    def save(self, merged: Union[dict, Transcript], output: str, output_format: str = "jsonl",
+             precision: Optional[int] = None, compress: str = "none") -> str:
         """
-        Fusiona DataFrame de dia­rización con segmentos ASR y devuelve el dict resultante.
+        Guarda en el formato pedido: JSONL o tablas Parquet/Arrow (ver columnar.py).
+        precision y compress sólo afectan a JSONL.
         """
-        return assign_word_speakers(diarize_df, asr_result)
+        if output_format == "jsonl":
+            return self.save_jsonl(merged, output, precision, compress)
+        writer = ColumnarWriter(output, output_format)
+        try:
+            if isinstance(merged, Transcript):
+                writer.write(merged)
+            else:
+                segs = merged["segments"]
+                for i in range(0, len(segs), ROW_GROUP_SEGMENTS):
+                    writer.write(segs[i:i + ROW_GROUP_SEGMENTS])
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.close()
 
-    def save_jsonl(self, merged: dict, output_jsonl: str) -> str:
+    def open_stream(self, output: str, resume: bool = False, output_format: str = "jsonl",
+                    precision: Optional[int] = None, compress: str = "none"):
         """
-        Guarda merged['segments'] en formato JSONL y retorna la ruta de salida.
+        Abre un escritor incremental (ver JsonlStreamWriter / ColumnarWriter).
         """
-        out_path = Path(output_jsonl)
-        with out_path.open("w", encoding="utf-8") as f:
-            for seg in merged["segments"]:
-                text = seg["text"].strip()
-                if not text:
-                    continue
-                f.write(json.dumps(seg, ensure_ascii=False) + "\n")
-        return str(out_path)
+        if output_format == "jsonl":
+            return JsonlStreamWriter(output, resume=resume, precision=precision, compress=compress)
+        return ColumnarWriter(output, output_format)
@@ -0,0 +1,131 @@
+# src/formatting/jsonl.py
+"""
+Serialización JSONL rápida.
+
+• Backend orjson si está instalado (opcional); si no, json estándar con el
+  formato de siempre (separadores ", " y ": "). orjson escribe las líneas
+  compactas, sin espacios: mismo JSON, distintos bytes.
+• NaN/±inf se escriben como null con ambos backends (JSON válido).
+• Escritura binaria con buffer grande: un write() por bloque de segmentos,
+  no uno por línea.
+• Redondeo opcional de start/end/score a `precision` decimales (segmentos,
+  palabras y caracteres).
+• Compresión opcional: gzip (stdlib) o zstd (paquete zstandard, opcional).
+"""
+import gzip
+import json
+import math
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:         # orjson es opcional
+    orjson = None
+
+COMPRESSIONS = ("none", "gzip", "zstd")
+_SUFFIX = {"gzip": ".gz", "zstd": ".zst"}
+BUFFER_BYTES = 1 << 20          # buffer del archivo sin comprimir
+SEGMENTS_PER_WRITE = 512        # segmentos codificados por write()
+_ROUND_KEYS = ("start", "end", "score")
+
+
+def compressed_path(path: str, compress: str = "none") -> str:
+    """Añade .gz / .zst a la ruta si la compresión lo requiere y aún no lo tiene."""
+    suffix = _SUFFIX.get(compress)
+    if suffix and not str(path).endswith(suffix):
+        return str(path) + suffix
+    return str(path)
+
+
+def open_binary(path, compress: str = "none", mode: str = "wb"):
+    """Abre `path` para escritura binaria con la compresión indicada."""
+    if compress == "gzip":
+        return gzip.open(path, mode, compresslevel=6)
+    if compress == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("--compress zstd requiere zstandard (pip install zstandard)") from e
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, mode))
+    return open(path, mode, buffering=BUFFER_BYTES)
+
+
+def _default(obj):
+    # Escalares NumPy que llegan desde pandas/WhisperX (np.float64, np.int64…)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"{type(obj).__name__} no es serializable a JSON")
+
+
+def _finite(obj):
+    """Copia de `obj` con NaN/±inf como None (lo que hace orjson)."""
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    return obj
+
+
+class SegmentEncoder:
+    """
+    Codifica segmentos a líneas JSONL (bytes). Con `precision`, redondea
+    in situ los tiempos y puntuaciones antes de serializar.
+    """
+
+    def __init__(self, precision: Optional[int] = None):
+        self.precision = precision
+        self.backend = "orjson" if orjson is not None else "json"
+
+    def _round(self, seg: dict) -> None:
+        p = self.precision
+        for item in (seg, *(seg.get("words") or ()), *(seg.get("chars") or ())):
+            for k in _ROUND_KEYS:
+                v = item.get(k)
+                if v is not None:
+                    item[k] = round(float(v), p)
+
+    def encode(self, seg: dict) -> bytes:
+        if self.precision is not None:
+            self._round(seg)
+        if orjson is not None:
+            return orjson.dumps(seg, default=_default, option=orjson.OPT_APPEND_NEWLINE)
+        try:
+            line = json.dumps(seg, ensure_ascii=False, allow_nan=False, default=_default)
+        except ValueError:
+            # Algún NaN/inf (p. ej. score de una palabra sin alinear): sólo entonces se copia
+            line = json.dumps(_finite(seg), ensure_ascii=False, default=_default)
+        return (line + "\n").encode("utf-8")
+
+    def encode_many(self, segments: Iterable[dict]) -> Tuple[bytes, int]:
+        """(bytes de las líneas, nº de segmentos); omite los segmentos sin texto."""
+        lines = [self.encode(seg) for seg in segments if seg["text"].strip()]
+        return b"".join(lines), len(lines)
+
+    def iter_blocks(self, segments: Iterable[dict], per_write: int = SEGMENTS_PER_WRITE) -> Iterator[bytes]:
+        it = iter(segments)
+        while True:
+            block = list(islice(it, per_write))
+            if not block:
+                return
+            data, _ = self.encode_many(block)
+            if data:
+                yield data
+
+
+def write_jsonl(segments: Iterable[dict], output: str, precision: Optional[int] = None,
+                compress: str = "none") -> str:
+    """Escribe `segments` en `output` (con sufijo de compresión) y devuelve la ruta."""
+    out_path = Path(compressed_path(output, compress))
+    enc = SegmentEncoder(precision)
+    with open_binary(out_path, compress) as f:
+        for data in enc.iter_blocks(segments):
+            f.write(data)
+    return str(out_path)
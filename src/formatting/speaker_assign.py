@@ -0,0 +1,135 @@
+# src/formatting/speaker_assign.py
+"""
+Asignación de hablantes a segmentos y palabras, vectorizada con NumPy.
+
+Equivale a whisperx.diarize.assign_word_speakers (suma de intersecciones por
+hablante y se elige la mayor), pero sin recorrer el DataFrame por cada
+segmento/palabra. Para cada hablante k se usa su cobertura acumulada
+
+    C_k(t) = Σ_i |turno_i ∩ [0, t]|
+
+de modo que la intersección total de [s, e] con los turnos de k es
+C_k(e) − C_k(s). Se evalúa para todas las consultas a la vez con
+searchsorted + sumas prefijas sobre los inicios/fines ordenados:
+O((N + M) log M) en lugar de O(N · M).
+
+C_k(e) y C_k(s) crecen con la posición en el archivo (~1e8 s acumulados en
+10 h): restarlas tal cual deja un error absoluto que crece con la duración.
+Por eso la diferencia se desarrolla por intervalo, en coordenadas relativas
+a s y con sumas prefijas compensadas (ver _prefix y SpeakerIndex.overlap).
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Ruido de redondeo de overlap(); por debajo de esto (muy inferior a la
+# resolución de 1 ms de los timestamps) no hay solape.
+_EPS = 1e-7
+
+
+def _prefix(x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sumas prefijas compensadas: hi es np.cumsum(x) y lo acumula el error de
+    redondeo de cada paso (TwoSum), de modo que hi[b] − hi[a] + lo[b] − lo[a]
+    es la suma de x[a:b] con error del orden de su propio ulp, no del de hi[b].
+    """
+    hi = np.concatenate(([0.0], np.cumsum(x)))
+    prev, cur = hi[:-1], hi[1:]
+    t = cur - prev
+    err = (prev - (cur - t)) + (x - t)
+    return hi, np.concatenate(([0.0], np.cumsum(err)))
+
+
+class SpeakerIndex:
+    """Índice de turnos por hablante, construido una sola vez por diarización."""
+
+    def __init__(self, diarize_df: pd.DataFrame):
+        self.speakers = np.array(sorted(diarize_df["speaker"].unique()), dtype=object)
+        self.starts = diarize_df["start"].to_numpy(dtype=np.float64)
+        self.ends = diarize_df["end"].to_numpy(dtype=np.float64)
+        self.labels = diarize_df["speaker"].to_numpy(dtype=object)
+        self._tables: List[Tuple[np.ndarray, ...]] = []
+        for spk in self.speakers:
+            mask = self.labels == spk
+            s = np.sort(self.starts[mask])
+            e = np.sort(self.ends[mask])
+            self._tables.append((s, *_prefix(s), e, *_prefix(e)))
+
+    def overlap(self, q_start: np.ndarray, q_end: np.ndarray) -> np.ndarray:
+        """
+        Intersección total de cada intervalo consulta con cada hablante → (N, K).
+
+        Con a/b = nº de inicios ≤ e/≤ s y c/d = nº de fines ≤ e/≤ s,
+        C_k(e) − C_k(s) = (a − c)(e − s) − Σ_(b,a] (inicio − s) + Σ_(d,c] (fin − s):
+        sólo intervienen los turnos que empiezan o acaban dentro de la consulta.
+        """
+        out = np.empty((q_start.shape[0], len(self._tables)), dtype=np.float64)
+        span = q_end - q_start
+        for k, (s, sh, sl, e, eh, el) in enumerate(self._tables):
+            a = np.searchsorted(s, q_end, side="right")
+            b = np.searchsorted(s, q_start, side="right")
+            c = np.searchsorted(e, q_end, side="right")
+            d = np.searchsorted(e, q_start, side="right")
+            starts_in = (sh[a] - sh[b]) + (sl[a] - sl[b]) - (a - b) * q_start
+            ends_in = (eh[c] - eh[d]) + (el[c] - el[d]) - (c - d) * q_start
+            out[:, k] = (a - c) * span - starts_in + ends_in
+        return out
+
+    def assign(self, q_start: np.ndarray, q_end: np.ndarray, fill_nearest: bool = False) -> np.ndarray:
+        """
+        Hablante dominante por consulta (None si no hay solape y no se rellena).
+        En empate gana el primero en orden alfabético, también al rellenar
+        (whisperX deja ese caso al orden de sort_values, que no es estable).
+        """
+        result = np.full(q_start.shape[0], None, dtype=object)
+        if q_start.shape[0] == 0 or len(self._tables) == 0:
+            return result
+        ov = self.overlap(q_start, q_end)
+        # Empates dentro del ruido de redondeo: el primero alfabéticamente
+        top = ov.max(axis=1)
+        best = (ov >= (top - _EPS)[:, None]).argmax(axis=1)
+        hit = top > _EPS
+        result[hit] = self.speakers[best[hit]]
+        if fill_nearest:
+            # Sin solape: el turno con mayor "intersección" (la menos negativa)
+            for i in np.flatnonzero(~hit):
+                inter = np.minimum(self.ends, q_end[i]) - np.maximum(self.starts, q_start[i])
+                result[i] = min(self.labels[inter >= inter.max() - _EPS])
+        return result
+
+
+def assign_word_speakers(diarize_df: pd.DataFrame, transcript_result: dict,
+                         fill_nearest: bool = False,
+                         index: Optional[SpeakerIndex] = None) -> dict:
+    """
+    Añade 'speaker' a cada segmento y a cada palabra con timestamps (in situ).
+    `index` permite reutilizar un SpeakerIndex entre llamadas (salida incremental).
+    """
+    segments = transcript_result["segments"]
+    if diarize_df is None or len(diarize_df) == 0 or not segments:
+        return transcript_result
+    index = index or SpeakerIndex(diarize_df)
+
+    # Consultas: primero todos los segmentos, luego todas las palabras
+    words = [w for seg in segments for w in seg.get("words", ()) if "start" in w]
+    n_seg = len(segments)
+    q_start = np.fromiter(
+        (seg["start"] for seg in segments), dtype=np.float64, count=n_seg
+    )
+    q_end = np.fromiter(
+        (seg["end"] for seg in segments), dtype=np.float64, count=n_seg
+    )
+    if words:
+        q_start = np.concatenate((q_start, np.fromiter((w["start"] for w in words), np.float64, len(words))))
+        q_end = np.concatenate((q_end, np.fromiter((w["end"] for w in words), np.float64, len(words))))
+
+    speakers = index.assign(q_start, q_end, fill_nearest=fill_nearest)
+    for item, spk in zip(segments, speakers[:n_seg]):
+        if spk is not None:
+            item["speaker"] = spk
+    for item, spk in zip(words, speakers[n_seg:]):
+        if spk is not None:
+            item["speaker"] = spk
+    return transcript_result
+
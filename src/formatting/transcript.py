@@ -0,0 +1,256 @@
+# src/formatting/transcript.py
+"""
+Representación columnar (struct-of-arrays) de una transcripción alineada.
+
+Cada palabra de WhisperX es un dict con word/start/end/score/speaker; en
+audios largos son cientos de miles de dicts (≈ 0,5 KB cada uno). Aquí se
+guardan en arrays contiguos con offsets por segmento:
+
+    segmentos : start, end, avg_logprob (NaN = ausente), speaker (código)
+    palabras  : start, end, score (NaN = ausente), speaker, texto concatenado
+    caracteres: start, end, score, texto (1 carácter por entrada)
+
+Los hablantes se codifican como índices en `speakers` (-1 = sin hablante).
+Los dicts sólo se reconstruyen en el borde de salida (`iter_segments`), con
+orden de claves canónico.
+"""
+from array import array
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from src.formatting.speaker_assign import SpeakerIndex
+
+_NAN = float("nan")
+
+
+def _get(d: dict, key: str) -> float:
+    v = d.get(key)
+    return _NAN if v is None else float(v)
+
+
+def _opt(out: dict, key: str, v: float) -> None:
+    if v == v:                      # NaN ≠ NaN → clave ausente
+        out[key] = v
+
+
+class Transcript:
+    def __init__(self, language: Optional[str] = None, aligned: bool = True, has_chars: bool = False):
+        self.language = language
+        self.aligned = aligned          # True → segmentos con "words"
+        self.has_chars = has_chars      # True → segmentos con "chars"
+        self.speakers: list = []
+
+        self.seg_text: list = []
+        self._seg_start, self._seg_end, self._seg_logprob = array("d"), array("d"), array("d")
+        self._seg_speaker = array("i")
+        self._seg_word_off, self._seg_char_off = array("q", [0]), array("q", [0])
+
+        self._w_start, self._w_end, self._w_score = array("d"), array("d"), array("d")
+        self._w_speaker = array("i")
+        self._w_text_parts: list = []   # un str por lote añadido
+        self._w_text_off = array("q", [0])
+
+        self._c_start, self._c_end, self._c_score = array("d"), array("d"), array("d")
+        self._c_text_parts: list = []
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_result(cls, result: dict) -> "Transcript":
+        """Convierte un resultado WhisperX ({"segments": [...]}) en columnas."""
+        segs = result["segments"]
+        tr = cls(
+            language=result.get("language"),
+            aligned=any("words" in s for s in segs),
+            has_chars=any(s.get("chars") is not None for s in segs),
+        )
+        return tr.extend(segs)
+
+    def extend(self, segments: Iterable[dict]) -> "Transcript":
+        """Añade segmentos (dicts WhisperX); los dicts pueden liberarse después."""
+        w_parts, c_parts = [], []
+        for seg in segments:
+            self.seg_text.append(seg["text"])
+            self._seg_start.append(_get(seg, "start"))
+            self._seg_end.append(_get(seg, "end"))
+            self._seg_logprob.append(_get(seg, "avg_logprob"))
+            self._seg_speaker.append(self._code(seg.get("speaker")))
+
+            for w in seg.get("words") or ():
+                w_parts.append(w["word"])
+                self._w_text_off.append(self._w_text_off[-1] + len(w["word"]))
+                self._w_start.append(_get(w, "start"))
+                self._w_end.append(_get(w, "end"))
+                self._w_score.append(_get(w, "score"))
+                self._w_speaker.append(self._code(w.get("speaker")))
+            self._seg_word_off.append(len(self._w_start))
+
+            for c in seg.get("chars") or ():
+                c_parts.append(c["char"])
+                self._c_start.append(_get(c, "start"))
+                self._c_end.append(_get(c, "end"))
+                self._c_score.append(_get(c, "score"))
+            self._seg_char_off.append(len(self._c_start))
+        if w_parts:
+            self._w_text_parts.append("".join(w_parts))
+        if c_parts:
+            self._c_text_parts.append("".join(c_parts))
+        return self
+
+    def _code(self, speaker: Optional[str]) -> int:
+        if speaker is None:
+            return -1
+        try:
+            return self.speakers.index(speaker)
+        except ValueError:
+            self.speakers.append(speaker)
+            return len(self.speakers) - 1
+
+    def __len__(self) -> int:
+        return len(self.seg_text)
+
+    @property
+    def n_words(self) -> int:
+        return len(self._w_start)
+
+    # ------------------------------------------------------------------
+    # Hablantes
+    # ------------------------------------------------------------------
+    def assign_speakers(self, index: SpeakerIndex, fill_nearest: bool = False) -> "Transcript":
+        """
+        Igual que assign_word_speakers, pero sobre las columnas: una única
+        consulta vectorizada para todos los segmentos y palabras.
+        """
+        seg_start, seg_end = np.frombuffer(self._seg_start), np.frombuffer(self._seg_end)
+        w_start, w_end = np.frombuffer(self._w_start), np.frombuffer(self._w_end)
+        has_t = ~np.isnan(w_start)
+        q_start = np.concatenate((seg_start, w_start[has_t]))
+        q_end = np.concatenate((seg_end, w_end[has_t]))
+        labels = index.assign(q_start, q_end, fill_nearest=fill_nearest)
+
+        for spk in index.speakers:
+            self._code(spk)
+        lut = {spk: i for i, spk in enumerate(self.speakers)}
+        codes = np.fromiter((lut.get(s, -1) for s in labels), dtype=np.int32, count=labels.shape[0])
+        found = codes >= 0
+
+        n = len(self)
+        seg_codes = np.frombuffer(self._seg_speaker, dtype=np.int32)
+        seg_codes[found[:n]] = codes[:n][found[:n]]
+        w_codes = np.frombuffer(self._w_speaker, dtype=np.int32)
+        w_idx = np.flatnonzero(has_t)
+        w_codes[w_idx[found[n:]]] = codes[n:][found[n:]]
+        del seg_codes, w_codes      # liberar las vistas antes de volver a crecer
+        return self
+
+    # ------------------------------------------------------------------
+    # Salida
+    # ------------------------------------------------------------------
+    def iter_segments(self) -> Iterator[dict]:
+        """Reconstruye los dicts de segmento uno a uno (borde de salida)."""
+        w_text, c_text = "".join(self._w_text_parts), "".join(self._c_text_parts)
+        seg_start, seg_end = self._seg_start.tolist(), self._seg_end.tolist()
+        seg_lp, seg_spk = self._seg_logprob.tolist(), self._seg_speaker.tolist()
+        w_off, w_toff, c_off = self._seg_word_off, self._w_text_off, self._seg_char_off
+
+        for i, text in enumerate(self.seg_text):
+            if self.aligned:
+                seg = {"start": seg_start[i], "end": seg_end[i], "text": text}
+                words = []
+                for j in range(w_off[i], w_off[i + 1]):
+                    w = {"word": w_text[w_toff[j]:w_toff[j + 1]]}
+                    _opt(w, "start", self._w_start[j])
+                    _opt(w, "end", self._w_end[j])
+                    _opt(w, "score", self._w_score[j])
+                    if self._w_speaker[j] >= 0:
+                        w["speaker"] = self.speakers[self._w_speaker[j]]
+                    words.append(w)
+                seg["words"] = words
+                if self.has_chars:
+                    chars = []
+                    for j in range(c_off[i], c_off[i + 1]):
+                        c = {"char": c_text[j]}
+                        _opt(c, "start", self._c_start[j])
+                        _opt(c, "end", self._c_end[j])
+                        _opt(c, "score", self._c_score[j])
+                        chars.append(c)
+                    seg["chars"] = chars
+            else:
+                seg = {"text": text, "start": seg_start[i], "end": seg_end[i]}
+            _opt(seg, "avg_logprob", seg_lp[i])
+            if seg_spk[i] >= 0:
+                seg["speaker"] = self.speakers[seg_spk[i]]
+            yield seg
+
+    def round_times(self, precision: int) -> "Transcript":
+        """Redondea in situ start/end/score de segmentos, palabras y caracteres."""
+        for name in ("_seg_start", "_seg_end", "_w_start", "_w_end", "_w_score",
+                     "_c_start", "_c_end", "_c_score"):
+            col = np.frombuffer(getattr(self, name))
+            np.round(col, precision, out=col)
+            del col
+        return self
+
+    def segment_columns(self) -> dict:
+        """Columnas de segmento (copias NumPy; speaker como código, -1 = ninguno)."""
+        off = np.frombuffer(self._seg_word_off, dtype=np.int64)
+        return {
+            "start": np.array(self._seg_start), "end": np.array(self._seg_end),
+            "text": list(self.seg_text),
+            "speaker": np.array(self._seg_speaker, dtype=np.int32),
+            "avg_logprob": np.array(self._seg_logprob),
+            "n_words": np.diff(off).astype(np.int32),
+        }
+
+    def word_columns(self) -> dict:
+        """Columnas de palabra; `segment` es el índice local del segmento."""
+        off = np.frombuffer(self._seg_word_off, dtype=np.int64)
+        w_text, w_toff = "".join(self._w_text_parts), self._w_text_off
+        return {
+            "segment": np.repeat(np.arange(len(self), dtype=np.int32), np.diff(off)),
+            "start": np.array(self._w_start), "end": np.array(self._w_end),
+            "score": np.array(self._w_score),
+            "word": [w_text[w_toff[j]:w_toff[j + 1]] for j in range(self.n_words)],
+            "speaker": np.array(self._w_speaker, dtype=np.int32),
+        }
+
+    def to_result(self) -> dict:
+        return {"segments": list(self.iter_segments()), "language": self.language}
+
+    # ------------------------------------------------------------------
+    # Checkpoints (JSON columnar: listas planas, sin un dict por palabra)
+    # ------------------------------------------------------------------
+    _COLUMNS = (
+        "_seg_start", "_seg_end", "_seg_logprob", "_seg_speaker", "_seg_word_off", "_seg_char_off",
+        "_w_start", "_w_end", "_w_score", "_w_speaker", "_w_text_off",
+        "_c_start", "_c_end", "_c_score",
+    )
+
+    def to_json(self) -> dict:
+        obj = {
+            "format": "columnar-v1",
+            "language": self.language, "aligned": self.aligned, "has_chars": self.has_chars,
+            "speakers": self.speakers, "seg_text": self.seg_text,
+            "w_text": "".join(self._w_text_parts), "c_text": "".join(self._c_text_parts),
+        }
+        for name in self._COLUMNS:
+            # NaN no es JSON estándar: se serializa como null
+            obj[name.lstrip("_")] = [None if v != v else v for v in getattr(self, name)]
+        return obj
+
+    @classmethod
+    def from_json(cls, obj: dict) -> "Transcript":
+        """Inverso de to_json; acepta también un resultado WhisperX clásico."""
+        if obj.get("format") != "columnar-v1":
+            return cls.from_result(obj)
+        tr = cls(obj["language"], obj["aligned"], obj["has_chars"])
+        tr.speakers, tr.seg_text = list(obj["speakers"]), list(obj["seg_text"])
+        tr._w_text_parts = [obj["w_text"]] if obj["w_text"] else []
+        tr._c_text_parts = [obj["c_text"]] if obj["c_text"] else []
+        for name in cls._COLUMNS:
+            col = getattr(tr, name)
+            del col[:]
+            col.extend(_NAN if v is None else v for v in obj[name.lstrip("_")])
+        return tr
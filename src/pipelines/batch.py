@@ -0,0 +1,254 @@
+#./src/pipelines/batch.py
+"""
+Modo lote: procesa muchos archivos con los modelos cargados una sola vez.
+
+Las etapas se encadenan como una línea de montaje de tres hilos:
+
+    decodificación + VAD (N+1)  →  ASR (N)  →  alineación + diarización + guardado (N-1)
+
+de modo que el trabajo CPU de un archivo se solapa con el ASR del siguiente.
+Las colas tienen tamaño 1: como mucho hay un archivo esperando en cada etapa.
+"""
+import glob
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from src.utils.events import events
+from src.utils.helpers import peak_rss_mib
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".m4a", ".ogg", ".opus", ".webm", ".mp4"}
+_DONE = object()   # centinela de fin de cola
+
+# Opciones de run_pipeline que el modo lote no implementa (con su valor por defecto)
+UNSUPPORTED = {
+    "concurrency": "sequential",
+    "stream_output": False,
+    "resume": False,
+    "checkpoint_dir": None,
+    "result_cache_dir": None,
+}
+
+
+def unsupported_options(job: dict) -> List[str]:
+    """Opciones de `job` que run_batch ignoraría (ver UNSUPPORTED)."""
+    return [k for k, default in UNSUPPORTED.items() if job.get(k, default) != default]
+
+
+def collect_inputs(patterns: Iterable[str], manifest: Optional[str] = None) -> List[str]:
+    """
+    Expande rutas, globs y directorios (recursivo) a la lista de audios.
+    `manifest`: archivo de texto con una ruta por línea ('#' comenta).
+    """
+    items = list(patterns)
+    if manifest:
+        with open(manifest, encoding="utf-8") as f:
+            items += [ln.strip() for ln in f if ln.strip() and not ln.lstrip().startswith("#")]
+
+    files: List[str] = []
+    for item in items:
+        if os.path.isdir(item):
+            files += sorted(
+                str(p) for p in Path(item).rglob("*")
+                if p.suffix.lower() in AUDIO_EXTENSIONS
+            )
+        elif glob.has_magic(item):
+            files += sorted(glob.glob(item, recursive=True))
+        else:
+            files.append(item)
+
+    # Quita duplicados conservando el orden
+    return list(dict.fromkeys(files))
+
+
+def output_path_for(audio_file: str, output_dir: Optional[str], root: Optional[str] = None) -> str:
+    """
+    <output_dir>/<subdir>/<nombre>.jsonl, donde <subdir> es la carpeta del
+    audio relativa a `root` (por defecto, la del propio audio: salida plana).
+    Sin `output_dir`, la salida va junto al audio.
+    """
+    src = Path(audio_file)
+    if not output_dir:
+        out_dir = src.parent
+    elif root:
+        out_dir = Path(output_dir) / src.resolve().parent.relative_to(Path(root).resolve())
+    else:
+        out_dir = Path(output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return str(out_dir / f"{src.stem}.jsonl")
+
+
+def output_paths(audio_files: List[str], output_dir: Optional[str]) -> List[str]:
+    """
+    Salida de cada audio con output_path_for, conservando bajo `output_dir` la
+    estructura de carpetas relativa a su raíz común (a/x.wav y b/x.wav no
+    chocan). ValueError si aun así dos audios comparten salida (x.wav y x.mp3
+    en la misma carpeta).
+    """
+    root = os.path.commonpath([str(Path(f).resolve().parent) for f in audio_files]) if audio_files else None
+    outputs = [output_path_for(f, output_dir, root) for f in audio_files]
+    seen: dict = {}
+    clashes = []
+    for audio_file, out in zip(audio_files, outputs):
+        key = os.path.normcase(os.path.abspath(out))
+        if key in seen:
+            clashes.append(f"{seen[key]} y {audio_file} → {out}")
+        else:
+            seen[key] = audio_file
+    if clashes:
+        raise ValueError("varios audios escribirían la misma salida: " + "; ".join(clashes))
+    return outputs
+
+
+def run_batch(jobs: List[dict]) -> List[str]:
+    """
+    Ejecuta una lista de trabajos (kwargs de run_pipeline, uno por archivo).
+    Devuelve las rutas de salida generadas; los archivos fallidos se registran
+    y no detienen el lote. Las opciones de UNSUPPORTED deben quedar en su
+    valor por defecto.
+    """
+    for job in jobs:
+        bad = unsupported_options(job)
+        if bad:
+            raise ValueError(f"el modo lote no admite {', '.join(bad)} ({job['audio_file']})")
+    # Aquí y no arriba: collect_inputs/output_path_for no cargan torch ni whisperx
+    from src.audio.loader import load_waveform, duration_seconds
+    from src.utils.batch_planner import memory_activity
+    from src.pipelines.full_pipeline import (
+        auto_align_batch, get_transcriber, vad_stage, transcribe_stage,
+        align_stage, diarize_stage, save_stage,
+    )
+
+    decoded: queue.Queue = queue.Queue(maxsize=1)
+    stop = threading.Event()      # el ASR terminó antes de tiempo: el decodificador no sigue
+    transcribed: queue.Queue = queue.Queue(maxsize=1)
+    outputs: List[str] = []
+    failed: List[str] = []
+    audio_seconds = 0.0
+    t_start = time.perf_counter()
+
+    def _offer(item) -> bool:
+        """decoded.put que se rinde si `stop` se activa (nadie va a consumir)."""
+        while not stop.is_set():
+            try:
+                decoded.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    # --- hilo 1: decodificación y VAD ---------------------------------------
+    def _decode_worker() -> None:
+        for job in jobs:
+            if stop.is_set():
+                return
+            try:
+                # memory_activity: el buffer del archivo siguiente no cuenta en la calibración del ASR
+                with memory_activity():
+                    with events.stage("decode", label="Decodificar", progress=False):
+                        audio, _ = load_waveform(job["audio_file"], cache_dir=job.get("audio_cache_dir"))
+                        events.audio("decode", duration_seconds(audio))
+                    # VAD una vez por archivo (lo usan el ASR y la diarización), fuera del hilo del ASR
+                    regions = vad_stage(audio, job["device"], job["vad_method"], job["vad_onset"],
+                                        job["vad_offset"], job["chunk_size"])
+            except Exception:
+                logger.exception(f"Fallo al decodificar {job['audio_file']}")
+                failed.append(job["audio_file"])
+                continue
+            if not _offer((job, audio, regions)):
+                return
+        _offer(_DONE)
+
+    # --- hilo 3: alineación, diarización y guardado -------------------------
+    def _post_worker() -> None:
+        nonlocal audio_seconds
+        while True:
+            item = transcribed.get()
+            if item is _DONE:
+                return
+            job, t, result, audio, regions = item
+            try:
+                if not job["no_align"]:
+                    result = align_stage(t, result, audio, job["device"], job["return_char_alignments"])
+                diarize_df = diarize_stage(
+                    audio, job["device"], job["no_diarize"],
+                    job["min_speakers"], job["max_speakers"], job["allow_tf32"],
+                    diarize_workers=job.get("diarize_workers", 0),
+                    diarize_backend=job.get("diarize_backend", "auto"),
+                    regions=regions if job.get("diarize_speech_only", True) else None,
+                    embedding_cache_dir=job.get("embedding_cache_dir"),
+                    speaker_index=job.get("speaker_index"),
+                    speaker_threshold=job.get("speaker_threshold", 0.5),
+                )
+                outputs.append(save_stage(
+                    diarize_df, result, job["output_jsonl"],
+                    output_format=job.get("output_format", "jsonl"),
+                    jsonl_precision=job.get("jsonl_precision"),
+                    compress=job.get("compress", "none"),
+                ))
+                audio_seconds += duration_seconds(audio)
+                logger.info(f"✓ {job['audio_file']} → {job['output_jsonl']}")
+            except Exception:
+                logger.exception(f"Fallo al procesar {job['audio_file']}")
+                failed.append(job["audio_file"])
+
+    decoder = threading.Thread(target=_decode_worker, name="batch-decode", daemon=True)
+    post = threading.Thread(target=_post_worker, name="batch-post", daemon=True)
+    decoder.start()
+    post.start()
+
+    # --- hilo principal: ASR (dispositivo) ----------------------------------
+    try:
+        while True:
+            item = decoded.get()
+            if item is _DONE:
+                break
+            job, audio, regions = item
+            try:
+                align_batch = auto_align_batch(
+                    job["align_batch"], job["model_name"], job["align_model_name"], job["device"],
+                    job.get("align_dtype", "float32"),
+                )
+                t = get_transcriber(
+                    job["model_name"], job["device"], job["compute_type"], job["model_dir"],
+                    job["allow_tf32"], job["vad_method"], job["vad_onset"], job["vad_offset"],
+                    job["chunk_size"], job["temperature"], job["beam_size"], job["initial_prompt"],
+                    job["align_model_name"], align_batch, job.get("asr_threads", 0), job.get("asr_workers", 0),
+                    job.get("align_dtype", "float32"), job.get("align_emission_s", 0.0),
+                )
+                if not job["no_align"]:
+                    t.preload_align_model(job["device"])
+                result = transcribe_stage(t, audio, job["asr_batch"], regions)
+                transcribed.put((job, t, result, audio, regions))
+            except Exception:
+                logger.exception(f"Fallo en ASR de {job['audio_file']}")
+                failed.append(job["audio_file"])
+    finally:
+        # Si el bucle sale por una excepción, el decodificador puede estar
+        # bloqueado en decoded.put: se le avisa y se vacía la cola antes del join
+        stop.set()
+        while True:
+            try:
+                decoded.get_nowait()
+            except queue.Empty:
+                break
+        decoder.join()
+        transcribed.put(_DONE)
+        post.join()
+
+    wall = time.perf_counter() - t_start
+    logger.info(
+        f"Lote: {len(outputs)}/{len(jobs)} archivos, "
+        f"{audio_seconds / 3600:.2f} h de audio en {wall / 3600:.2f} h "
+        f"→ {audio_seconds / max(wall, 1e-9):.1f} h-audio/h-reloj, "
+        f"RSS pico del proceso {peak_rss_mib():.0f} MiB"
+    )
+    if failed:
+        logger.warning(f"{len(failed)} archivos fallidos: {', '.join(failed)}")
+    return outputs
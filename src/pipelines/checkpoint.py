@@ -0,0 +1,96 @@
+#./src/pipelines/checkpoint.py
+"""
+Almacén en disco de resultados intermedios por etapa.
+
+    <root>/<etapa>/<clave>.json
+
+La clave combina el hash del audio decodificado con las opciones que afectan
+a esa etapa, de modo que al cambiar p. ej. --max-speakers sólo se recalculan
+la diarización y la fusión; ASR y alineación se reutilizan.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_HASH_BLOCK = 1 << 24   # 16 MiB por actualización (no copia el buffer completo)
+
+
+def audio_hash(audio: np.ndarray) -> str:
+    """Hash del waveform decodificado (independiente del contenedor/códec)."""
+    h = hashlib.blake2b(digest_size=20)
+    buf = memoryview(np.ascontiguousarray(audio)).cast("B")
+    for i in range(0, len(buf), _HASH_BLOCK):
+        h.update(buf[i:i + _HASH_BLOCK])
+    return h.hexdigest()
+
+
+def stage_key(*parts: Any, **options: Any) -> str:
+    """Clave estable a partir de claves previas y opciones de la etapa."""
+    raw = json.dumps([parts, options], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def df_to_json(df: pd.DataFrame) -> dict:
+    return {"records": df.to_dict("records")}
+
+
+def df_from_json(data: dict) -> pd.DataFrame:
+    return pd.DataFrame.from_records(data["records"], columns=["start", "end", "speaker"])
+
+
+class CheckpointStore:
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.root / stage / f"{key}.json"
+
+    def load(self, stage: str, key: str) -> Optional[Any]:
+        path = self._path(stage, key)
+        if not path.exists():
+            return None
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as err:
+            logger.warning(f"Checkpoint {path} ilegible, se recalcula ({err})")
+            return None
+
+    def save(self, stage: str, key: str, obj: Any) -> None:
+        path = self._path(stage, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".json.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False)
+        os.replace(tmp, path)          # escritura atómica
+
+    def get_or_compute(
+        self,
+        stage: str,
+        key: str,
+        compute: Callable[[], Any],
+        dump: Callable[[Any], Any] = lambda x: x,
+        restore: Callable[[Any], Any] = lambda x: x,
+    ) -> Any:
+        """
+        Devuelve el artefacto guardado de (stage, key) o lo calcula y guarda.
+        `dump`/`restore` convierten a/desde JSON (p. ej. DataFrame ↔ dict).
+        """
+        cached = self.load(stage, key)
+        if cached is not None:
+            logger.info(f"Checkpoint '{stage}' reutilizado ({key[:12]})")
+            return restore(cached)
+        t0 = time.perf_counter()
+        value = compute()
+        self.save(stage, key, dump(value))
+        logger.info(f"Checkpoint '{stage}' guardado ({key[:12]}, {time.perf_counter() - t0:.1f} s)")
+        return value
@@ -1,11 +1,320 @@
 #./src/pipelines/full_pipeline.py
 
-from src.asr.transcriber import Transcriber
-from src.diarization.diarizer import Diarizer
-from src.formatting.formatter import Formatter
-import logging, psutil, pandas as pd, torch
+from src.asr.transcriber import Transcriber, batch, shift_times
+from src.asr.vad import get_vad, regions_from_json, regions_to_json, shift_regions, speech_regions
+from src.formatting.formatter import Formatter, JsonlStreamWriter
+from src.formatting.transcript import Transcript
+from src.formatting.jsonl import compressed_path
+from src.audio.loader import load_waveform, duration_seconds
+from src.utils.helpers import peak_rss_mib
+from src.utils.registry import registry
+from src.diarization.identity import index_fingerprint
+from src.diarization.onnx_backend import resolve_backend
+from src.pipelines.checkpoint import CheckpointStore, audio_hash, stage_key, df_to_json, df_from_json
+from src.pipelines.result_cache import ResultCache
+from src.utils.batch_planner import MemorySampler, memory_activity, planner
+from src.asr.align_cache import align_cache
+from src.utils.events import events
+from whisperx.audio import SAMPLE_RATE, load_audio
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional
+import logging, math, numpy as np, pandas as pd, torch, time
+import copy
+import threading
 logger = logging.getLogger(__name__)
 
+# ----------------------------------------------------------------------
+# Etapas del pipeline. run_pipeline las encadena para un archivo; el modo
+# lote (src/pipelines/batch.py) las reparte entre hilos para solapar archivos.
+# ----------------------------------------------------------------------
+
+@contextmanager
+def stage_timer(timings: dict, name: str):
+    """Registra (inicio, fin) de la etapa `name` en `timings`."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = (t0, time.perf_counter())
+
+
+def log_timings(timings: dict) -> None:
+    """Duración por etapa y solapamiento ASR/alineación ↔ diarización."""
+    parts = [f"{name} {end - start:.1f} s" for name, (start, end) in timings.items()]
+    logger.info("Tiempos por etapa: " + ", ".join(parts))
+    if "diarize" in timings and "transcribe" in timings:
+        asr_start = timings["transcribe"][0]
+        asr_end = timings.get("align", timings["transcribe"])[1]
+        d_start, d_end = timings["diarize"]
+        overlap = max(0.0, min(asr_end, d_end) - max(asr_start, d_start))
+        logger.info(f"Solapamiento ASR ↔ diarización: {overlap:.1f} s")
+
+
+def auto_align_batch(align_batch: Optional[int], model_name: str,
+                     align_model_name: Optional[str], device: str, align_dtype: str = "float32") -> int:
+    """
+    Cálculo automático del align_batch (si el usuario no lo fijó), con los
+    MiB/segmento calibrados en ejecuciones previas.
+    """
+    if align_batch is not None:
+        return align_batch
+    return planner.plan_align(align_model_name or model_name, device, align_dtype)
+
+
+def get_transcriber(
+    model_name, device, compute_type, model_dir, allow_tf32,
+    vad_method, vad_onset, vad_offset, chunk_size,
+    temperature, beam_size, initial_prompt,
+    align_model_name, align_batch, asr_threads: int = 0, asr_workers: int = 0,
+    align_dtype: str = "float32", align_emission_s: float = 0.0,
+) -> Transcriber:
+    """
+    El modelo Whisper se guarda en el registro del proceso: en modo servidor
+    o lote, los trabajos con las mismas opciones lo reutilizan ya cargado
+    (con asr_workers > 1, también sus procesos worker). Cada llamada devuelve
+    una copia con las opciones de alineación del trabajo.
+    """
+    t = registry.get(
+        ("whisper", model_name, device, compute_type, model_dir, allow_tf32,
+         vad_method, vad_onset, vad_offset, chunk_size,
+         temperature, beam_size, initial_prompt, asr_threads, asr_workers),
+        lambda: Transcriber(
+            model_name=model_name,
+            device=device,
+            compute_type=compute_type,
+            language="es",
+            download_root=model_dir,
+            allow_tf32=allow_tf32,
+            vad_method = vad_method,
+            vad_onset  = vad_onset,
+            vad_offset = vad_offset,
+            chunk_size = chunk_size,
+            temperature= temperature,
+            beam_size  = beam_size,
+            initial_prompt = initial_prompt,
+            align_model_name = align_model_name,
+            align_batch=align_batch,
+            threads=asr_threads,
+            workers=asr_workers,
+        ),
+    )
+    # Opciones de alineación: propias de cada trabajo, no del modelo. Se
+    # fijan en una copia superficial (comparte Whisper, VAD y workers): en
+    # modo lote el hilo de post-proceso sigue alineando el archivo anterior
+    # con su copia mientras el ASR prepara la del siguiente.
+    t = copy.copy(t)
+    t.align_model_name = align_model_name
+    t.align_batch      = align_batch
+    t.align_dtype      = align_dtype
+    t.align_emission_s = align_emission_s
+    return t
+
+
+def vad_stage(audio, device: str, vad_method: str, vad_onset: float, vad_offset: float,
+              chunk_size: int) -> np.ndarray:
+    """
+    Regiones de voz (N, 2) del audio completo: etapa VAD compartida por el
+    ASR (ventanas) y la diarización (recorte de silencios); ver asr/vad.py.
+    """
+    vad = get_vad(vad_method, device, vad_onset, vad_offset, chunk_size)
+    with events.stage("vad", label="VAD", progress=False):
+        regions = speech_regions(vad, audio, chunk_size, vad_onset, vad_offset)
+        events.audio("vad", duration_seconds(audio))
+    voiced = float((regions[:, 1] - regions[:, 0]).sum())
+    logger.info(
+        f"VAD: {len(regions)} regiones, {voiced / 60:.1f} de "
+        f"{duration_seconds(audio) / 60:.1f} min con voz"
+    )
+    return regions
+
+
+def transcribe_stage(t: Transcriber, audio, asr_batch: Optional[int],
+                     regions: Optional[np.ndarray] = None) -> dict:
+    """
+    Transcripción por lotes sobre las regiones VAD (las de la etapa VAD
+    compartida si se pasan en `regions`; si no, las calcula el Transcriber).
+    • Sin --asr-batch, el lote sale del planificador (memoria calibrada).
+    • Ante un OOM se reduce el lote a la mitad y se continúa desde el lote
+      fallido: los segmentos ya decodificados se conservan.
+    • El pico de memoria medido alimenta la calibración si la ventana estuvo
+      aislada (sin precarga de alineación, diarización ni otro archivo a la
+      vez). Sin calibración previa, se espera antes a la precarga en curso
+      para que la primera medida sea válida.
+    """
+    if isinstance(audio, str):
+        audio = load_audio(audio)
+    if regions is not None:
+        chunks = t.vad_chunks(audio, regions)
+    else:
+        with events.stage("vad", label="VAD", progress=False):
+            chunks = t.vad_chunks(audio)
+    key = planner.key("asr", t.model_name, t.compute_type, t.device)
+    budget = planner.budget_mib(t.device)
+    batch_size = asr_batch or planner.plan_asr(t.model_name, t.compute_type, t.device)
+    if planner.mib_per_item(key) is None and t.pool is None:
+        align_cache.wait_pending()
+
+    segments: list = []
+    reported = 0        # segmentos ya notificados (lotes y segundos de audio)
+    with events.stage("transcribe", max(1, math.ceil(len(chunks) / batch_size)), "lote",
+                      label="ASR-Transcribe") as adv_transcribe:
+
+        def tick() -> None:
+            nonlocal reported
+            adv_transcribe(1)
+            if events.enabled:
+                events.audio("transcribe", sum(c["end"] - c["start"] for c in chunks[reported:len(segments)]))
+            reported = len(segments)
+
+        while len(segments) < len(chunks):
+            pending = chunks[len(segments):]
+            try:
+                with MemorySampler(t.device) as mem:
+                    # Un tick por lote completado, también tras reducir el lote por OOM
+                    for seg in t.transcribe_chunks(audio, pending, batch_size, on_batch_end=tick):
+                        segments.append(seg)
+                # Sólo un lote completo da una medida válida por elemento (y en este
+                # proceso: con workers el modelo vive en otros)
+                if len(pending) >= batch_size and t.pool is None:
+                    if mem.isolated:
+                        planner.record(key, batch_size, mem.delta_mib)
+                    else:
+                        logger.info("Calibración ASR omitida: otra etapa reservó memoria a la vez")
+
+            except RuntimeError as e:
+                msg = str(e).lower()
+                if "out of memory" in msg and batch_size > 1:
+                    planner.record_oom(key, batch_size, budget)
+                    old = batch_size
+                    batch_size = max(1, batch_size // 2)
+                    logger.warning(
+                        f"OOM con batch={old}: se continúa desde el segmento "
+                        f"{len(segments)}/{len(chunks)} con batch={batch_size}"
+                    )
+                    if t.device == "cuda":
+                        torch.cuda.empty_cache()
+                    continue
+                else:
+                    raise
+        if not chunks:
+            tick()
+    return {"segments": segments, "language": t.language}
+
+
+def align_stage(t: Transcriber, result: dict, audio, device: str,
+                return_char_alignments: bool) -> Transcript:
+    steps_align = len(result["segments"])
+    with events.stage("align", steps_align, "seg", label="ASR-Align") as adv_align, \
+            MemorySampler(device) as mem:
+        result = t.align(
+            result,
+            audio,
+            device=device,
+            return_char_alignments=return_char_alignments,
+            on_chunk_end=adv_align,
+        )
+    if mem.isolated:
+        planner.record(
+            planner.key("align", t.align_model_name or t.model_name, t.align_dtype, device),
+            min(t.align_batch, steps_align), mem.delta_mib,
+        )
+    else:
+        logger.info("Calibración de alineación omitida: otra etapa reservó memoria a la vez")
+    return result
+
+
+def diarization_enabled(device: str, no_diarize: bool, diarize_workers: int = 0,
+                        diarize_backend: str = "torch") -> bool:
+    # En CPU: con ONNX Runtime, o por ventanas con torch (tiempo acotado por workers)
+    return not no_diarize and (
+        device != "cpu" or diarize_workers > 1 or resolve_backend(diarize_backend, device) != "torch"
+    )
+
+
+def diarize_stage(audio, device: str, no_diarize: bool, min_speakers: int,
+                  max_speakers: int, allow_tf32: bool,
+                  diarize_workers: int = 0, embedding_cache_dir: Optional[str] = None,
+                  speaker_index: Optional[str] = None, speaker_threshold: float = 0.5,
+                  diarize_backend: str = "torch", regions: Optional[np.ndarray] = None) -> pd.DataFrame:
+    # --- fase Diarización (si está permitida: CUDA, CPU con ONNX o por ventanas) ---
+    if diarization_enabled(device, no_diarize, diarize_workers, diarize_backend):
+        from src.diarization.diarizer import Diarizer     # pyannote sólo si se diariza
+
+        # Carga y diarización cuentan como memoria ajena para la calibración del ASR
+        with memory_activity():
+            d = Diarizer(
+                min_speakers=min_speakers,
+                max_speakers=max_speakers,
+                device=device,
+                #device_index=device_index,
+                allow_tf32=allow_tf32,
+                workers=diarize_workers,
+                embedding_cache_dir=embedding_cache_dir,
+                speaker_index=speaker_index,
+                speaker_threshold=speaker_threshold,
+                backend=resolve_backend(diarize_backend, device),
+            )
+            with events.stage("diarize", label="Diarizar") as adv:
+                df = d.diarize(audio, regions)
+                adv(1)
+        return df
+    # Omitir diarización → DataFrame vacío
+    return pd.DataFrame(columns=["start", "end", "speaker"])
+
+
+def count_words(result) -> int:
+    """Palabras alineadas (o, sin alineación, palabras del texto) para métricas."""
+    if isinstance(result, Transcript):
+        return result.n_words
+    return sum(len(seg["words"]) if "words" in seg else len(seg["text"].split())
+               for seg in result["segments"])
+
+
+def save_stage(diarize_df: pd.DataFrame, result, output_jsonl: str,
+               output_format: str = "jsonl", jsonl_precision: Optional[int] = None,
+               compress: str = "none") -> str:
+    # --- fase fusión y guardado ----------------------------------------------
+    with events.stage("save", 1, label="Guardar") as final_update:
+        fmt = Formatter()
+        with events.stage("save/merge", progress=False):
+            merged = fmt.assign_speakers(diarize_df, result)
+        if events.enabled:
+            events.count("save", "words", count_words(merged))
+        with events.stage("save/write", progress=False):
+            path = fmt.save(merged, output_jsonl, output_format, jsonl_precision, compress)
+        final_update(1)
+    return path
+
+
+def stream_stage(t: Optional[Transcriber], result: dict, audio, diarize_df: pd.DataFrame,
+                 writer: JsonlStreamWriter, device: str, no_align: bool,
+                 return_char_alignments: bool, align_batch: int) -> str:
+    """
+    Salida incremental: cada lote se alinea, recibe hablante y se escribe de
+    inmediato; los segmentos alineados no se acumulan en memoria.
+    """
+    fmt = Formatter()
+    steps = len(result["segments"])
+    if no_align:
+        chunks = ((len(c), c) for c in batch(result["segments"], align_batch))
+    else:
+        chunks = t.align_iter(result, audio, device, return_char_alignments)
+    try:
+        with events.stage("align+save", steps, "seg", label="Alinear+Guardar") as adv:
+            for n_in, segs in chunks:
+                merged = fmt.assign_speakers(diarize_df, {"segments": segs})
+                writer.write(merged["segments"])
+                if events.enabled:
+                    events.count("align+save", "words", count_words(merged))
+                adv(n_in)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
+
+
 def run_pipeline(
     model_name: str,
     audio_file: str,
@@ -17,7 +326,6 @@ def run_pipeline(
     max_speakers: int,
     model_dir: str,
     allow_tf32: bool,
-    progress_hook,
     vad_method: str,
     vad_onset: float,
     vad_offset: float,
@@ -30,134 +338,317 @@ def run_pipeline(
     initial_prompt: str,
     align_model_name: str,
     align_batch: int,
+    align_dtype: str = "float32",
+    align_emission_s: float = 0.0,
+    audio_cache_dir: Optional[str] = None,
+    concurrency: str = "sequential",
+    asr_threads: int = 0,
+    asr_workers: int = 0,
+    diarize_workers: int = 0,
+    diarize_backend: str = "auto",
+    diarize_speech_only: bool = True,
+    embedding_cache_dir: Optional[str] = None,
+    speaker_index: Optional[str] = None,
+    speaker_threshold: float = 0.5,
+    stream_output: bool = False,
+    resume: bool = False,
+    checkpoint_dir: Optional[str] = None,
+    result_cache_dir: Optional[str] = None,
+    result_cache_mb: int = 2048,
+    output_format: str = "jsonl",
+    jsonl_precision: Optional[int] = None,
+    compress: str = "none",
 ) -> str:
     """
     Ejecuta todo el flujo de trabajo de ASR + alineación + diarización + guardado.
     Todos los parámetros se reciben desde main.py.
-    """
+    El audio se decodifica una sola vez y el mismo buffer se comparte entre etapas.
+    El progreso se publica en el bus `events` (barra Rich, log, métricas: ver
+    utils/events.py y utils/telemetry.py).
 
-    # ----------------------------------------------------------
-    # 1.  CÁLCULO AUTOMÁTICO DEL align_batch  (si el usuario no lo fijó)
-    # ----------------------------------------------------------
-    if align_batch is None:
-        avail_mib    = psutil.virtual_memory().available // (1024 * 1024)
-        safety_ratio = 0.45          # usar el 40 % de la RAM libre
-        est_mib_seg  = 0.25          # MiB aprox. por segmento
-        calc_batch   = int((avail_mib * safety_ratio) / est_mib_seg)
+    asr_workers > 1 (sólo CPU) reparte las regiones VAD entre procesos worker,
+    cada uno con su modelo int8 y asr_threads hilos (ver asr/parallel.py).
 
-        # Sólo mínimo, sin tope:
-        align_batch = max(10, calc_batch)
+    diarize_workers > 1 diariza por ventanas en paralelo con un clustering
+    global (ver diarization/windowed.py).
 
-        # —o— mínimo y tope superior de 5000:
-        #align_batch = max(10, min(calc_batch, 5000))
+    El VAD es una etapa propia: sus regiones se calculan una vez (checkpoint
+    "vad") y las usan el ASR y, con diarize_speech_only, la diarización, que
+    recibe el audio sin los silencios largos (ver asr/vad.py).
 
-        logger.info(
-            f"align_batch dinámico = {align_batch} "
-            f"(RAM libre ≈ {avail_mib} MiB, calc_batch ≈ {calc_batch})"
-    )
-    # ----------------------------------------------------------
-    # 2.  CREACIÓN DEL TRANSCRIBER
-    # ----------------------------------------------------------
-    t = Transcriber(
-        model_name=model_name,
-        device=device,
-        compute_type=compute_type,
-        language="es",
-        download_root=model_dir,
-        allow_tf32=allow_tf32,
-        vad_method = vad_method,
-        vad_onset  = vad_onset,
-        vad_offset = vad_offset,
-        chunk_size = chunk_size,
-        temperature= temperature,
-        beam_size  = beam_size,
-        initial_prompt = initial_prompt,
-        align_model_name = align_model_name,
-        align_batch=align_batch
-    )
+    diarize_backend="auto" usa ONNX Runtime en CPU si está instalado ("onnx",
+    "onnx-int8"; ver diarization/onnx_backend.py), lo que habilita la
+    diarización en CPU por defecto; sin él, en CPU sólo diariza por ventanas.
 
-    # ----------------------------------------------------------
-    # 3.  TRANSCRIPCIÓN
-    # ----------------------------------------------------------
+    embedding_cache_dir reutiliza segmentación + embeddings de ventanas ya
+    vistas; speaker_index renombra los clusters que coinciden con identidades
+    inscritas (ver diarization/identity.py).
 
-    batches = t.estimate_batches(audio_file, batch_size=asr_batch)
-    if progress_hook:
-        adv_transcribe = progress_hook.new_phase("ASR-Transcribe", batches, "lote")
-    else:
-        adv_transcribe = lambda *_: None
+    concurrency="parallel" lanza la diarización en un hilo propio (con su propio
+    stream CUDA) mientras corren ASR y alineación; ambas ramas se unen en la fusión.
 
-    while True:
-        try:
-            result = t.transcribe(
-                audio_file,
-                batch_size=asr_batch,
-                on_batch_end=lambda *_: adv_transcribe(1)
-            )
-            break
-
-        except RuntimeError as e:
-            msg = str(e).lower()   
-            if "out of memory" in msg and asr_batch > 1:
-                old = asr_batch
-                asr_batch = max(1, asr_batch // 2)
-                print(f"[WARN] OOM con batch={old}, reintentando con batch={asr_batch}")
-                torch.cuda.empty_cache()
-                # Recalcular estimación y barra
-                batches = t.estimate_batches(audio_file, batch_size=asr_batch)
-                if progress_hook:
-                    adv_transcribe = progress_hook.new_phase("ASR-Transcribe", batches, "lote")
-                continue
-            else:
-                raise
+    stream_output=True escribe cada lote en cuanto está alineado y con hablante
+    (la diarización se adelanta a la alineación); resume=True continúa un .part
+    previo transcribiendo sólo el audio posterior a su último segmento.
 
+    checkpoint_dir guarda ASR, alineación y diarización por separado (clave:
+    hash del audio + opciones de cada etapa) y reutiliza las ya completadas.
 
-    if progress_hook:
-        adv_transcribe() 
-        progress_hook.close_phase()
+    result_cache_dir devuelve directamente el JSONL guardado si el mismo audio
+    ya se procesó con las mismas opciones.
 
-    # ----------------------------------------------------------
-    # 4.  ALINEACIÓN
-    # ----------------------------------------------------------
+    output_format="parquet"/"arrow" escribe tablas planas de segmentos y
+    palabras (ver formatting/columnar.py) y devuelve la ruta de la de segmentos.
+    La reanudación y la caché de resultados sólo existen para JSONL.
 
-    if not no_align:
-        steps_align = len(result["segments"])
-        adv_align = progress_hook.new_phase("ASR-Align", steps_align, "seg") if progress_hook else (lambda *_: None)
-        result = t.align(
-            result,
-            audio_file,
-            device=device,
-            return_char_alignments=return_char_alignments,
-            on_chunk_end=lambda n: adv_align(n),
+    align_dtype="int8" alinea con wav2vec2 cuantizado (CPU) y align_emission_s > 0
+    calcula las emisiones por lotes de hasta esos segundos (ver asr/emissions.py).
+
+    jsonl_precision redondea tiempos y puntuaciones; compress="gzip"/"zstd"
+    comprime el JSONL (añadiendo .gz/.zst a la ruta devuelta).
+    """
+    timings: dict = {}
+    if not no_diarize:
+        diarize_backend = resolve_backend(diarize_backend, device)
+    if resume and output_format != "jsonl":
+        raise ValueError("--resume sólo está disponible con --output-format jsonl")
+    if resume and compress != "none":
+        raise ValueError("--resume no admite salida comprimida")
+    if output_format == "jsonl":
+        output_jsonl = compressed_path(output_jsonl, compress)
+    stream_output = stream_output or resume
+    if resume and Path(output_jsonl).exists() and not Path(output_jsonl + ".part").exists():
+        logger.info(f"{output_jsonl} ya está completo; nada que reanudar")
+        return output_jsonl
+
+    # Pico de RSS de este job (ru_maxrss es el del proceso entero)
+    job_mem = MemorySampler("cpu", activity=False)
+    with job_mem:
+        # ----------------------------------------------------------
+        # 0.  DECODIFICACIÓN ÚNICA (16 kHz mono float32)
+        # ----------------------------------------------------------
+        with stage_timer(timings, "decode"), events.stage("decode", label="Decodificar", progress=False):
+            audio, decode_s = load_waveform(audio_file, cache_dir=audio_cache_dir)
+            events.audio("decode", duration_seconds(audio))
+        logger.info(
+            f"Audio decodificado en {decode_s:.2f} s "
+            f"({duration_seconds(audio) / 60:.1f} min de audio)"
         )
-        if progress_hook:
-            progress_hook.close_phase()
 
+        a_hash = None
+        if checkpoint_dir or result_cache_dir:
+            with stage_timer(timings, "hash"), events.stage("hash", progress=False):
+                a_hash = audio_hash(audio)
 
-    # --- fase Diarización (si está permitida y hay CUDA) ---
-    if not no_diarize and device != "cpu":
-        d = Diarizer(
-            min_speakers=min_speakers,
-            max_speakers=max_speakers,
-            device=device,
-            #device_index=device_index,
-            allow_tf32=allow_tf32,
-            progress_hook=progress_hook,
+        # Con índice de identidades, las etiquetas dependen también de su contenido
+        identity_opts = {}
+        if speaker_index and diarization_enabled(device, no_diarize, diarize_workers, diarize_backend):
+            identity_opts = {"speaker_index": index_fingerprint(speaker_index),
+                             "speaker_threshold": speaker_threshold}
+
+        # Diarización sin silencios: depende también de las opciones del VAD
+        speech_only_opts = {}
+        if diarize_speech_only and diarization_enabled(device, no_diarize, diarize_workers, diarize_backend):
+            speech_only_opts = {"diarize_speech_only": [vad_method, vad_onset, vad_offset, chunk_size]}
+
+        # Alineación int8 / por lotes: sólo en la clave si no es la de referencia
+        align_opts = {}
+        if align_dtype != "float32" or align_emission_s > 0:
+            align_opts = {"align_dtype": align_dtype, "align_emission_s": align_emission_s}
+
+        # Caché de resultados: mismo audio + mismas opciones → JSONL guardado
+        cache, k_result = None, None
+        if result_cache_dir and output_format != "jsonl":
+            logger.info("Caché de resultados omitida: sólo guarda salidas JSONL")
+        elif result_cache_dir:
+            cache = ResultCache(result_cache_dir, max_bytes=result_cache_mb * 2**20)
+            k_result = cache.key(
+                a_hash, model=model_name, compute_type=compute_type,
+                beam_size=beam_size, temperature=temperature, initial_prompt=initial_prompt,
+                vad_method=vad_method, vad_onset=vad_onset, vad_offset=vad_offset,
+                chunk_size=chunk_size, no_align=no_align, align_model=align_model_name,
+                return_char_alignments=return_char_alignments,
+                diarize=diarization_enabled(device, no_diarize, diarize_workers, diarize_backend),
+                min_speakers=min_speakers, max_speakers=max_speakers,
+                # Sólo si difieren del valor por defecto: no invalida entradas previas
+                **({"jsonl_precision": jsonl_precision} if jsonl_precision is not None else {}),
+                **({"compress": compress} if compress != "none" else {}),
+                **({"diarize_backend": diarize_backend} if diarize_backend != "torch" else {}),
+                **speech_only_opts,
+                **align_opts,
+                **identity_opts,
+            )
+            hit = cache.fetch(k_result, output_jsonl)
+            if hit:
+                return hit
+
+        writer = (
+            Formatter().open_stream(output_jsonl, resume, output_format, jsonl_precision, compress)
+            if stream_output else None
         )
-        diarize_df = d.diarize(audio_file)
-    else:
-        # Omitir diarización → DataFrame vacío
-        diarize_df = pd.DataFrame(columns=["start", "end", "speaker"])
-    
-# --- fase fusión y guardado ----------------------------------------------
-    final_update = (
-        progress_hook.new_phase("Guardar", 1) if progress_hook else (lambda *_: None)
+
+        # Checkpoints por etapa (None = etapa no cacheable en este trabajo)
+        store = CheckpointStore(checkpoint_dir) if checkpoint_dir else None
+        k_vad = k_asr = k_align = k_diar = None
+        if store is not None:
+            k_vad = stage_key(a_hash, vad_method=vad_method, vad_onset=vad_onset,
+                              vad_offset=vad_offset, chunk_size=chunk_size)
+            if not (writer is not None and writer.resume_from > 0):
+                k_asr = stage_key(
+                    a_hash, model=model_name, compute_type=compute_type,
+                    vad_method=vad_method, vad_onset=vad_onset, vad_offset=vad_offset,
+                    chunk_size=chunk_size, temperature=temperature, beam_size=beam_size,
+                    initial_prompt=initial_prompt,
+                )
+                k_align = stage_key(k_asr, align_model=align_model_name,
+                                    return_char_alignments=return_char_alignments, **align_opts)
+            if diarization_enabled(device, no_diarize, diarize_workers, diarize_backend):
+                k_diar = stage_key(
+                    a_hash, min_speakers=min_speakers, max_speakers=max_speakers,
+                    **({"backend": diarize_backend} if diarize_backend != "torch" else {}),
+                    **speech_only_opts,
+                    **identity_opts,
+                )
+
+        def _cached(stage, key, compute, dump=lambda x: x, restore=lambda x: x):
+            if store is None or key is None:
+                return compute()
+            return store.get_or_compute(stage, key, compute, dump, restore)
+
+        # Regiones VAD: una sola vez, la primera rama que las pida (ASR o diarización concurrente)
+        _regions: list = []
+        _regions_lock = threading.Lock()
+
+        def regions() -> np.ndarray:
+            with _regions_lock:
+                if not _regions:
+                    with stage_timer(timings, "vad"):
+                        _regions.append(_cached(
+                            "vad", k_vad,
+                            lambda: vad_stage(audio, device, vad_method, vad_onset, vad_offset, chunk_size),
+                            dump=regions_to_json, restore=regions_from_json,
+                        ))
+                return _regions[0]
+
+        def _diarize() -> pd.DataFrame:
+            return _cached(
+                "diarize", k_diar,
+                lambda: diarize_stage(audio, device, no_diarize, min_speakers, max_speakers, allow_tf32,
+                                      diarize_workers, embedding_cache_dir, speaker_index, speaker_threshold,
+                                      diarize_backend, regions() if diarize_speech_only else None),
+                dump=df_to_json, restore=df_from_json,
+            )
+
+        # Diarización concurrente: no depende del ASR hasta assign_speakers
+        diar_pool, diar_future = None, None
+        if concurrency == "parallel" and diarization_enabled(device, no_diarize, diarize_workers, diarize_backend):
+            def _diarize_concurrent() -> pd.DataFrame:
+                with stage_timer(timings, "diarize"):
+                    if device == "cuda":
+                        side = torch.cuda.Stream()
+                        with torch.cuda.stream(side):
+                            df = _diarize()
+                        side.synchronize()
+                        return df
+                    return _diarize()
+
+            diar_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="diarize")
+            diar_future = diar_pool.submit(_diarize_concurrent)
+
+        try:
+            # ----------------------------------------------------------
+            # 1.  CÁLCULO AUTOMÁTICO DEL align_batch  (si el usuario no lo fijó)
+            # ----------------------------------------------------------
+            align_batch = auto_align_batch(align_batch, model_name, align_model_name, device, align_dtype)
+
+            # ----------------------------------------------------------
+            # 2.  CREACIÓN DEL TRANSCRIBER (perezosa: con checkpoints de ASR y
+            #     alineación no hace falta cargar Whisper)
+            # ----------------------------------------------------------
+            _t: list = []
+
+            def transcriber() -> Transcriber:
+                if not _t:
+                    _t.append(get_transcriber(
+                        model_name, device, compute_type, model_dir, allow_tf32,
+                        vad_method, vad_onset, vad_offset, chunk_size,
+                        temperature, beam_size, initial_prompt,
+                        align_model_name, align_batch, asr_threads, asr_workers,
+                        align_dtype, align_emission_s,
+                    ))
+                return _t[0]
+
+            # ----------------------------------------------------------
+            # 3.  TRANSCRIPCIÓN (el modelo de alineación se precarga en paralelo)
+            # ----------------------------------------------------------
+            asr_audio, asr_offset = audio, 0.0
+            if writer is not None and writer.resume_from > 0:
+                # Reanudación: sólo se transcribe lo posterior al último segmento escrito
+                s0 = int(writer.resume_from * SAMPLE_RATE)
+                asr_audio, asr_offset = audio[s0:], s0 / SAMPLE_RATE
+
+            def _transcribe() -> dict:
+                t = transcriber()
+                if not no_align:
+                    t.preload_align_model(device)
+                asr_regions = shift_regions(regions(), asr_offset) if asr_offset else regions()
+                return transcribe_stage(t, asr_audio, asr_batch, asr_regions)
+
+            with stage_timer(timings, "transcribe"):
+                result = _cached("asr", k_asr, _transcribe)
+            if asr_offset:
+                shift_times(result["segments"], asr_offset)
+
+            # ----------------------------------------------------------
+            # 4.  ALINEACIÓN (modo normal)
+            # ----------------------------------------------------------
+            if writer is None and not no_align:
+                with stage_timer(timings, "align"):
+                    result = _cached(
+                        "align", k_align,
+                        lambda: align_stage(transcriber(), result, audio, device, return_char_alignments),
+                        dump=Transcript.to_json, restore=Transcript.from_json,
+                    )
+
+            # ----------------------------------------------------------
+            # 5.  DIARIZACIÓN (o unión con la rama concurrente)
+            # ----------------------------------------------------------
+            if diar_future is not None:
+                diarize_df = diar_future.result()
+            else:
+                with stage_timer(timings, "diarize"):
+                    diarize_df = _diarize()
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+        finally:
+            if diar_pool is not None:
+                diar_pool.shutdown(wait=True)
+
+        # ----------------------------------------------------------
+        # 6.  FUSIÓN Y GUARDADO (en modo incremental, junto con la alineación)
+        # ----------------------------------------------------------
+        if writer is not None:
+            with stage_timer(timings, "align+save"):
+                path = stream_stage(
+                    None if no_align else transcriber(), result, audio, diarize_df, writer,
+                    device, no_align, return_char_alignments, align_batch,
+                )
+        else:
+            with stage_timer(timings, "save"):
+                path = save_stage(
+                    diarize_df, result, output_jsonl,
+                    output_format, jsonl_precision, compress,
+                )
+        if cache is not None:
+            cache.store(k_result, path, {"audio_file": audio_file, "model": model_name})
+    log_timings(timings)
+    logger.info(
+        f"Job {audio_file}: decodificación {decode_s:.2f} s, "
+        f"RSS pico del job {job_mem.peak_mib:.0f} MiB (+{job_mem.delta_mib:.0f}), "
+        f"del proceso {peak_rss_mib():.0f} MiB"
     )
-    fmt = Formatter()
-    merged = fmt.assign_speakers(diarize_df, result)
-    path = fmt.save_jsonl(merged, output_jsonl)
-    final_update(1)
-    if progress_hook:
-        progress_hook.close_phase()
     return path
 
 # -----------------------------------------------------------------------------
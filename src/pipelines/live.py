@@ -0,0 +1,497 @@
+# src/pipelines/live.py
+"""
+Transcripción en vivo desde stdin, un FIFO o un socket local.
+
+Entrada: PCM mono 16 kHz, s16le (por defecto) o f32le; si empieza con una
+cabecera WAV, se valida y se salta. Fuentes:
+    -                   stdin
+    ruta                archivo o FIFO (mkfifo)
+    unix:/ruta.sock     socket Unix (espera una conexión)
+    tcp:HOST:PUERTO     socket TCP local (espera una conexión)
+
+Cada `step` s de audio nuevo:
+1. VAD sobre la ventana pendiente (el audio aún no finalizado; nunca más de
+   `max_segment` + `step` s).
+2. Las regiones seguidas de ≥ `silence` s sin voz se transcriben (y alinean,
+   salvo --no-align) y se escriben como `"type": "final"`; su audio sale de
+   la ventana. Si la voz sigue sin pausa durante `max_segment` s, se corta en
+   el punto de menor energía del último segundo: la latencia queda acotada.
+3. La voz aún abierta se transcribe como `"type": "partial"` si su texto
+   cambió. Un parcial es provisional: lo sustituyen los finales siguientes.
+
+Los últimos `context` caracteres de texto final se pasan a Whisper como
+prompt de la ventana siguiente (contexto deslizante acotado).
+
+Cada línea lleva `latency`: segundos desde la llegada de la última muestra
+de su audio hasta su escritura. Al terminar se registran p50/p95/máx.
+
+Reproducir un archivo a velocidad real (1×) contra el modo en vivo:
+    python -m src.pipelines.live tests/data/test_audio.wav | python main.py --live - -o -
+"""
+import argparse
+import logging
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from dataclasses import replace
+from typing import BinaryIO, Callable, List, Optional, Tuple
+
+import numpy as np
+from whisperx.audio import SAMPLE_RATE
+
+from src.formatting.jsonl import SegmentEncoder
+from src.utils.events import events
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"s16le": np.dtype("<i2"), "f32le": np.dtype("<f4")}
+READ_BYTES = 1 << 14        # lectura máxima por llamada (~0.5 s de s16le)
+KEEP_S = 0.3                # audio que se conserva antes de la voz (inicio de palabra)
+MIN_PARTIAL_S = 0.5         # voz abierta mínima para emitir un parcial
+CUT_SEARCH_S = 1.0          # ventana donde se busca el corte forzado
+FRAME_S = 0.02              # trama para la energía del corte
+
+
+# ----------------------------------------------------------------------
+# Fuentes de audio
+# ----------------------------------------------------------------------
+def _listen(family: int, address) -> Tuple[BinaryIO, Callable[[], None]]:
+    server = socket.socket(family, socket.SOCK_STREAM)
+    if family == socket.AF_INET:
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(address)
+    server.listen(1)
+    logger.info(f"Esperando audio en {address}")
+    conn, _ = server.accept()
+    stream = conn.makefile("rb")
+
+    def close() -> None:
+        stream.close()
+        conn.close()
+        server.close()
+        if family == socket.AF_UNIX:
+            os.unlink(address)
+
+    return stream, close
+
+
+def _address(spec: str):
+    """(familia, dirección) de unix:/ruta o tcp:HOST:PUERTO; None si es una ruta."""
+    if spec.startswith("unix:"):
+        return socket.AF_UNIX, spec[len("unix:"):]
+    if spec.startswith("tcp:"):
+        host, port = spec[len("tcp:"):].rsplit(":", 1)
+        return socket.AF_INET, (host, int(port))
+    return None
+
+
+def open_source(spec: str) -> Tuple[BinaryIO, Callable[[], None]]:
+    """(flujo binario, cierre) de la fuente `spec` (ver docstring del módulo)."""
+    if spec == "-":
+        return sys.stdin.buffer, lambda: None
+    address = _address(spec)
+    if address is not None:
+        family, addr = address
+        if family == socket.AF_UNIX and os.path.exists(addr):
+            os.unlink(addr)
+        return _listen(family, addr)
+    stream = open(spec, "rb")          # un FIFO bloquea aquí hasta que haya escritor
+    return stream, stream.close
+
+
+def read_wav_header(stream: BinaryIO, fmt: str) -> Tuple[str, bytes]:
+    """
+    Si el flujo empieza con RIFF/WAVE, valida fmt (mono, 16 kHz, s16 o f32)
+    y la salta. Devuelve (formato efectivo, bytes ya leídos de muestras).
+    """
+    head = _read_exact(stream, 12)
+    if head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        return fmt, head
+    while True:
+        chunk = _read_exact(stream, 8)
+        if len(chunk) < 8:
+            raise ValueError("cabecera WAV incompleta")
+        name, size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+        if name == b"data":
+            return fmt, b""
+        body = _read_exact(stream, size + (size & 1))
+        if name == b"fmt ":
+            tag, channels, rate = struct.unpack("<HHI", body[:8])
+            bits = struct.unpack("<H", body[14:16])[0]
+            if channels != 1 or rate != SAMPLE_RATE:
+                raise ValueError(f"WAV de {channels} canales a {rate} Hz; se requiere mono {SAMPLE_RATE} Hz")
+            if (tag, bits) == (1, 16):
+                fmt = "s16le"
+            elif (tag, bits) == (3, 32):
+                fmt = "f32le"
+            else:
+                raise ValueError(f"WAV con formato {tag} y {bits} bits no admitido (s16 o f32)")
+
+
+def _read_exact(stream: BinaryIO, n: int) -> bytes:
+    data = b""
+    while len(data) < n:
+        block = stream.read(n - len(data))
+        if not block:
+            break
+        data += block
+    return data
+
+
+class PcmReader(threading.Thread):
+    """
+    Lee el flujo en un hilo aparte (la entrada no se bloquea mientras se
+    transcribe) y registra la hora de llegada de cada bloque de muestras.
+    """
+
+    def __init__(self, stream: BinaryIO, fmt: str = "s16le"):
+        super().__init__(name="live-reader", daemon=True)
+        self.stream = stream
+        self.fmt = fmt
+        self.eof = False
+        self.error: Optional[BaseException] = None
+        self._blocks: List[np.ndarray] = []
+        self._pending = 0
+        # Bloques vigentes en [_lo, _hi) de dos buffers crecientes; forget()
+        # descarta los ya finalizados, así arrival() no crece con la sesión
+        self._ends = np.zeros(64, np.int64)     # muestras acumuladas al final de cada bloque
+        self._times = np.zeros(64, np.float64)  # time.monotonic() de su llegada
+        self._lo = self._hi = 0
+        self._total = 0
+        self._cond = threading.Condition()
+
+    def run(self) -> None:
+        try:
+            self.fmt, rest = read_wav_header(self.stream, self.fmt)
+            dtype = FORMATS[self.fmt]
+            read = getattr(self.stream, "read1", self.stream.read)
+            while True:
+                data = rest + read(READ_BYTES)
+                if len(data) == len(rest):
+                    break
+                usable = len(data) - len(data) % dtype.itemsize
+                data, rest = data[:usable], data[usable:]
+                samples = np.frombuffer(data, dtype=dtype)
+                if dtype.kind == "i":
+                    samples = samples.astype(np.float32) / 32768.0
+                else:
+                    samples = samples.astype(np.float32)
+                with self._cond:
+                    self._blocks.append(samples)
+                    self._pending += len(samples)
+                    self._mark(len(samples))
+                    self._cond.notify()
+        except BaseException as e:         # se relanza en el hilo principal
+            self.error = e
+        finally:
+            with self._cond:
+                self.eof = True
+                self._cond.notify()
+
+    def _mark(self, n: int) -> None:
+        """Registra la llegada de n muestras (con el lock tomado)."""
+        if self._hi == len(self._ends):
+            live = self._hi - self._lo
+            size = 2 * len(self._ends) if live > len(self._ends) // 2 else len(self._ends)
+            for name in ("_ends", "_times"):
+                old = getattr(self, name)
+                new = np.empty(size, old.dtype)
+                new[:live] = old[self._lo:self._hi]
+                setattr(self, name, new)
+            self._lo, self._hi = 0, live
+        self._total += n
+        self._ends[self._hi] = self._total
+        self._times[self._hi] = time.monotonic()
+        self._hi += 1
+
+    def take(self, min_samples: int) -> Tuple[np.ndarray, bool]:
+        """
+        Espera a tener ≥ min_samples nuevas (o EOF) y devuelve (muestras,
+        fin): con fin=True no llegará nada más.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending >= min_samples or self.eof)
+            if self.error is not None:
+                raise self.error
+            out = np.concatenate(self._blocks) if self._blocks else np.zeros(0, np.float32)
+            self._blocks, self._pending = [], 0
+            return out, self.eof
+
+    def arrival(self, sample: int) -> float:
+        """Hora de llegada (monotonic) del bloque que contenía la muestra `sample`."""
+        with self._cond:
+            ends = self._ends[self._lo:self._hi]
+            i = int(np.searchsorted(ends, sample, side="right"))
+            return float(self._times[self._lo + min(i, len(ends) - 1)])
+
+    def forget(self, sample: int) -> None:
+        """Descarta los bloques que terminan antes de `sample` (conserva el último)."""
+        with self._cond:
+            ends = self._ends[self._lo:self._hi]
+            self._lo += min(int(np.searchsorted(ends, sample, side="right")), max(0, len(ends) - 1))
+
+
+# ----------------------------------------------------------------------
+# Sesión en vivo
+# ----------------------------------------------------------------------
+def quietest_point(audio: np.ndarray, lo: float, hi: float) -> float:
+    """Instante (s) de la trama de menor energía de audio[lo:hi]."""
+    frame = int(FRAME_S * SAMPLE_RATE)
+    s0, s1 = int(lo * SAMPLE_RATE), int(hi * SAMPLE_RATE)
+    n = (s1 - s0) // frame
+    if n < 1:
+        return hi
+    energy = np.square(audio[s0:s0 + n * frame].reshape(n, frame)).mean(axis=1)
+    return (s0 + (int(np.argmin(energy)) + 0.5) * frame) / SAMPLE_RATE
+
+
+class LiveSession:
+    """
+    Ventana pendiente y emisión de segmentos. `buf` guarda el audio aún no
+    finalizado y `t0` su posición (s) en el flujo.
+    """
+
+    def __init__(self, t, vad, reader: PcmReader, out: BinaryIO, device: str, batch_size: int,
+                 align: bool, step_s: float, silence_s: float, max_segment_s: float,
+                 context_chars: int, partials: bool, precision: Optional[int] = None):
+        self.t = t
+        self.vad = vad
+        self.reader = reader
+        self.out = out
+        self.device = device
+        self.batch_size = batch_size
+        self.align = align
+        self.step_s = step_s
+        self.silence_s = silence_s
+        self.max_segment_s = max_segment_s
+        self.context_chars = context_chars
+        self.partials = partials
+        self.encoder = SegmentEncoder(precision)
+
+        self.buf = np.zeros(0, np.float32)
+        self.t0 = 0.0
+        self.next_id = 0
+        self.context = ""
+        self.partial_text: Optional[str] = None
+        self.latencies = {"final": [], "partial": []}
+        self.base_prompt = t.model.options.initial_prompt
+
+    # --- salida -----------------------------------------------------------
+    def _emit(self, kind: str, seg: dict) -> None:
+        last = max(0, int(round(seg["end"] * SAMPLE_RATE)) - 1)
+        latency = time.monotonic() - self.reader.arrival(last)
+        self.latencies[kind].append(latency)
+        rec = {"type": kind, "id": self.next_id, **seg, "latency": round(latency, 3)}
+        self.out.write(self.encoder.encode(rec))
+        self.out.flush()
+        if kind == "final":
+            self.next_id += 1
+            events.count("live", "final_segments", 1)
+
+    def _set_prompt(self) -> None:
+        prompt = " ".join(p for p in (self.base_prompt, self.context) if p) or None
+        self.t.model.options = replace(self.t.model.options, initial_prompt=prompt)
+
+    # --- etapas -----------------------------------------------------------
+    def _transcribe(self, audio: np.ndarray, chunks: list) -> list:
+        return [seg for seg in self.t.transcribe_chunks(audio, chunks, self.batch_size)
+                if seg["text"].strip()]
+
+    def _finalize(self, regions: np.ndarray, cut: float) -> None:
+        from src.asr.transcriber import shift_times
+        from src.asr.vad import merge_regions
+
+        window = self.buf[:int(round(cut * SAMPLE_RATE))]
+        segs = []
+        if len(regions):
+            chunks = merge_regions(regions, self.t.chunk_size, self.t.vad_onset, self.t.vad_offset)
+            segs = self._transcribe(window, chunks)
+        if segs and self.align:
+            result = {"segments": segs, "language": self.t.language}
+            segs = [seg for _, out in self.t.align_iter(result, window, self.device, False) for seg in out]
+        for seg in segs:
+            shift_times([seg], self.t0)
+            shift_times(seg.get("words"), self.t0)
+            self._emit("final", seg)
+        if segs and self.context_chars > 0:
+            text = (self.context + " " + " ".join(s["text"].strip() for s in segs)).strip()
+            self.context = text[-self.context_chars:]
+            self._set_prompt()
+        self._drop(cut)
+        self.partial_text = None
+
+    def _partial(self, regions: np.ndarray) -> None:
+        duration = len(self.buf) / SAMPLE_RATE
+        if len(regions) == 0 or duration - regions[0, 0] < MIN_PARTIAL_S:
+            return
+        segs = self._transcribe(self.buf, [{"start": float(regions[0, 0]), "end": duration}])
+        text = " ".join(s["text"].strip() for s in segs)
+        if text and text != self.partial_text:
+            self.partial_text = text
+            self._emit("partial", {"start": round(self.t0 + regions[0, 0], 3),
+                                   "end": round(self.t0 + duration, 3), "text": text})
+
+    def _drop(self, seconds: float) -> None:
+        n = min(len(self.buf), max(0, int(round(seconds * SAMPLE_RATE))))
+        self.buf = self.buf[n:]
+        self.t0 += n / SAMPLE_RATE
+        self.reader.forget(int(round(self.t0 * SAMPLE_RATE)))
+
+    def step(self, eof: bool) -> None:
+        from src.asr.vad import speech_regions
+
+        t = self.t
+        regions = speech_regions(self.vad, self.buf, t.chunk_size, t.vad_onset, t.vad_offset)
+        if len(regions) == 0:
+            self._drop(len(self.buf) / SAMPLE_RATE - (0 if eof else KEEP_S))
+            self.partial_text = None
+            return
+        # Silencio inicial fuera: max_segment cuenta desde el comienzo de la voz
+        lead = max(0.0, float(regions[0, 0]) - KEEP_S)
+        if lead > 0:
+            self._drop(lead)
+            regions = regions - lead
+        duration = len(self.buf) / SAMPLE_RATE
+
+        horizon = duration if eof else duration - self.silence_s
+        closed = regions[regions[:, 1] <= horizon]
+        cut = float(closed[-1, 1]) if len(closed) else None
+        if cut is None and duration >= self.max_segment_s:
+            # Voz sin pausa: corte forzado en el tramo más silencioso del último segundo
+            cut = quietest_point(self.buf, max(float(regions[0, 0]), duration - CUT_SEARCH_S), duration)
+            closed = regions[regions[:, 0] < cut].copy()
+            closed[:, 1] = np.minimum(closed[:, 1], cut)
+        if cut is not None:
+            self._finalize(closed, cut)
+            regions = regions[regions[:, 1] > cut] - cut
+            regions[:, 0] = np.maximum(regions[:, 0], 0.0)
+        if self.partials and not eof:
+            self._partial(regions)
+
+    def run(self) -> None:
+        step = int(self.step_s * SAMPLE_RATE)
+        while True:
+            new, eof = self.reader.take(step)
+            if len(new):
+                self.buf = np.concatenate([self.buf, new])
+                events.audio("live", len(new) / SAMPLE_RATE)
+            if len(self.buf):
+                self.step(eof)
+            if eof:
+                return
+
+    def summary(self) -> None:
+        logger.info(f"En vivo: {self.t0:.1f} s de audio, {self.next_id} segmentos finales")
+        for kind, values in self.latencies.items():
+            if values:
+                v = np.asarray(values)
+                logger.info(f"Latencia {kind}: p50 {np.percentile(v, 50):.2f} s, "
+                            f"p95 {np.percentile(v, 95):.2f} s, máx {v.max():.2f} s ({len(v)})")
+
+
+def run_live(source: str, output: str, device: str, model_name: str, compute_type: str,
+             model_dir: str, allow_tf32: bool, vad_method: str, vad_onset: float, vad_offset: float,
+             chunk_size: int, temperature: float, beam_size: int, initial_prompt: Optional[str],
+             no_align: bool, align_model_name: Optional[str], align_batch: Optional[int],
+             align_dtype: str = "float32", align_emission_s: float = 0.0,
+             asr_threads: int = 0, jsonl_precision: Optional[int] = None,
+             live_format: str = "s16le", step_s: float = 1.0, silence_s: float = 0.6,
+             max_segment_s: float = 10.0, context_chars: int = 200, partials: bool = True) -> None:
+    """
+    Transcribe `source` en vivo y escribe JSONL en `output` ("-" = stdout)
+    línea a línea. Sin diarización; ASR en un solo proceso.
+    """
+    from src.asr.vad import get_vad
+    from src.pipelines.full_pipeline import auto_align_batch, get_transcriber
+
+    # Whisper no admite ventanas de más de 30 s
+    max_segment_s = min(max_segment_s, 30.0)
+    align_batch = auto_align_batch(align_batch, model_name, align_model_name, device, align_dtype)
+    t = get_transcriber(
+        model_name, device, compute_type, model_dir, allow_tf32,
+        vad_method, vad_onset, vad_offset, chunk_size,
+        temperature, beam_size, initial_prompt,
+        align_model_name, align_batch, asr_threads, 0,
+        align_dtype, align_emission_s,
+    )
+    if not no_align:
+        t.preload_align_model(device)
+    vad = get_vad(vad_method, device, vad_onset, vad_offset, chunk_size)
+
+    stream, close = open_source(source)
+    out = sys.stdout.buffer if output == "-" else open(output, "wb")
+    reader = PcmReader(stream, live_format)
+    session = LiveSession(
+        t, vad, reader, out, device, batch_size=1, align=not no_align,
+        step_s=step_s, silence_s=silence_s, max_segment_s=max_segment_s,
+        context_chars=context_chars, partials=partials, precision=jsonl_precision,
+    )
+    options = t.model.options
+    reader.start()
+    try:
+        session.run()
+    finally:
+        t.model.options = options          # el modelo del registro vuelve a su prompt
+        session.summary()
+        if out is not sys.stdout.buffer:
+            out.close()
+        close()
+
+
+# ----------------------------------------------------------------------
+# CLI: reproduce un archivo como PCM s16le a velocidad real
+# ----------------------------------------------------------------------
+def open_sink(spec: str) -> BinaryIO:
+    if spec == "-":
+        return sys.stdout.buffer
+    address = _address(spec)
+    if address is None:
+        return open(spec, "wb")            # FIFO: bloquea hasta que haya lector
+    family, addr = address
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.connect(addr)
+    return sock.makefile("wb")
+
+
+def main(argv=None) -> int:
+    from whisperx.audio import load_audio
+
+    parser = argparse.ArgumentParser(
+        description="Envía un audio como PCM s16le mono 16 kHz a ritmo real (para probar --live)"
+    )
+    parser.add_argument("audio")
+    parser.add_argument("--to", default="-", help="Destino: - (stdout), FIFO, unix:/ruta.sock o tcp:HOST:PUERTO")
+    parser.add_argument("--speed", type=float, default=1.0, help="Velocidad relativa (por defecto 1×; 0 = sin pausa)")
+    parser.add_argument("--chunk-ms", type=float, default=100.0, help="Muestras por escritura, en ms")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    audio = load_audio(args.audio)
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    step = max(1, int(args.chunk_ms / 1000 * SAMPLE_RATE))
+    sink = open_sink(args.to)
+    t0 = time.monotonic()
+    try:
+        for start in range(0, len(pcm), step):
+            if args.speed > 0:
+                delay = t0 + start / SAMPLE_RATE / args.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            sink.write(pcm[start:start + step].tobytes())
+            sink.flush()
+    except BrokenPipeError:
+        return 1
+    finally:
+        try:
+            sink.close()
+        except BrokenPipeError:
+            pass
+    logger.info(f"{len(pcm) / SAMPLE_RATE:.1f} s enviados en {time.monotonic() - t0:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,127 @@
+#./src/pipelines/result_cache.py
+"""
+Caché de resultados direccionado por contenido.
+
+    <root>/<clave>.jsonl       salida final del pipeline
+    <root>/<clave>.meta.json   audio de origen, opciones y fecha
+
+La clave es el hash del audio decodificado + las opciones que cambian el
+resultado; un archivo re-subido o re-encolado se resuelve copiando el JSONL.
+El mtime del .jsonl marca el último uso y guía la expulsión LRU por tamaño.
+
+Inspección y purga:
+    python -m src.pipelines.result_cache --dir <root> list
+    python -m src.pipelines.result_cache --dir <root> purge [--all | --older-than-days N | CLAVE ...]
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from src.pipelines.checkpoint import stage_key
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    def __init__(self, root: str, max_bytes: int = 2 * 2**30):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(a_hash: str, **options) -> str:
+        return stage_key(a_hash, **options)
+
+    def _jsonl(self, key: str) -> Path:
+        return self.root / f"{key}.jsonl"
+
+    def _meta(self, key: str) -> Path:
+        return self.root / f"{key}.meta.json"
+
+    def fetch(self, key: str, output_jsonl: str) -> Optional[str]:
+        """Copia la entrada a `output_jsonl` si existe; None si no hay acierto."""
+        entry = self._jsonl(key)
+        if not entry.exists():
+            return None
+        shutil.copyfile(entry, output_jsonl)
+        os.utime(entry)                      # último uso (LRU)
+        logger.info(f"Resultado en caché ({key[:12]}) → {output_jsonl}")
+        return output_jsonl
+
+    def store(self, key: str, jsonl_path: str, meta: dict) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        entry = self._jsonl(key)
+        tmp = entry.with_suffix(".jsonl.tmp")
+        shutil.copyfile(jsonl_path, tmp)
+        os.replace(tmp, entry)
+        with self._meta(key).open("w", encoding="utf-8") as f:
+            json.dump(dict(meta, created=time.time()), f, ensure_ascii=False)
+        self._evict()
+
+    def entries(self) -> List[dict]:
+        """Entradas ordenadas de la más a la menos usada recientemente."""
+        out = []
+        for entry in self.root.glob("*.jsonl"):
+            key = entry.stem
+            st = entry.stat()
+            try:
+                meta = json.loads(self._meta(key).read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                meta = {}
+            out.append({"key": key, "size": st.st_size, "last_used": st.st_mtime, **meta})
+        return sorted(out, key=lambda e: e["last_used"], reverse=True)
+
+    def remove(self, key: str) -> None:
+        for path in (self._jsonl(key), self._meta(key)):
+            path.unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        entries = self.entries()
+        total = sum(e["size"] for e in entries)
+        while total > self.max_bytes and len(entries) > 1:
+            old = entries.pop()
+            self.remove(old["key"])
+            total -= old["size"]
+            logger.info(f"Resultado {old['key'][:12]} expulsado del caché")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspección y purga del caché de resultados")
+    parser.add_argument("--dir", required=True, help="Directorio del caché (--result-cache-dir)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list", help="Lista las entradas (más recientes primero)")
+    purge = sub.add_parser("purge", help="Elimina entradas")
+    purge.add_argument("keys", nargs="*", help="Claves (o prefijos) a eliminar")
+    purge.add_argument("--all", action="store_true", help="Vacía el caché completo")
+    purge.add_argument("--older-than-days", type=float, default=None,
+                       help="Elimina entradas sin uso en los últimos N días")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.dir)
+    entries = cache.entries()
+    if args.cmd == "list":
+        for e in entries:
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(e["last_used"]))
+            print(f"{e['key'][:12]}  {e['size'] / 2**20:8.2f} MiB  {used}  {e.get('audio_file', '?')}")
+        print(f"{len(entries)} entradas, {sum(e['size'] for e in entries) / 2**20:.2f} MiB")
+        return
+
+    if not (args.all or args.keys or args.older_than_days is not None):
+        parser.error("purge requiere claves, --all o --older-than-days")
+    cutoff = time.time() - args.older_than_days * 86400 if args.older_than_days is not None else None
+    removed = 0
+    for e in entries:
+        if (args.all
+                or any(e["key"].startswith(k) for k in args.keys)
+                or (cutoff is not None and e["last_used"] < cutoff)):
+            cache.remove(e["key"])
+            removed += 1
+    print(f"{removed} entradas eliminadas")
+
+
+if __name__ == "__main__":
+    main()
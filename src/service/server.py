@@ -0,0 +1,256 @@
+# src/service/server.py
+"""
+Servicio HTTP local que mantiene Whisper, alineación y pyannote en memoria.
+
+    POST /jobs    cuerpo JSON: {"audio": "ruta.wav", "max_speakers": 3, ...}
+                  (mismas opciones que la CLI, con el nombre de su atributo)
+                  → respuesta application/x-ndjson con un segmento por línea;
+                    con "stream_output": true, cada línea se envía en cuanto
+                    se escribe (si el trabajo falla a mitad, la última línea
+                    es {"error": ...}); si no, al terminar el trabajo
+    GET  /health  → modelos cargados en el registro
+    GET  /metrics → métricas Prometheus por etapa (utils/telemetry.py)
+
+Los trabajos se ejecutan de uno en uno (un único dispositivo); los modelos se
+cargan con el primer trabajo que los necesita y quedan en `registry`.
+
+Cada trabajo parte de las opciones con que se arrancó el servidor; el cuerpo
+sólo cambia las de `_SERVER_ONLY` excluidas, validadas con el tipo y las
+opciones de su argumento en el parser. Las rutas de escritura (salida,
+cachés, checkpoints, modelos, índice de hablantes) las fija el servidor: la
+salida va a un temporal propio de cada trabajo.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from src.pipelines.full_pipeline import run_pipeline
+from src.asr.align_cache import align_cache
+from src.utils.registry import registry
+from src.utils.telemetry import PrometheusSink
+
+logger = logging.getLogger(__name__)
+
+# Opciones propias del servidor que un trabajo no puede cambiar
+# (output_format, compress: la respuesta es siempre NDJSON sin comprimir;
+# output, resume y las rutas: ningún trabajo lee ni escribe fuera de ellas)
+_SERVER_ONLY = {"serve", "host", "port", "show_progress", "manifest", "output_dir", "align_cache_mb",
+                "calibration_file", "output_format", "compress", "output", "resume",
+                "audio_cache_dir", "checkpoint_dir", "embedding_cache_dir", "result_cache_dir",
+                "result_cache_mb", "model_dir", "speaker_index",
+                "log_progress", "metrics_file", "metrics_port", "profile", "profile_out", "profile_torch",
+                "live"}
+
+TAIL_INTERVAL_S = 0.2       # sondeo del .part de un trabajo con stream_output
+
+
+def _coerce(action: argparse.Action, value):
+    """Valida `value` (JSON) como lo haría argparse con el argumento `action`."""
+    name = action.dest
+    if action.nargs == 0:                                   # store_true / store_false
+        if not isinstance(value, bool):
+            raise ValueError(f"{name}: se esperaba true/false")
+        return value
+    if value is None:
+        if action.default is not None:
+            raise ValueError(f"{name}: no admite null")
+        return None
+    if isinstance(value, (dict, list, bool)):
+        raise ValueError(f"{name}: valor no válido {value!r}")
+    if action.type in (None, str):
+        if not isinstance(value, str):
+            raise ValueError(f"{name}: se esperaba un texto")
+    else:
+        try:
+            value = action.type(str(value))                 # "3.5" no pasa por int, como en la CLI
+        except (TypeError, ValueError):
+            raise ValueError(f"{name}: valor no válido {value!r}") from None
+    if action.choices is not None and value not in action.choices:
+        raise ValueError(f"{name}: {value!r} no está entre {', '.join(map(str, action.choices))}")
+    return value
+
+
+def _job_args(parser: argparse.ArgumentParser, body, base: Optional[argparse.Namespace] = None
+              ) -> argparse.Namespace:
+    """
+    Construye el Namespace de un trabajo partiendo de `base` (las opciones
+    del servidor; por defecto, las del parser) y aplicando las del cuerpo JSON.
+    """
+    if not isinstance(body, dict):
+        raise ValueError("el cuerpo debe ser un objeto JSON")
+    if "audio" not in body:
+        raise ValueError("falta 'audio'")
+    if not isinstance(body["audio"], str):
+        raise ValueError("audio: se esperaba una ruta")
+    args = argparse.Namespace(**vars(base if base is not None else parser.parse_args([])))
+    args.audio = body["audio"]
+    args.resume = False
+    actions = {a.dest: a for a in parser._actions}
+    for key, value in body.items():
+        if key == "audio":
+            continue
+        if key in _SERVER_ONLY:
+            raise ValueError(f"opción reservada al servidor: {key}")
+        if key not in actions or key == "help":
+            raise ValueError(f"opción desconocida: {key}")
+        setattr(args, key, _coerce(actions[key], value))
+    return args
+
+
+def make_handler(parser, resolve_args, pipeline_kwargs, metrics: Optional[PrometheusSink] = None,
+                 base: Optional[argparse.Namespace] = None,
+                 set_threads: Callable[[int], None] = lambda n: None) -> type:
+    job_lock = threading.Lock()
+
+    class JobHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.0"
+
+        def _send_json(self, status: int, payload: dict) -> None:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _start_ndjson(self) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+
+        def do_GET(self) -> None:
+            if self.path == "/metrics" and metrics is not None:
+                data = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            if self.path != "/health":
+                self._send_json(404, {"error": "ruta desconocida"})
+                return
+            self._send_json(200, {
+                "models": [repr(k) for k in registry.keys()],
+                "align_models": [repr(k) for k in align_cache.keys()],
+            })
+
+        def _tail(self, part: str, job: threading.Thread) -> bool:
+            """
+            Envía las líneas completas de `part` mientras `job` corre. False
+            si el .part no llegó a crearse (el trabajo terminó antes: fallo o
+            acierto de caché); entonces aún no se ha enviado nada.
+            """
+            while not os.path.exists(part):
+                if not job.is_alive():
+                    return False
+                job.join(TAIL_INTERVAL_S)
+            self._start_ndjson()
+            pending = b""
+            # Al terminar, close() renombra el .part: el descriptor abierto sigue leyéndolo
+            with open(part, "rb") as f:
+                while True:
+                    done = not job.is_alive()
+                    pending += f.read()
+                    *lines, pending = pending.split(b"\n")
+                    for line in lines:
+                        self.wfile.write(line + b"\n")
+                    self.wfile.flush()
+                    if done:
+                        return True
+                    job.join(TAIL_INTERVAL_S)
+
+        def do_POST(self) -> None:
+            if self.path != "/jobs":
+                self._send_json(404, {"error": "ruta desconocida"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                args = _job_args(parser, body, base)
+            except (ValueError, SystemExit) as err:
+                self._send_json(400, {"error": str(err)})
+                return
+
+            # Cada trabajo escribe en un directorio temporal propio, que se borra tras enviarlo
+            tmp_dir = tempfile.mkdtemp(prefix="whisper-es-job-")
+            tmp_out = os.path.join(tmp_dir, "salida.jsonl")
+            args.output = tmp_out
+            state: dict = {}
+
+            def run() -> None:
+                try:
+                    t0 = time.perf_counter()
+                    state["out"] = run_pipeline(**pipeline_kwargs(args))
+                    logger.info(f"Trabajo {args.audio} completado en {time.perf_counter() - t0:.1f} s")
+                except Exception as err:
+                    logger.exception(f"Trabajo {args.audio} fallido")
+                    state["error"] = err
+
+            try:
+                with job_lock:
+                    resolve_args(args)
+                    if args.threads:
+                        set_threads(args.threads)
+                    job = threading.Thread(target=run, name="job", daemon=True)
+                    job.start()
+                    try:
+                        streamed = args.stream_output and self._tail(tmp_out + ".part", job)
+                    finally:
+                        job.join()          # aunque el cliente corte: un trabajo cada vez
+                if streamed:
+                    if "error" in state:
+                        self.wfile.write(json.dumps({"error": str(state["error"])},
+                                                    ensure_ascii=False).encode("utf-8") + b"\n")
+                    return
+                if "error" in state:
+                    self._send_json(500, {"error": str(state["error"])})
+                    return
+                self._start_ndjson()
+                with open(state["out"], "rb") as f:
+                    for line in f:
+                        self.wfile.write(line)
+                        self.wfile.flush()
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        def log_message(self, fmt, *a) -> None:
+            logger.info("%s %s", self.address_string(), fmt % a)
+
+    return JobHandler
+
+
+def serve(
+    parser: argparse.ArgumentParser,
+    resolve_args: Callable,
+    pipeline_kwargs: Callable,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    metrics: Optional[PrometheusSink] = None,
+    base: Optional[argparse.Namespace] = None,
+    set_threads: Callable[[int], None] = lambda n: None,
+) -> None:
+    """
+    Arranca el servidor y bloquea hasta Ctrl-C. Con `metrics` (un sink ya
+    suscrito al bus de eventos), GET /metrics devuelve sus agregados.
+    `base`: opciones de arranque del servidor, punto de partida de cada
+    trabajo (rutas, cachés…); `set_threads` aplica --threads a torch.
+    """
+    base = argparse.Namespace(**vars(base)) if base is not None else None
+    handler = make_handler(parser, resolve_args, pipeline_kwargs, metrics, base, set_threads)
+    server = ThreadingHTTPServer((host, port), handler)
+    routes = "POST /jobs, GET /health" + (", GET /metrics" if metrics is not None else "")
+    logger.info(f"Servidor escuchando en http://{host}:{port} ({routes})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
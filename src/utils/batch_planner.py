@@ -0,0 +1,243 @@
+# src/utils/batch_planner.py
+"""
+Planificador de tamaños de lote a partir de memoria medida.
+
+• MemorySampler mide el pico de memoria (VRAM del dispositivo o RSS del
+  proceso) mientras corre una etapa, por encima de la línea base inicial.
+  La medida sólo se atribuye a la etapa si su ventana estuvo aislada: sin
+  otra etapa que reserve memoria a la vez (memory_activity: precarga del
+  modelo de alineación, diarización, decodificación del lote siguiente…).
+• BatchPlanner guarda en JSON, por (etapa, modelo, compute_type, device), los
+  MiB medidos por elemento de lote y elige lotes según la memoria libre.
+  Sin calibración previa recurre a la tabla estimada de siempre.
+"""
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# Consumo base (MiB por frame @ FP16) – valores refinados (sin calibrar)
+BASE_MEM_MIB = {
+    "tiny":      22,
+    "base":      35,
+    "small":     55,
+    "medium":    90,
+    "large":    135,
+    "large-v2": 210,
+    "large-v3": 285,
+    "turbo":    150,
+}
+COMPUTE_FACTOR = {"float16": 1.30, "float32": 2.00, "int8": 0.70}
+ALIGN_MIB_PER_SEG = 0.25        # MiB aprox. por segmento (sin calibrar)
+
+
+def _used_mib(device: str) -> float:
+    if device == "cuda":
+        import torch
+        free, total = torch.cuda.mem_get_info()
+        return (total - free) / 2**20
+    return psutil.Process().memory_info().rss / 2**20
+
+
+def _free_mib(device: str) -> float:
+    if device == "cuda":
+        import torch
+        return torch.cuda.mem_get_info()[0] / 2**20
+    return psutil.virtual_memory().available / 2**20
+
+
+class _MemoryActivity:
+    """
+    Etapas en curso que reservan memoria: `active` ahora mismo y `started`
+    desde el arranque (detecta las que empiezan y acaban dentro de una ventana).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+        self.started = 0
+
+    def enter(self) -> tuple:
+        """Registra una etapa; devuelve (active, started) previos."""
+        with self._lock:
+            before = (self.active, self.started)
+            self.active += 1
+            self.started += 1
+            return before
+
+    def exit(self) -> int:
+        """Da de baja una etapa; devuelve `started` actual."""
+        with self._lock:
+            self.active -= 1
+            return self.started
+
+    @contextmanager
+    def __call__(self):
+        self.enter()
+        try:
+            yield
+        finally:
+            self.exit()
+
+
+# Instancia única del proceso: `with memory_activity(): ...` marca una etapa
+memory_activity = _MemoryActivity()
+
+
+class MemorySampler:
+    """
+    Context manager que muestrea la memoria usada cada `interval` s.
+    Incluye memoria fuera del allocator de torch (p. ej. CTranslate2).
+    `isolated` indica si ninguna otra etapa (memory_activity) coincidió con
+    la ventana; si no, delta_mib incluye memoria ajena y no debe calibrar.
+    Con activity=False sólo mide (p. ej. el pico de un job entero) y no se
+    registra como etapa, así no resta aislamiento a las que calibran.
+    """
+
+    def __init__(self, device: str, interval: float = 0.05, activity: bool = True):
+        self.device = device
+        self.interval = interval
+        self.activity = activity
+        self.base_mib = 0.0
+        self.peak_mib = 0.0
+        self.isolated = False
+        self._stop = threading.Event()
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak_mib = max(self.peak_mib, _used_mib(self.device))
+
+    def __enter__(self) -> "MemorySampler":
+        self._before = memory_activity.enter() if self.activity else None
+        self.base_mib = self.peak_mib = _used_mib(self.device)
+        self._thread = threading.Thread(target=self._poll, name="mem-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_mib = max(self.peak_mib, _used_mib(self.device))
+        if self._before is None:
+            return
+        started_now = memory_activity.exit()
+        active, started = self._before
+        # Sola desde el principio y nadie más empezó durante la ventana
+        self.isolated = active == 0 and started_now == started + 1
+
+    @property
+    def delta_mib(self) -> float:
+        return max(0.0, self.peak_mib - self.base_mib)
+
+
+class BatchPlanner:
+    def __init__(self, path: str = "models/batch_calibration.json", safety: float = 0.80):
+        self.path = path
+        self.safety = safety
+        self._data: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    # ------------- persistencia ------------------------------------
+    def _load(self) -> dict:
+        if self._data is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self._data = {}
+        return self._data
+
+    def _save(self) -> None:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def key(stage: str, model: str, compute_type: str, device: str) -> str:
+        return f"{stage}|{model}|{compute_type}|{device}"
+
+    def mib_per_item(self, key: str) -> Optional[float]:
+        with self._lock:
+            entry = self._load().get(key)
+        return entry["mib_per_item"] if entry else None
+
+    def record(self, key: str, batch_size: int, delta_mib: float) -> None:
+        """
+        Registra una ejecución correcta: pico medido / tamaño de lote.
+        Sólo con medidas de un MemorySampler aislado (ver `isolated`).
+        """
+        if batch_size <= 0 or delta_mib <= 0:
+            return
+        per_item = delta_mib / batch_size
+        with self._lock:
+            data = self._load()
+            prev = data.get(key)
+            if prev:
+                # media móvil: se adapta sin olvidar las mediciones previas
+                per_item = 0.7 * prev["mib_per_item"] + 0.3 * per_item
+            data[key] = {"mib_per_item": per_item, "samples": (prev or {}).get("samples", 0) + 1}
+            self._save()
+        logger.info(f"Calibración {key}: {per_item:.1f} MiB por elemento")
+
+    def record_oom(self, key: str, batch_size: int, budget_mib: float) -> None:
+        """Un OOM con `batch_size` implica ≥ budget/batch MiB por elemento."""
+        floor = budget_mib / max(1, batch_size)
+        with self._lock:
+            data = self._load()
+            prev = data.get(key, {"mib_per_item": 0.0, "samples": 0})
+            prev["mib_per_item"] = max(prev["mib_per_item"], floor)
+            data[key] = prev
+            self._save()
+
+    # ------------- planificación ----------------------------------
+    def budget_mib(self, device: str) -> float:
+        return _free_mib(device) * self.safety
+
+    def plan_asr(self, model: str, compute_type: str, device: str) -> int:
+        """
+        Lote ASR a partir de la calibración; si no la hay, tabla estimada.
+        Llamar con el modelo ya cargado: el presupuesto es la memoria libre.
+        """
+        per_item = self.mib_per_item(self.key("asr", model, compute_type, device))
+        if per_item:
+            batch = max(1, int(self.budget_mib(device) // per_item))
+            logger.info(f"asr_batch calibrado = {batch} ({per_item:.1f} MiB/elemento)")
+            return min(512, batch)
+        if device == "cpu":
+            cores = os.cpu_count() or 1
+            return max(1, min(8, cores))
+        import torch
+        total_vram = torch.cuda.get_device_properties(0).total_memory // 2**20   # MiB
+        est_per_frame = BASE_MEM_MIB.get(model, 210) * COMPUTE_FACTOR.get(compute_type, 1.30)
+        batch_calc = max(4, int(total_vram * self.safety // est_per_frame))
+        # Redondea al múltiplo de 4 más próximo y nunca sobrepasa 512
+        batch = min(512, (batch_calc + 3) // 4 * 4)
+        logger.info(f"asr_batch estimado = {batch} (sin calibración para {model}/{compute_type})")
+        return batch
+
+    def plan_align(self, model: str, device: str, dtype: str = "float32") -> int:
+        """
+        Segmentos por lote de alineación según la memoria libre del
+        dispositivo (VRAM en CUDA, RAM en CPU) y los MiB/segmento medidos.
+        """
+        per_seg = self.mib_per_item(self.key("align", model, dtype, device)) or ALIGN_MIB_PER_SEG
+        avail_mib = _free_mib(device)
+        batch = max(10, int(avail_mib * 0.45 / per_seg))
+        logger.info(
+            f"align_batch dinámico = {batch} "
+            f"({'VRAM' if device == 'cuda' else 'RAM'} libre ≈ {avail_mib:.0f} MiB, {per_seg:.2f} MiB/segmento)"
+        )
+        return batch
+
+
+# Instancia única del proceso
+planner = BatchPlanner()
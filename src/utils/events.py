@@ -0,0 +1,254 @@
+# src/utils/events.py
+"""
+Bus de eventos de progreso y telemetría.
+
+El pipeline emite eventos estructurados y los consumidores (barra Rich, log,
+archivo JSONL de métricas, endpoint Prometheus; ver utils/telemetry.py) se
+suscriben como sinks: cualquier callable que reciba un Event.
+
+    with events.stage("transcribe", total=n_lotes, unit="lote", label="ASR-Transcribe") as advance:
+        ...
+        advance(1)
+
+Tipos de evento (Event.kind):
+    stage_start   total, unit, label, progress (False: subetapa sin barra),
+                  [since_previous: empezó al terminar la etapa anterior del hilo]
+    batch_done    n
+    audio         seconds          (audio procesado por la etapa)
+    count         name, value      (p. ej. palabras escritas)
+    memory        rss_mib, cuda_mib  (al cerrar la etapa: pico de RSS del proceso
+                  desde su arranque y pico CUDA desde el último reset; no
+                  son de la etapa: el pico por etapa lo mide --profile)
+    stage_end     seconds, ok
+
+Sin suscriptores, emit() y stage() se reducen a comprobar una tupla vacía:
+no se crean eventos ni se mide memoria.
+"""
+import io
+import logging
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, NamedTuple, Optional
+
+from src.utils.helpers import peak_rss_mib
+
+logger = logging.getLogger(__name__)
+
+STAGE_START = "stage_start"
+BATCH_DONE = "batch_done"
+AUDIO = "audio"
+COUNT = "count"
+MEMORY = "memory"
+STAGE_END = "stage_end"
+
+
+class Event(NamedTuple):
+    kind: str
+    stage: str
+    time: float         # time.time() de la emisión
+    data: dict
+
+
+def _noop(*_args, **_kwargs) -> None:
+    pass
+
+
+def _cuda_peak_mib() -> Optional[float]:
+    # Sin importar torch: sólo si ya está cargado y CUDA inicializado
+    torch = sys.modules.get("torch")
+    if torch is None or not torch.cuda.is_initialized():
+        return None
+    return torch.cuda.max_memory_allocated() / 2**20
+
+
+class _Stage:
+    """Context manager de una etapa con suscriptores: start/batch/memory/end."""
+
+    __slots__ = ("bus", "name", "start_data", "t0")
+
+    def __init__(self, bus: "EventBus", name: str, start_data: dict):
+        self.bus = bus
+        self.name = name
+        self.start_data = start_data
+
+    def advance(self, n: int = 1) -> None:
+        self.bus.emit(BATCH_DONE, self.name, n=n)
+
+    def __enter__(self) -> Callable[..., None]:
+        self.t0 = time.perf_counter()
+        self.bus.emit(STAGE_START, self.name, **self.start_data)
+        return self.advance
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.bus.emit(MEMORY, self.name, rss_mib=peak_rss_mib(), cuda_mib=_cuda_peak_mib())
+        self.bus.emit(STAGE_END, self.name, seconds=time.perf_counter() - self.t0, ok=exc_type is None)
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self) -> Callable[..., None]:
+        return _noop
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class EventBus:
+    """
+    Lista de sinks copy-on-write: emit() lee la tupla sin bloquear, así que
+    es seguro emitir desde varios hilos (lote, diarización concurrente).
+    Un sink que falla se registra y no interrumpe el pipeline.
+    """
+
+    def __init__(self):
+        self._sinks: tuple = ()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._sinks)
+
+    def subscribe(self, sink: Callable[[Event], None]) -> None:
+        with self._lock:
+            self._sinks = self._sinks + (sink,)
+
+    def unsubscribe(self, sink: Callable[[Event], None]) -> None:
+        with self._lock:
+            self._sinks = tuple(s for s in self._sinks if s is not sink)
+
+    @contextmanager
+    def subscribed(self, *sinks: Callable[[Event], None]):
+        for sink in sinks:
+            self.subscribe(sink)
+        try:
+            yield self
+        finally:
+            for sink in sinks:
+                self.unsubscribe(sink)
+
+    def emit(self, kind: str, stage: str, **data) -> None:
+        sinks = self._sinks
+        if not sinks:
+            return
+        event = Event(kind, stage, time.time(), data)
+        for sink in sinks:
+            try:
+                sink(event)
+            except Exception:
+                logger.exception(f"Sink de eventos fallido: {sink!r}")
+
+    def stage(self, name: str, total: int = 1, unit: str = "", label: Optional[str] = None,
+              progress: bool = True):
+        """
+        Context manager de la etapa `name`; devuelve advance(n=1). Sin
+        suscriptores es un objeto compartido que no hace nada.
+        progress=False marca subetapas que sólo interesan a log y métricas.
+        """
+        if not self._sinks:
+            return _NULL_STAGE
+        return _Stage(self, name, {"total": total, "unit": unit, "label": label or name,
+                                   "progress": progress})
+
+    def audio(self, stage: str, seconds: float) -> None:
+        self.emit(AUDIO, stage, seconds=seconds)
+
+    def count(self, stage: str, name: str, value: int) -> None:
+        self.emit(COUNT, stage, name=name, value=value)
+
+
+class PyannoteHook:
+    """
+    Adapta el protocolo de hooks de pyannote (step_name, artifact, total,
+    completed) a eventos: cada paso interno es una etapa `<prefix>/<paso>`.
+    """
+
+    def __init__(self, bus: EventBus, prefix: str = "diarize"):
+        self.bus = bus
+        self.prefix = prefix
+        self._stage: Optional[str] = None
+        self._done = 0
+        self._t0 = 0.0
+        self._last_end = time.perf_counter()
+        self._seen: set = set()
+
+    def _start(self, stage: str, total: int, label: str, **extra) -> None:
+        self._finish()
+        self._stage, self._done, self._t0 = stage, 0, time.perf_counter()
+        self._seen.add(stage)
+        self.bus.emit(STAGE_START, stage, total=total, unit="", label=label, progress=True, **extra)
+
+    def _finish(self) -> None:
+        if self._stage is None:
+            return
+        self._last_end = time.perf_counter()
+        self.bus.emit(STAGE_END, self._stage, seconds=self._last_end - self._t0, ok=True)
+        self._stage = None
+
+    def __call__(self, step_name: str, step_artifact=None, file=None,
+                 total: Optional[int] = None, completed: Optional[int] = None) -> None:
+        stage = f"{self.prefix}/{step_name}"
+        if completed is None:
+            # Aviso de paso terminado (artefacto): sólo cuenta si no tuvo progreso
+            # propio, y su duración es el trabajo hecho desde el paso anterior
+            # (p. ej. clustering y reconstrucción preceden a "discrete_diarization")
+            if stage in self._seen:
+                return
+            self._start(stage, 1, step_name, since_previous=True)
+            self._t0 = self._last_end
+            completed = total = 1
+        if stage != self._stage:
+            self._start(stage, total, step_name)
+        if completed > self._done:
+            self.bus.emit(BATCH_DONE, stage, n=completed - self._done)
+            self._done = completed
+        if completed >= total:
+            self._finish()
+
+    def close(self) -> None:
+        self._finish()
+
+
+class ProgressPrints(io.TextIOBase):
+    """
+    stdout de sustitución para versiones de WhisperX sin progress_callback:
+    convierte sus líneas «Progress: N%...» (print_progress=True) en
+    callback(N) y deja pasar a `passthrough` el resto del texto.
+    """
+
+    _PATTERN = re.compile(r"Progress:\s*([0-9.]+)%")
+
+    def __init__(self, callback: Callable[[float], None], passthrough=None):
+        self.callback = callback
+        self.passthrough = passthrough
+        self._pending = ""      # línea aún sin "\n" (print escribe texto y fin por separado)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        *lines, self._pending = (self._pending + s).split("\n")
+        for line in lines:
+            m = self._PATTERN.search(line)
+            if m:
+                self.callback(float(m.group(1)))
+            elif self.passthrough is not None:
+                self.passthrough.write(line + "\n")
+        return len(s)
+
+    def flush(self) -> None:
+        if self._pending and not self._PATTERN.search(self._pending) and self.passthrough is not None:
+            self.passthrough.write(self._pending)
+            self._pending = ""
+        if self.passthrough is not None:
+            self.passthrough.flush()
+
+
+# Instancia única del proceso
+events = EventBus()
@@ -0,0 +1,15 @@
+# src/utils/helpers.py
+import resource
+import sys
+
+
+def peak_rss_mib() -> float:
+    """
+    Devuelve el RSS pico del proceso (MiB) desde su arranque: no baja entre
+    jobs ni etapas (para una ventana concreta, batch_planner.MemorySampler).
+    En Linux ru_maxrss viene en KiB; en macOS, en bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
@@ -1,24 +1,28 @@
 # src/utils/hooks.py
 from __future__ import annotations
-from typing import Callable, Optional
-from pyannote.audio.pipelines.utils.hook import ProgressHook
+from typing import Dict
 from rich.console import Console
 from rich.progress import (
     Progress, TextColumn, BarColumn, TaskProgressColumn, TimeRemainingColumn
 )
+from src.utils.events import BATCH_DONE, STAGE_END, STAGE_START, Event
 
-class ForcedProgressHook(ProgressHook):
+class ForcedProgressHook:
     """
-    Extiende el ProgressHook oficial de pyannote.
-    • new_phase(nombre, total)  → devuelve lambda advance(n)
-    • close_phase()             → marca la tarea como concluida
-    Todas las barras comparten el mismo estilo Rich.
+    Barra Rich unificada de todas las etapas; se suscribe al bus de eventos
+    (utils/events.py) con on_event. No depende de pyannote: los pasos de la
+    diarización llegan como eventos vía events.PyannoteHook.
+    • stage_start  → nueva tarea Rich (salvo subetapas con progress=False)
+    • batch_done   → avanza su tarea
+    • stage_end    → la marca como concluida
+    Cada etapa tiene su propia barra (p. ej. diarización concurrente con el
+    ASR); todas comparten el mismo estilo Rich.
     """
 
     def __init__(self, transient: bool = False) -> None:
         self.console = Console()
-        super().__init__(transient=transient)
-        self._task_id: Optional[int] = None   # id de la tarea Rich en curso
+        self.transient = transient
+        self._tasks: Dict[str, int] = {}      # etapa → id de la tarea Rich en curso
 
     # ------------- ciclo de vida del contexto ---------------------
     def __enter__(self) -> "ForcedProgressHook":
@@ -35,27 +39,31 @@ class ForcedProgressHook(ProgressHook):
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
-        # cierra la última fase si quedó abierta
-        self.close_phase()
+        # cierra las etapas que quedaron abiertas
+        for stage in list(self._tasks):
+            self._complete(stage)
         self.progress.stop()
-        super().__exit__(exc_type, exc_val, exc_tb)
 
-    # ------------- API pública para el resto del pipeline ---------
-    def new_phase(self, name: str, total: int = 1, unit: str = "") -> Callable[[int], None]:
-        """
-        Inicia una nueva tarea Rich y devuelve un atajo 'advance'.
-        • name  : etiqueta que se muestra (se rellena a 15 caracteres para alinear)
-        • total : número total de pasos; 1 si solo quieres un «tick» final
-        • unit  : texto breve (p. ej. 'seg', 'batch'); opcional
-        """
-        self.close_phase()  # finaliza la tarea previa, si existe
-        label = f"{name:15s}"
-        self._task_id = self.progress.add_task(label, total=total, unit=unit)
-        return lambda n=1: self.progress.update(self._task_id, advance=n)
+    # ------------- sink del bus de eventos -------------------------
+    def on_event(self, event: Event) -> None:
+        if event.kind == STAGE_START:
+            self._complete(event.stage)         # una etapa repetida reinicia su barra
+            if not event.data["progress"]:
+                return                          # subetapa: sólo para log y métricas
+            label = f"{event.data['label']:15s}"  # se rellena a 15 caracteres para alinear
+            self._tasks[event.stage] = self.progress.add_task(
+                label, total=event.data["total"], unit=event.data["unit"]
+            )
+        elif event.kind == BATCH_DONE:
+            task_id = self._tasks.get(event.stage)
+            if task_id is not None:
+                self.progress.update(task_id, advance=event.data["n"])
+        elif event.kind == STAGE_END:
+            self._complete(event.stage)
 
-    def close_phase(self) -> None:
-        """Marca la fase actual como completada (si hay una en curso)."""
-        if self._task_id is not None:
-            task = self.progress.tasks[self._task_id]
-            self.progress.update(self._task_id, completed=task.total)
-            self._task_id = None
+    def _complete(self, stage: str) -> None:
+        """Marca la tarea de `stage` como completada (si hay una en curso)."""
+        task_id = self._tasks.pop(stage, None)
+        if task_id is not None:
+            task = self.progress.tasks[task_id]
+            self.progress.update(task_id, completed=task.total)
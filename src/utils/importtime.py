@@ -0,0 +1,120 @@
+# src/utils/importtime.py
+"""
+Presupuesto de arranque de la CLI.
+
+Ejecuta `python -X importtime main.py -h` en un subproceso, suma el tiempo
+de importación y falla (código 1) si supera --budget-ms o si se cargó algún
+módulo pesado que main.py sólo debe importar al ejecutar una etapa.
+
+    python -m src.utils.importtime
+    python -m src.utils.importtime --budget-ms 300 --top 15 -- --serve -h
+
+tests/test_importtime.py aplica el mismo presupuesto (IMPORTTIME_BUDGET_MS
+lo ajusta en máquinas lentas) y comprueba sys.modules tras `-h` y tras un
+error de argumentos con --no-diarize.
+"""
+import argparse
+import json
+import logging
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET_MS = 500
+HEAVY_MODULES = ("torch", "torchaudio", "whisperx", "pyannote", "pandas", "speechbrain", "transformers")
+# En sys.modules: main.py registra un pyannote.audio.utils.version propio,
+# así que de pyannote se comprueba el paquete real
+HEAVY_PACKAGES = ("torch", "torchaudio", "whisperx", "pyannote.audio", "pandas", "speechbrain", "transformers")
+
+# Ejecuta main.py como __main__ con argv y, salga como salga, lista los
+# paquetes pesados presentes en sys.modules
+_PROBE = """
+import json, runpy, sys
+argv, heavy = json.loads(sys.argv[1]), json.loads(sys.argv[2])
+sys.argv = ["main.py", *argv]
+try:
+    runpy.run_path("main.py", run_name="__main__")
+except SystemExit:
+    pass
+print(json.dumps(sorted(m for m in heavy if m in sys.modules)))
+"""
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Líneas `import time: self [us] | cumulative | imported package` →
+    [(módulo, propio_us, acumulado_us, profundidad)], en orden de importación.
+    La profundidad sale de la sangría (dos espacios por nivel).
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue                            # cabecera
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(parts[0]), int(parts[1]), depth))
+    return rows
+
+
+def measure(argv: List[str], cwd: Path) -> List[Tuple[str, int, int, int]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "main.py", *argv],
+        cwd=cwd, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"main.py {' '.join(argv)} terminó con código {proc.returncode}:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def loaded_heavy(argv: List[str], cwd: Path) -> List[str]:
+    """Paquetes de HEAVY_PACKAGES en sys.modules tras ejecutar main.py con `argv`."""
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE, json.dumps(argv), json.dumps(HEAVY_PACKAGES)],
+        cwd=cwd, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"main.py {' '.join(argv)} falló:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Mide el tiempo de importación de main.py frente a un presupuesto")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Máximo de importación acumulada en ms (por defecto {DEFAULT_BUDGET_MS})")
+    parser.add_argument("--top", type=int, default=10, help="Módulos de nivel superior a listar")
+    parser.add_argument("--root", default=str(Path(__file__).resolve().parents[2]),
+                        help="Directorio con main.py")
+    parser.add_argument("argv", nargs="*", default=["-h"],
+                        help="Argumentos para main.py (por defecto -h; usar -- para separarlos)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    rows = measure(args.argv, Path(args.root))
+    # Los acumulados de profundidad 0 no se solapan entre sí
+    top_level = [r for r in rows if r[3] == 0]
+    total_ms = sum(r[2] for r in top_level) / 1000
+    heavy = sorted({r[0].split(".")[0] for r in rows} & set(HEAVY_MODULES))
+
+    logger.info(f"main.py {' '.join(args.argv)}: {total_ms:.0f} ms de importación "
+                f"({len(rows)} módulos, presupuesto {args.budget_ms:.0f} ms)")
+    for name, _, cumulative, _ in sorted(top_level, key=lambda r: -r[2])[:args.top]:
+        logger.info(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    ok = True
+    if heavy:
+        logger.error(f"Módulos pesados importados al arrancar: {', '.join(heavy)}")
+        ok = False
+    if total_ms > args.budget_ms:
+        logger.error(f"Presupuesto superado: {total_ms:.0f} ms > {args.budget_ms:.0f} ms")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
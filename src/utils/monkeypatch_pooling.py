@@ -29,19 +29,31 @@ def _patched_forward(self, sequences: torch.Tensor, weights=None) -> torch.Tenso
         )
         weights = F.interpolate(weights, size=num_frames, mode="nearest")
 
-    def _pool(seq, w):
-        w = w / (w.sum(dim=-1, keepdim=True) + 1e-8)
-        mean = (seq * w.unsqueeze(1)).sum(dim=-1)
-        if seq.size(-1) > 1:
-            std = (((seq - mean.unsqueeze(-1)) ** 2) * w.unsqueeze(1)).sum(dim=-1).sqrt()
-        else:
-            std = torch.zeros_like(mean)
-        return torch.cat([mean, std], dim=-1)
-
-    output = torch.stack(
-        [_pool(sequences, weights[:, speaker, :]) for speaker in range(num_speakers)],
-        dim=1,
-    )
+    # Todos los hablantes de una vez: una sola bmm (B,S,T)×(T,2F) sobre [y, y²],
+    # con y = x − c, c = media temporal sin ponderar (evita la cancelación de
+    # E[x²] − E[x]²). Con T = Σw (1, o 0 si todos los pesos son nulos, salvo
+    # por el 1e-8 de la normalización) y d = c·(1 − T):
+    #   mean = Σ w·x = m_y + c·T
+    #   var  = Σ w·(y − m_y + d)² = E_w[y²] − m_y²·(2 − T) + 2·d·m_y·(1 − T) + d²·T
+    weights = weights / (weights.sum(dim=-1, keepdim=True) + 1e-8)     # (B, S, T)
+    num_features = sequences.size(1)
+    center = sequences.mean(dim=-1, keepdim=True)                       # (B, F, 1)
+    centered = sequences - center
+    stats = torch.bmm(
+        weights.to(sequences.dtype),
+        torch.cat([centered, centered.square()], dim=1).transpose(1, 2),
+    )                                                                   # (B, S, 2F)
+    mean_c, sq_c = stats.split(num_features, dim=-1)
+    total = weights.sum(dim=-1, keepdim=True).to(sequences.dtype)       # (B, S, 1)
+    mean = mean_c + center.transpose(1, 2) * total
+    if num_frames > 1:
+        shift = center.transpose(1, 2) * (1.0 - total)                  # d (B, S, F)
+        var = (sq_c - mean_c.square() * (2.0 - total)
+               + 2.0 * shift * mean_c * (1.0 - total) + shift.square() * total)
+        std = var.clamp_min(0.0).sqrt()
+    else:
+        std = torch.zeros_like(mean)
+    output = torch.cat([mean, std], dim=-1)
 
     if not has_speaker_dimension:
         return output.squeeze(dim=1)
@@ -0,0 +1,297 @@
+# src/utils/profiler.py
+"""
+Perfil por etapa (--profile).
+
+StageProfiler es un sink del bus de eventos (utils/events.py): cada etapa y
+subetapa emitida por el pipeline (decode, vad, transcribe, align, diarize/…,
+save/…) queda registrada con
+
+    wall_s         tiempo de reloj
+    cpu_s          CPU del proceso (todos sus hilos) durante la etapa; no
+                   incluye procesos worker (--asr-workers)
+    rss_peak_mib   pico de RSS muestreado mientras la etapa está abierta
+    cuda_peak_mib  pico del allocator CUDA (si CUDA está inicializado)
+    batches        lotes y estadística de duración entre lotes
+
+El informe JSON añade el factor de tiempo real (RTF = reloj / audio) y las
+palabras por segundo, globales y por etapa. La traza se exporta en el
+formato de eventos de Chrome (chrome://tracing, Perfetto), el mismo que
+escriben torch.profiler y `py-spy record --format chrometrace`, de modo que
+pueden abrirse juntas; con torch_ranges las etapas también aparecen como
+record_function dentro de la traza de torch.profiler.
+"""
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+import psutil
+
+from src.utils.events import AUDIO, BATCH_DONE, COUNT, STAGE_END, STAGE_START, Event
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL_S = 0.02    # periodo de muestreo de RSS
+
+
+def _torch_cuda():
+    # Sin importar torch: sólo si ya está cargado y CUDA inicializado
+    torch = sys.modules.get("torch")
+    if torch is None or not torch.cuda.is_initialized():
+        return None
+    return torch.cuda
+
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+class StageProfiler:
+    def __init__(self, interval: float = SAMPLE_INTERVAL_S, torch_ranges: bool = False):
+        self.interval = interval
+        self.torch_ranges = torch_ranges
+        self.runs: list = []                # etapas cerradas, en orden de cierre
+        self.counts: dict = {}              # totales de eventos count (p. ej. words)
+        self.audio_seconds = 0.0            # audio decodificado (RTF global)
+        self._open: dict = {}               # (hilo, etapa) → registro abierto
+        self._stacks: dict = {}             # hilo → etapas abiertas (anidamiento)
+        self._last_end: dict = {}           # hilo → (perf_counter, process_time)
+        self._lock = threading.Lock()
+        self._proc = psutil.Process()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.t0 = time.perf_counter()
+        self.cpu0 = time.process_time()
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+
+    # ------------- ciclo de vida ---------------------------------------
+    def __enter__(self) -> "StageProfiler":
+        self.t0, self.cpu0 = time.perf_counter(), time.process_time()
+        self._thread = threading.Thread(target=self._poll, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.wall_s = time.perf_counter() - self.t0
+        self.cpu_s = time.process_time() - self.cpu0
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        rss = self._proc.memory_info().rss / 2**20
+        cuda = _torch_cuda()
+        peak_cuda = cuda.max_memory_allocated() / 2**20 if cuda is not None else None
+        with self._lock:
+            for run in self._open.values():
+                run["rss_peak_mib"] = max(run["rss_peak_mib"], rss)
+                if peak_cuda is not None:
+                    run["cuda_peak_mib"] = max(run["cuda_peak_mib"] or 0.0, peak_cuda)
+
+    # ------------- sink del bus ----------------------------------------
+    def __call__(self, event: Event) -> None:
+        tid = threading.get_ident()
+        key = (tid, event.stage)
+        d = event.data
+        if event.kind == STAGE_START:
+            self._sample()      # el pico previo pertenece a las etapas ya abiertas
+            cuda = _torch_cuda()
+            if cuda is not None:
+                cuda.reset_peak_memory_stats()
+            now, cpu = time.perf_counter(), time.process_time()
+            if d.get("since_previous") and tid in self._last_end:
+                now, cpu = self._last_end[tid]
+            stack = self._stacks.setdefault(tid, [])
+            run = {
+                "stage": event.stage,
+                "parent": stack[-1] if stack else None,
+                "thread": threading.current_thread().name,
+                "tid": tid,
+                "_t": now, "_cpu": cpu, "_batches": [],
+                "rss_peak_mib": self._proc.memory_info().rss / 2**20,
+                "cuda_peak_mib": None,
+                "batches": 0, "audio_s": 0.0, "counts": {},
+            }
+            if self.torch_ranges and "torch" in sys.modules:
+                run["_range"] = sys.modules["torch"].autograd.profiler.record_function(event.stage)
+                run["_range"].__enter__()
+            with self._lock:
+                self._open[key] = run
+            stack.append(event.stage)
+        elif event.kind == BATCH_DONE:
+            run = self._open.get(key)
+            if run is not None:
+                run["batches"] += d["n"]
+                run["_batches"].append(time.perf_counter())
+        elif event.kind == AUDIO:
+            run = self._open.get(key)
+            if run is not None:
+                run["audio_s"] += d["seconds"]
+            if event.stage == "decode":
+                self.audio_seconds += d["seconds"]
+        elif event.kind == COUNT:
+            run = self._open.get(key)
+            if run is not None:
+                run["counts"][d["name"]] = run["counts"].get(d["name"], 0) + d["value"]
+            self.counts[d["name"]] = self.counts.get(d["name"], 0) + d["value"]
+        elif event.kind == STAGE_END:
+            self._sample()
+            now, cpu = time.perf_counter(), time.process_time()
+            with self._lock:
+                run = self._open.pop(key, None)
+            if run is None:
+                return
+            stack = self._stacks.get(tid, [])
+            if event.stage in stack:
+                stack.remove(event.stage)
+            if "_range" in run:
+                run.pop("_range").__exit__(None, None, None)
+            self._last_end[tid] = (now, cpu)
+            t_start = run.pop("_t")
+            run.update(
+                start_s=t_start - self.t0,
+                wall_s=now - t_start,
+                cpu_s=cpu - run.pop("_cpu"),
+                ok=d["ok"],
+            )
+            ticks = [t_start] + run.pop("_batches")
+            gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+            if gaps:
+                run["batch_s"] = {
+                    "mean": sum(gaps) / len(gaps),
+                    "p50": _percentile(gaps, 0.50),
+                    "p95": _percentile(gaps, 0.95),
+                    "max": max(gaps),
+                }
+            self.runs.append(run)
+
+    # ------------- informe ---------------------------------------------
+    def _totals(self) -> dict:
+        totals: dict = {}
+        for run in self.runs:
+            t = totals.setdefault(run["stage"], {
+                "runs": 0, "wall_s": 0.0, "cpu_s": 0.0, "batches": 0, "audio_s": 0.0,
+                "rss_peak_mib": 0.0, "cuda_peak_mib": None, "counts": {},
+            })
+            t["runs"] += 1
+            for k in ("wall_s", "cpu_s", "batches", "audio_s"):
+                t[k] += run[k]
+            t["rss_peak_mib"] = max(t["rss_peak_mib"], run["rss_peak_mib"])
+            if run["cuda_peak_mib"] is not None:
+                t["cuda_peak_mib"] = max(t["cuda_peak_mib"] or 0.0, run["cuda_peak_mib"])
+            for name, value in run["counts"].items():
+                t["counts"][name] = t["counts"].get(name, 0) + value
+        for t in totals.values():
+            t["rtf"] = t["wall_s"] / self.audio_seconds if self.audio_seconds else None
+            t["cpu_util"] = t["cpu_s"] / t["wall_s"] if t["wall_s"] else None
+        return totals
+
+    @staticmethod
+    def _hardware() -> dict:
+        hw = {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "ram_mib": psutil.virtual_memory().total / 2**20,
+        }
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            hw["torch"] = torch.__version__
+            hw["torch_threads"] = torch.get_num_threads()
+            if torch.cuda.is_available():
+                hw["cuda_device"] = torch.cuda.get_device_name()
+        return hw
+
+    def report(self, **meta) -> dict:
+        words = self.counts.get("words", 0)
+        return {
+            "version": 1,
+            **meta,
+            "hardware": self._hardware(),
+            "wall_s": self.wall_s,
+            "cpu_s": self.cpu_s,
+            "rss_peak_mib": max((r["rss_peak_mib"] for r in self.runs), default=None),
+            "audio_s": self.audio_seconds,
+            "rtf": self.wall_s / self.audio_seconds if self.audio_seconds else None,
+            "words": words,
+            "words_per_s": words / self.wall_s if self.wall_s else None,
+            "totals": self._totals(),
+            "stages": [{k: v for k, v in run.items() if k != "tid"} for run in self.runs],
+        }
+
+    def chrome_trace(self) -> dict:
+        """Etapas como eventos "X" (completos) del formato de trazas de Chrome."""
+        pid = os.getpid()
+        trace = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in {(r["tid"], r["thread"]) for r in self.runs}
+        ]
+        for run in self.runs:
+            trace.append({
+                "name": run["stage"], "cat": "stage", "ph": "X", "pid": pid, "tid": run["tid"],
+                "ts": run["start_s"] * 1e6, "dur": run["wall_s"] * 1e6,
+                "args": {k: run[k] for k in ("cpu_s", "rss_peak_mib", "cuda_peak_mib", "batches", "audio_s")},
+            })
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def write(self, path: str, **meta) -> dict:
+        """
+        Escribe el informe en `path` y la traza en <path sin .json>.trace.json.
+        Devuelve el informe.
+        """
+        report = self.report(**meta)
+        out = Path(path)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        trace_path = trace_path_for(path)
+        Path(trace_path).write_text(json.dumps(self.chrome_trace()), encoding="utf-8")
+        self.log_summary(report)
+        logger.info(f"Perfil en {out} (traza: {trace_path})")
+        return report
+
+    def log_summary(self, report: dict) -> None:
+        lines = [f"{'etapa':28s} {'reloj s':>9s} {'CPU s':>9s} {'RSS MiB':>9s} {'CUDA MiB':>9s} {'RTF':>7s}"]
+        for stage, t in report["totals"].items():
+            cuda = f"{t['cuda_peak_mib']:9.0f}" if t["cuda_peak_mib"] is not None else f"{'-':>9s}"
+            rtf = f"{t['rtf']:7.3f}" if t["rtf"] is not None else f"{'-':>7s}"
+            lines.append(f"{stage:28s} {t['wall_s']:9.2f} {t['cpu_s']:9.2f} {t['rss_peak_mib']:9.0f} {cuda} {rtf}")
+        rtf = f"RTF {report['rtf']:.3f}" if report["rtf"] is not None else "RTF -"
+        wps = f"{report['words_per_s']:.1f} palabras/s" if report["words_per_s"] is not None else ""
+        lines.append(f"total {report['wall_s']:.1f} s, {report['audio_s']:.1f} s de audio, {rtf}, {wps}")
+        logger.info("Perfil por etapa:\n" + "\n".join(lines))
+
+
+def trace_path_for(report_path: str) -> str:
+    base = report_path[:-5] if report_path.endswith(".json") else report_path
+    return base + ".trace.json"
+
+
+@contextmanager
+def torch_trace(path: Optional[str]):
+    """
+    torch.profiler (CPU y, si hay, CUDA) durante el bloque; al salir exporta
+    su traza de Chrome a `path`. Sin `path` no hace nada.
+    """
+    if not path:
+        yield
+        return
+    import torch
+
+    activities = [torch.profiler.ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(torch.profiler.ProfilerActivity.CUDA)
+    with torch.profiler.profile(activities=activities) as prof:
+        yield
+    prof.export_chrome_trace(path)
+    logger.info(f"Traza de torch.profiler en {path}")
@@ -0,0 +1,47 @@
+# src/utils/registry.py
+import logging
+import threading
+import time
+from typing import Any, Callable, Hashable, List
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Registro de modelos cargados, compartido por todo el proceso.
+    • get(clave, loader) → devuelve el modelo de `clave`; si no existe lo carga
+      UNA vez con `loader()` y lo conserva para los trabajos siguientes.
+    • La clave debe incluir todo lo que cambia los pesos (nombre, device, dtype…).
+    • clear() vacía el registro y llama a shutdown() de los modelos que lo
+      tienen (p. ej. el Transcriber con procesos worker).
+    """
+
+    def __init__(self) -> None:
+        self._models = {}
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key not in self._models:
+                t0 = time.perf_counter()
+                self._models[key] = loader()
+                logger.info(f"Modelo {key} cargado en {time.perf_counter() - t0:.1f} s")
+            return self._models[key]
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._models)
+
+    def clear(self) -> None:
+        with self._lock:
+            models = list(self._models.values())
+            self._models.clear()
+        for model in models:
+            shutdown = getattr(model, "shutdown", None)
+            if callable(shutdown):
+                shutdown()
+
+
+# Instancia única del proceso (CLI, servidor o lote)
+registry = ModelRegistry()
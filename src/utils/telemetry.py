@@ -0,0 +1,148 @@
+# src/utils/telemetry.py
+"""
+Sinks del bus de eventos (utils/events.py) además de la barra Rich
+(ForcedProgressHook.on_event en utils/hooks.py):
+
+• LogSink          inicio/fin de cada etapa en el log
+• JsonlMetricsSink un evento por línea en un archivo JSON-lines
+• PrometheusSink   agregados por etapa en formato de texto de Prometheus,
+                   servidos en GET /metrics
+"""
+import json
+import logging
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from src.utils.events import AUDIO, BATCH_DONE, MEMORY, STAGE_END, STAGE_START, Event
+
+logger = logging.getLogger(__name__)
+
+
+class LogSink:
+    """Una línea al empezar y otra al terminar cada etapa (lotes en DEBUG)."""
+
+    def __init__(self, log: Optional[logging.Logger] = None):
+        self.log = log or logger
+        self._memory: dict = {}
+
+    def __call__(self, event: Event) -> None:
+        d = event.data
+        if event.kind == STAGE_START:
+            unit = f" {d['unit']}" if d["unit"] else ""
+            self.log.info(f"▶ {event.stage} ({d['total']}{unit})")
+        elif event.kind == BATCH_DONE:
+            self.log.debug(f"  {event.stage}: +{d['n']}")
+        elif event.kind == MEMORY:
+            self._memory[event.stage] = d
+        elif event.kind == STAGE_END:
+            mem = self._memory.pop(event.stage, {})
+            extra = f", RSS pico del proceso {mem['rss_mib']:.0f} MiB" if mem.get("rss_mib") is not None else ""
+            if mem.get("cuda_mib") is not None:
+                extra += f", CUDA pico {mem['cuda_mib']:.0f} MiB"
+            status = "✓" if d["ok"] else "✗"
+            self.log.info(f"{status} {event.stage} {d['seconds']:.1f} s{extra}")
+
+
+class JsonlMetricsSink:
+    """Añade cada evento como {"kind", "stage", "time", ...datos} a `path`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "a", encoding="utf-8", buffering=1)    # por líneas
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Event) -> None:
+        line = json.dumps({"kind": event.kind, "stage": event.stage, "time": event.time, **event.data},
+                          ensure_ascii=False)
+        with self._lock:
+            self._f.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            self._f.close()
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PrometheusSink:
+    """
+    Contadores por etapa acumulados en memoria; render() produce el formato
+    de exposición de texto de Prometheus (versión 0.0.4).
+    """
+
+    _COUNTERS = (
+        ("stage_runs_total", "Etapas ejecutadas"),
+        ("stage_failures_total", "Etapas terminadas con error"),
+        ("stage_seconds_total", "Segundos de reloj por etapa"),
+        ("batches_total", "Lotes/elementos procesados por etapa"),
+        ("audio_seconds_total", "Segundos de audio procesados por etapa"),
+    )
+
+    def __init__(self, prefix: str = "whisper_es"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = {name: defaultdict(float) for name, _ in self._COUNTERS}
+        self._active = defaultdict(int)
+        self._memory = {"rss": 0.0, "cuda": 0.0}
+
+    def __call__(self, event: Event) -> None:
+        d, stage = event.data, event.stage
+        with self._lock:
+            if event.kind == STAGE_START:
+                self._active[stage] += 1
+            elif event.kind == BATCH_DONE:
+                self._counters["batches_total"][stage] += d["n"]
+            elif event.kind == AUDIO:
+                self._counters["audio_seconds_total"][stage] += d["seconds"]
+            elif event.kind == MEMORY:
+                for kind in ("rss", "cuda"):
+                    if d.get(f"{kind}_mib") is not None:
+                        self._memory[kind] = max(self._memory[kind], d[f"{kind}_mib"])
+            elif event.kind == STAGE_END:
+                self._active[stage] = max(0, self._active[stage] - 1)
+                self._counters["stage_runs_total"][stage] += 1
+                self._counters["stage_seconds_total"][stage] += d["seconds"]
+                if not d["ok"]:
+                    self._counters["stage_failures_total"][stage] += 1
+
+    def render(self) -> str:
+        p = self.prefix
+        lines = []
+        with self._lock:
+            for name, help_text in self._COUNTERS:
+                lines += [f"# HELP {p}_{name} {help_text}", f"# TYPE {p}_{name} counter"]
+                lines += [f'{p}_{name}{{stage="{_label(s)}"}} {v:g}' for s, v in sorted(self._counters[name].items())]
+            lines += [f"# HELP {p}_stage_active Etapas en curso", f"# TYPE {p}_stage_active gauge"]
+            lines += [f'{p}_stage_active{{stage="{_label(s)}"}} {v}' for s, v in sorted(self._active.items())]
+            lines += [f"# HELP {p}_memory_peak_mib Pico de memoria del proceso (MiB)",
+                      f"# TYPE {p}_memory_peak_mib gauge"]
+            lines += [f'{p}_memory_peak_mib{{kind="{k}"}} {v:g}' for k, v in self._memory.items()]
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Expone GET /metrics en un hilo daemon; devuelve el servidor."""
+        sink = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                data = sink.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *a) -> None:
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"Métricas Prometheus en http://{host}:{server.server_address[1]}/metrics")
+        return server
@@ -0,0 +1,30 @@
+# tests/conftest.py
+"""
+Raíz del repositorio en sys.path: los tests importan `src.` como los módulos.
+Los que dependen de torch, whisperx, pyannote, onnxruntime o de modelos
+locales se saltan si faltan (pytest.importorskip / skipif).
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+MODELS = ROOT / "models"
+# Audio de prueba de los tests con modelos (no se versiona; ver README)
+TEST_AUDIO = Path(os.environ.get("WHISPER_ES_TEST_AUDIO", ROOT / "tests" / "data" / "test_audio.wav"))
+PYANNOTE_CHECKPOINTS = (
+    MODELS / "pyannote" / "pyannote_model_segmentation-3.0.ckpt",
+    MODELS / "pyannote" / "pyannote_model_wespeaker-voxceleb-resnet34-LM.bin",
+)
+
+
+@pytest.fixture
+def test_audio() -> Path:
+    if not TEST_AUDIO.exists():
+        pytest.skip(f"sin audio de prueba ({TEST_AUDIO}; WHISPER_ES_TEST_AUDIO lo cambia)")
+    return TEST_AUDIO
@@ -0,0 +1,119 @@
+# tests/test_align_cache.py
+"""Caché de modelos de alineación (asr/align_cache.py): LRU por bytes y precarga."""
+import sys
+import threading
+import types
+
+import pytest
+
+from src.asr.align_cache import AlignModelCache
+from src.utils.batch_planner import MemorySampler
+
+MIB = 2**20
+
+
+class _Weights:
+    def __init__(self, nbytes: int) -> None:
+        self.nbytes = nbytes
+
+    def numel(self) -> int:
+        return self.nbytes
+
+    def element_size(self) -> int:
+        return 1
+
+
+class _Model:
+    def __init__(self, language: str, nbytes: int) -> None:
+        self.language = language
+        self._weights = {"w": _Weights(nbytes), "packed": (_Weights(0), _Weights(0))}
+
+    def state_dict(self):
+        return self._weights
+
+
+class _Calls(list):
+    def __init__(self) -> None:
+        super().__init__()
+        self.gate = threading.Event()
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """whisperx falso: cada carga registra su clave; `gate` retiene la carga si está cerrada."""
+    calls = _Calls()
+    gate = calls.gate
+    gate.set()
+
+    def load_align_model(language_code, device, model_name=None, model_dir=None):
+        calls.append((language_code, model_name, device))
+        gate.wait(5)
+        if language_code == "xx":
+            raise RuntimeError("idioma sin modelo")
+        return _Model(language_code, 100 * MIB), {"language": language_code}
+
+    fake = types.ModuleType("whisperx")
+    fake.load_align_model = load_align_model
+    monkeypatch.setitem(sys.modules, "whisperx", fake)
+    return calls
+
+
+def test_get_loads_once_per_key(loads):
+    cache = AlignModelCache()
+    model, meta = cache.get("es", None, "models", "cpu")
+    again, _ = cache.get("es", None, "models", "cpu")
+    assert again is model and meta == {"language": "es"}
+    cache.get("es", None, "models", "cuda")                       # otro device: otra clave
+    assert len(loads) == 2
+    assert cache.keys() == [("es", None, "cpu", "float32"), ("es", None, "cuda", "float32")]
+
+
+def test_lru_eviction_by_bytes(loads):
+    cache = AlignModelCache(max_bytes=250 * MIB)
+    for lang in ("es", "en"):
+        cache.get(lang, None, "models", "cpu")
+    cache.get("es", None, "models", "cpu")                        # «es» pasa a ser el más reciente
+    cache.get("fr", None, "models", "cpu")
+    assert [k[0] for k in cache.keys()] == ["es", "fr"]           # sale «en», el menos usado
+    cache.get("en", None, "models", "cpu")
+    assert len(loads) == 4
+
+
+def test_single_model_over_budget_is_kept(loads):
+    cache = AlignModelCache(max_bytes=10 * MIB)
+    cache.get("es", None, "models", "cpu")
+    cache.get("en", None, "models", "cpu")
+    assert [k[0] for k in cache.keys()] == ["en"]
+
+
+def test_get_waits_for_preload(loads):
+    cache = AlignModelCache()
+    loads.gate.clear()
+    cache.preload("es", None, "models", "cpu")
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(cache.get("es", None, "models", "cpu")))
+    waiter.start()
+    waiter.join(0.1)
+    assert waiter.is_alive() and not result                       # espera a la precarga
+    loads.gate.set()
+    waiter.join(5)
+    assert len(loads) == 1 and result[0][1] == {"language": "es"}
+
+
+def test_preload_counts_as_memory_activity(loads):
+    cache = AlignModelCache()
+    loads.gate.clear()
+    with MemorySampler("cpu", interval=0.01) as mem:
+        cache.preload("es", None, "models", "cpu")
+        loads.gate.set()
+        cache.wait_pending()
+    assert not mem.isolated
+
+
+def test_failed_load_is_not_cached(loads):
+    cache = AlignModelCache()
+    cache.preload("xx", None, "models", "cpu")
+    cache.wait_pending()                                          # no propaga el error
+    with pytest.raises(RuntimeError, match="sin modelo"):
+        cache.get("xx", None, "models", "cpu")
+    assert len(loads) == 2 and cache.keys() == []
@@ -0,0 +1,95 @@
+# tests/test_align_window.py
+"""Alineación por ventanas (asr/transcriber.py: align_window, align_iter) frente al audio completo."""
+import copy
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+whisperx = pytest.importorskip("whisperx")
+
+from src.asr import transcriber as transcriber_module  # noqa: E402
+from src.asr.transcriber import ALIGN_PAD_S, Transcriber, align_window  # noqa: E402
+
+SR = 16000
+CHARS = "-abcdefghijklmnopqrstuvwxyzñáéíóú|"
+META = {"language": "es", "dictionary": {c: i for i, c in enumerate(CHARS)}, "type": "torchaudio"}
+WORDS = ["hola", "mundo", "buenos", "días", "qué", "tal", "estás", "bien"]
+
+
+class _Emitter(torch.nn.Module):
+    """
+    wav2vec2 de juguete: emisión por trama de 320 muestras, función sólo de
+    sus muestras (mismo audio → misma emisión, se recorte donde se recorte).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.proj = torch.randn(320, len(CHARS), generator=torch.Generator().manual_seed(0))
+
+    def forward(self, waveform, lengths=None):
+        frames = waveform.shape[-1] // 320
+        x = waveform[..., :frames * 320].reshape(waveform.shape[0], frames, 320)
+        return x @ self.proj * 20, None
+
+
+def _case(n_segments: int, grid: bool, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    segments, t = [], 0.5
+    for _ in range(n_segments):
+        d = rng.integers(4, 24) / 4 if grid else round(float(rng.uniform(1.0, 6.0)), 3)
+        text = " ".join(rng.choice(WORDS, size=int(rng.integers(1, 6))))
+        segments.append({"start": t, "end": t + d, "text": " " + text})
+        t += d + (rng.integers(1, 8) / 4 if grid else round(float(rng.uniform(0.1, 2.0)), 3))
+    audio = (rng.standard_normal(int((t + 1.0) * SR)) * 0.1).astype(np.float32)
+    return segments, audio
+
+
+def _transcriber(monkeypatch, model, align_batch: int) -> Transcriber:
+    t = object.__new__(Transcriber)            # sin cargar Whisper: sólo se alinea
+    t.model_name, t.align_model_name, t.language = "tiny", None, "es"
+    t.align_batch, t.align_dtype, t.align_emission_s, t.allow_tf32 = align_batch, "float32", 0.0, False
+    monkeypatch.setattr(transcriber_module.align_cache, "get", lambda *a, **k: (model, META))
+    return t
+
+
+def _times(segments) -> list:
+    out = []
+    for seg in segments:
+        out.append((seg["start"], seg["end"]))
+        out.extend((w.get("start"), w.get("end")) for w in seg.get("words", ()))
+    return out
+
+
+def test_align_window_bounds():
+    audio = np.zeros(100 * SR, np.float32)
+    window, offset = align_window(audio, [{"start": 10.0, "end": 12.0}, {"start": 20.0, "end": 21.5}])
+    assert offset == 10.0 - ALIGN_PAD_S
+    assert len(window) == int((21.5 + ALIGN_PAD_S) * SR) - int((10.0 - ALIGN_PAD_S) * SR)
+    assert np.shares_memory(window, audio)                 # vista, sin copia
+    window, offset = align_window(audio, [{"start": 0.2, "end": 99.5}])
+    assert offset == 0.0 and len(window) == len(audio)     # recortada a los bordes
+
+
+@pytest.mark.parametrize("grid, tolerance", [(True, 1e-3 + 1e-9), (False, 0.02 + 1e-3)])
+@pytest.mark.parametrize("align_batch", [1, 4, 32])
+def test_windowed_matches_full_waveform(monkeypatch, grid, tolerance, align_batch):
+    # En rejilla de 1/4 s los recortes caen en las mismas muestras: sólo queda el
+    # redondeo a ms; con tiempos arbitrarios, int() puede mover el inicio una muestra
+    # (a lo sumo una trama de 20 ms)
+    model = _Emitter()
+    segments, audio = _case(24, grid)
+    expected = whisperx.align(copy.deepcopy(segments), model, META, audio, "cpu")["segments"]
+
+    t = _transcriber(monkeypatch, model, align_batch)
+    result = {"segments": copy.deepcopy(segments), "language": "es"}
+    got = [seg for _, out in t.align_iter(result, audio, "cpu", False) for seg in out]
+
+    assert [s["text"] for s in got] == [s["text"] for s in expected]
+    pairs = list(zip(_times(got), _times(expected)))
+    assert len(_times(got)) == len(_times(expected))
+    for (gs, ge), (es, ee) in pairs:
+        if es is None:
+            assert gs is None
+            continue
+        assert abs(gs - es) <= tolerance and abs(ge - ee) <= tolerance
@@ -0,0 +1,136 @@
+# tests/test_batch.py
+"""Modo lote (pipelines/batch.py): entradas, rutas de salida y la línea de montaje sin modelos."""
+import sys
+import threading
+import types
+from contextlib import nullcontext
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.pipelines import batch
+from src.pipelines.batch import collect_inputs, output_paths, run_batch
+
+
+def _touch(root: Path, *names: str) -> None:
+    for name in names:
+        p = root / name
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(b"")
+
+
+def test_collect_inputs(tmp_path):
+    _touch(tmp_path, "a/x.wav", "a/y.MP3", "a/notas.txt", "b/x.wav", "c.flac")
+    manifest = tmp_path / "cola.txt"
+    manifest.write_text(f"# comentario\n{tmp_path / 'c.flac'}\n\n{tmp_path / 'a' / 'x.wav'}\n", encoding="utf-8")
+    files = collect_inputs([str(tmp_path / "a"), str(tmp_path / "b" / "*.wav")], str(manifest))
+    assert [Path(f).relative_to(tmp_path).as_posix() for f in files] == ["a/x.wav", "a/y.MP3", "b/x.wav", "c.flac"]
+
+
+def test_output_paths_keep_relative_dirs(tmp_path):
+    _touch(tmp_path, "in/a/x.wav", "in/b/x.wav", "in/b/sub/y.wav")
+    files = [str(tmp_path / "in" / p) for p in ("a/x.wav", "b/x.wav", "b/sub/y.wav")]
+    out = output_paths(files, str(tmp_path / "out"))
+    assert [Path(p).relative_to(tmp_path / "out").as_posix() for p in out] == ["a/x.jsonl", "b/x.jsonl", "b/sub/y.jsonl"]
+    assert (tmp_path / "out" / "b" / "sub").is_dir()
+
+
+def test_output_paths_flat_and_next_to_audio(tmp_path):
+    _touch(tmp_path, "in/x.wav", "in/y.wav")
+    files = [str(tmp_path / "in" / "x.wav"), str(tmp_path / "in" / "y.wav")]
+    assert output_paths(files, str(tmp_path / "out")) == [str(tmp_path / "out" / "x.jsonl"),
+                                                         str(tmp_path / "out" / "y.jsonl")]
+    assert output_paths(files, None) == [str(tmp_path / "in" / "x.jsonl"), str(tmp_path / "in" / "y.jsonl")]
+
+
+@pytest.mark.parametrize("output_dir", [None, "out"])
+def test_output_paths_reject_collisions(tmp_path, output_dir):
+    _touch(tmp_path, "in/x.wav", "in/x.mp3")
+    files = [str(tmp_path / "in" / "x.wav"), str(tmp_path / "in" / "x.mp3")]
+    with pytest.raises(ValueError, match="x.mp3"):
+        output_paths(files, output_dir and str(tmp_path / output_dir))
+
+
+# --- run_batch con etapas falsas ---------------------------------------------
+
+class _Abort(BaseException):
+    """Fallo fuera del try por archivo (como un KeyboardInterrupt)."""
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    """Sustituye cargador, planificador y etapas de full_pipeline por funciones triviales."""
+    calls = {"vad_threads": set(), "asr": [], "saved": []}
+
+    def load_waveform(path, cache_dir=None):
+        if "roto" in path:
+            raise RuntimeError("no decodifica")
+        return np.zeros(16000, np.float32), 0.0
+
+    def vad_stage(audio, *args):
+        calls["vad_threads"].add(threading.current_thread().name)
+        return np.array([[0.0, 1.0]])
+
+    def transcribe_stage(t, audio, asr_batch, regions):
+        calls["asr"].append(regions)
+        if calls.get("abort"):
+            raise _Abort()
+        return {"segments": [], "language": "es"}
+
+    def save_stage(diarize_df, result, output_jsonl, **kw):
+        calls["saved"].append(output_jsonl)
+        return output_jsonl
+
+    fakes = {
+        "src.audio.loader": dict(load_waveform=load_waveform, duration_seconds=lambda a: len(a) / 16000),
+        "src.utils.batch_planner": dict(memory_activity=nullcontext),
+        "src.pipelines.full_pipeline": dict(
+            auto_align_batch=lambda n, *a: n, get_transcriber=lambda *a: object(),
+            vad_stage=vad_stage, transcribe_stage=transcribe_stage,
+            align_stage=lambda t, result, *a: result, diarize_stage=lambda *a, **k: None,
+            save_stage=save_stage,
+        ),
+    }
+    for name, attrs in fakes.items():
+        monkeypatch.setitem(sys.modules, name, types.SimpleNamespace(**attrs))
+    return calls
+
+
+def _jobs(*names: str) -> list:
+    keys = ("device", "model_name", "compute_type", "model_dir", "allow_tf32", "vad_method", "vad_onset",
+            "vad_offset", "chunk_size", "temperature", "beam_size", "initial_prompt", "align_model_name",
+            "align_batch", "asr_batch", "return_char_alignments", "min_speakers", "max_speakers")
+    return [dict(dict.fromkeys(keys), audio_file=n, output_jsonl=n + ".jsonl", no_align=True, no_diarize=True)
+            for n in names]
+
+
+def test_run_batch_vad_on_decode_thread(stages):
+    outputs = run_batch(_jobs("a.wav", "roto.wav", "b.wav"))
+    assert outputs == ["a.wav.jsonl", "b.wav.jsonl"]          # el fallido no detiene el lote
+    assert stages["vad_threads"] == {"batch-decode"}
+    assert all(r.shape == (1, 2) for r in stages["asr"])     # el ASR recibe las regiones ya calculadas
+
+
+def test_run_batch_asr_abort_does_not_hang(stages):
+    stages["abort"] = True
+    errors = []
+
+    def run():
+        try:
+            run_batch(_jobs(*(f"{i}.wav" for i in range(6))))
+        except _Abort as e:
+            errors.append(e)
+
+    th = threading.Thread(target=run, daemon=True)
+    th.start()
+    th.join(timeout=10)
+    assert not th.is_alive(), "run_batch quedó bloqueado esperando al decodificador"
+    assert len(errors) == 1 and len(stages["asr"]) == 1
+    assert not any(t.name == "batch-decode" for t in threading.enumerate())
+
+
+def test_run_batch_rejects_unsupported():
+    with pytest.raises(ValueError, match="resume"):
+        run_batch([dict(_jobs("a.wav")[0], resume=True)])
+    assert batch.unsupported_options({"stream_output": True}) == ["stream_output"]
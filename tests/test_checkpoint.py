@@ -0,0 +1,67 @@
+# tests/test_checkpoint.py
+"""Checkpoints por etapa (pipelines/checkpoint.py): claves, reutilización y DataFrames."""
+import numpy as np
+import pandas as pd
+
+from src.pipelines import checkpoint
+from src.pipelines.checkpoint import CheckpointStore, audio_hash, df_from_json, df_to_json, stage_key
+
+
+def test_audio_hash_depends_only_on_samples(tmp_path, monkeypatch):
+    audio = np.random.default_rng(0).standard_normal(50_000).astype(np.float32)
+    ref = audio_hash(audio)
+    path = tmp_path / "a.f32"
+    audio.tofile(path)
+    assert audio_hash(np.memmap(path, dtype=np.float32, mode="c")) == ref        # caché .f32
+    assert audio_hash(np.repeat(audio, 2)[::2]) == ref                           # vista no contigua
+    monkeypatch.setattr(checkpoint, "_HASH_BLOCK", 4096)
+    assert audio_hash(audio) == ref                                              # bloques distintos
+    changed = audio.copy()
+    changed[-1] += 1e-3
+    assert audio_hash(changed) != ref
+    assert audio_hash(np.zeros(0, np.float32)) != ref
+
+
+def test_stage_key():
+    a = stage_key("h", vad_onset=0.5, chunk_size=30)
+    assert a == stage_key("h", chunk_size=30, vad_onset=0.5)                      # orden irrelevante
+    assert a != stage_key("h", vad_onset=0.5, chunk_size=20)
+    assert a != stage_key("otro", vad_onset=0.5, chunk_size=30)
+    assert stage_key(a, align_model=None) != stage_key(a, align_model="wav2vec2")  # clave encadenada
+    assert stage_key("h", path=type) == stage_key("h", path=type)                # default=str
+
+
+def test_get_or_compute_reuses(tmp_path):
+    store, calls = CheckpointStore(str(tmp_path)), []
+
+    def compute():
+        calls.append(1)
+        return {"segments": [{"text": "año"}]}
+
+    first = store.get_or_compute("asr", "k1", compute)
+    assert store.get_or_compute("asr", "k1", compute) == first and len(calls) == 1
+    store.get_or_compute("asr", "k2", compute)                                    # otra clave
+    store.get_or_compute("align", "k1", compute)                                  # otra etapa
+    assert len(calls) == 3
+    assert sorted(p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob("*")
+                  if p.is_file()) == ["align/k1.json", "asr/k1.json", "asr/k2.json"]
+
+
+def test_unreadable_checkpoint_is_recomputed(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    store.save("asr", "k", {"ok": 1})
+    (tmp_path / "asr" / "k.json").write_text('{"ok": ', encoding="utf-8")        # escritura cortada
+    assert store.load("asr", "k") is None
+    assert store.get_or_compute("asr", "k", lambda: {"ok": 2}) == {"ok": 2}
+    assert store.load("asr", "k") == {"ok": 2}
+
+
+def test_dataframe_round_trip(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    df = pd.DataFrame({"start": [0.0, 1.5], "end": [1.5, 3.25], "speaker": ["SPEAKER_00", "SPEAKER_01"]})
+    store.get_or_compute("diarize", "k", lambda: df, dump=df_to_json, restore=df_from_json)
+    restored = store.get_or_compute("diarize", "k", lambda: None, dump=df_to_json, restore=df_from_json)
+    pd.testing.assert_frame_equal(restored, df)
+
+    empty = df_from_json(df_to_json(pd.DataFrame(columns=["start", "end", "speaker"])))
+    assert list(empty.columns) == ["start", "end", "speaker"] and len(empty) == 0
@@ -0,0 +1,86 @@
+# tests/test_columnar.py
+"""Salida Parquet / Arrow IPC (formatting/columnar.py): tablas, hablantes y escritura por lotes."""
+import sys
+from pathlib import Path
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from src.formatting.columnar import ColumnarWriter, _pyarrow, columnar_paths  # noqa: E402
+from src.formatting.formatter import Formatter  # noqa: E402
+from src.formatting.transcript import Transcript  # noqa: E402
+
+
+def _batch1() -> list:
+    return [
+        {"start": 0.0, "end": 1.5, "text": " Hola.", "speaker": "SPEAKER_01",
+         "words": [{"word": "Hola.", "start": 0.0, "end": 1.5, "score": 0.5, "speaker": "SPEAKER_01"}]},
+        {"start": 1.5, "end": 2.0, "text": "  ", "words": [{"word": "", "start": 1.5, "end": 2.0}]},
+        {"start": 2.0, "end": 3.0, "text": " 1,5 €", "avg_logprob": -0.25,
+         "words": [{"word": "1,5"}, {"word": "€", "start": 2.5, "end": 3.0, "score": 0.75}]},
+    ]
+
+
+def _batch2() -> list:
+    return [{"start": 4.0, "end": 5.0, "text": " Adiós", "speaker": "SPEAKER_00",
+             "words": [{"word": "Adiós", "start": 4.0, "end": 5.0, "score": 1.0, "speaker": "SPEAKER_00"}]}]
+
+
+def _read(path: Path, fmt: str):
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.read_table(path)
+    with pa.ipc.open_file(str(path)) as f:
+        return f.read_all()
+
+
+def test_columnar_paths():
+    assert columnar_paths("out/a.jsonl", "parquet") == (Path("out/a.segments.parquet"), Path("out/a.words.parquet"))
+    assert columnar_paths("a.arrow", "arrow") == (Path("a.segments.arrow"), Path("a.words.arrow"))
+    assert columnar_paths("a.b", "arrow")[0] == Path("a.b.segments.arrow")
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_incremental_tables(tmp_path, fmt):
+    w = ColumnarWriter(str(tmp_path / "a.jsonl"), fmt)
+    w.write(_batch1())
+    w.write(_batch2())                                          # hablante nuevo en el segundo lote
+    assert w.close() == str(tmp_path / f"a.segments.{fmt}")
+    assert not list(tmp_path.glob("*.part"))
+
+    segs = _read(tmp_path / f"a.segments.{fmt}", fmt).to_pylist()
+    assert [s["segment"] for s in segs] == [0, 1, 2]            # el segmento vacío se omite
+    assert [s["text"] for s in segs] == [" Hola.", " 1,5 €", " Adiós"]
+    assert [s["speaker"] for s in segs] == ["SPEAKER_01", None, "SPEAKER_00"]
+    assert [s["avg_logprob"] for s in segs] == [None, -0.25, None]
+    assert [s["n_words"] for s in segs] == [1, 2, 1]
+
+    words = _read(tmp_path / f"a.words.{fmt}", fmt).to_pylist()
+    assert [(x["segment"], x["word"]) for x in words] == [(0, "Hola."), (1, "1,5"), (1, "€"), (2, "Adiós")]
+    assert words[1]["start"] is None and words[1]["score"] is None     # palabra sin tiempos → null
+    assert [x["speaker"] for x in words] == ["SPEAKER_01", None, None, "SPEAKER_00"]
+    assert pa.types.is_dictionary(_read(tmp_path / f"a.words.{fmt}", fmt).schema.field("speaker").type)
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_transcript_matches_dicts(tmp_path, fmt):
+    segments = _batch1() + _batch2()
+    Formatter().save({"segments": segments}, str(tmp_path / "d.jsonl"), fmt)
+    Formatter().save(Transcript.from_result({"segments": segments}), str(tmp_path / "t.jsonl"), fmt)
+    for table in ("segments", "words"):
+        assert _read(tmp_path / f"d.{table}.{fmt}", fmt).to_pylist() == \
+            _read(tmp_path / f"t.{table}.{fmt}", fmt).to_pylist()
+
+
+def test_abort_keeps_parts(tmp_path):
+    w = ColumnarWriter(str(tmp_path / "a.jsonl"), "parquet")
+    w.write(_batch1())
+    w.abort()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.segments.parquet.part", "a.words.parquet.part"]
+
+
+def test_missing_pyarrow(monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    with pytest.raises(ImportError, match="pip install pyarrow"):
+        _pyarrow()
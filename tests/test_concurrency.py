@@ -0,0 +1,119 @@
+# tests/test_concurrency.py
+"""Modo --concurrency parallel (pipelines/full_pipeline.py): diarización solapada con ASR y alineación."""
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("whisperx")
+
+from src.pipelines import full_pipeline  # noqa: E402
+from src.pipelines.full_pipeline import log_timings, run_pipeline  # noqa: E402
+
+# Opciones posicionales de run_pipeline (las de main.py) con valores triviales
+OPTIONS = dict(
+    model_name="tiny", device="cpu", asr_batch=4, compute_type="int8",
+    min_speakers=None, max_speakers=None, model_dir="models", allow_tf32=False,
+    vad_method="silero", vad_onset=0.5, vad_offset=0.363, chunk_size=30,
+    no_align=False, no_diarize=False, return_char_alignments=False,
+    temperature=0.0, beam_size=5, initial_prompt=None,
+    align_model_name=None, align_batch=8, diarize_backend="torch",
+)
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    """
+    Etapas falsas. ASR y diarización se esperan mutuamente (barrera): sólo
+    terminan si corren a la vez; la alineación comprueba que sigue habiendo
+    diarización en curso.
+    """
+    calls = {"vad": 0, "threads": {}, "saved": None}
+    meet = threading.Barrier(2, timeout=2)
+    diarizing = threading.Event()
+    release = threading.Event()
+
+    def vad_stage(audio, *args):
+        calls["vad"] += 1
+        return np.array([[0.0, 1.0]])
+
+    def transcribe_stage(t, audio, asr_batch, regions):
+        calls["threads"]["asr"] = threading.current_thread().name
+        if not calls.get("fail"):
+            meet.wait()
+        return {"segments": [{"start": 0.0, "end": 1.0, "text": "hola"}], "language": "es"}
+
+    def align_stage(t, result, audio, device, return_char_alignments):
+        calls["align_during_diarize"] = diarizing.is_set() and not release.is_set()
+        release.set()
+        return result
+
+    def diarize_stage(audio, device, no_diarize, *args):
+        calls["threads"]["diarize"] = threading.current_thread().name
+        regions = args[-1]
+        calls["diarize_regions"] = regions
+        if calls.get("fail"):
+            raise RuntimeError("diarización rota")
+        diarizing.set()
+        meet.wait()
+        release.wait(2)
+        return pd.DataFrame({"start": [0.0], "end": [1.0], "speaker": ["SPEAKER_00"]})
+
+    def save_stage(diarize_df, result, output_jsonl, *args):
+        calls["saved"] = (diarize_df, result)
+        return output_jsonl
+
+    class _Transcriber:
+        def preload_align_model(self, device):
+            pass
+
+    monkeypatch.setattr(full_pipeline, "load_waveform", lambda path, cache_dir=None: (np.zeros(16000, np.float32), 0.0))
+    monkeypatch.setattr(full_pipeline, "vad_stage", vad_stage)
+    monkeypatch.setattr(full_pipeline, "transcribe_stage", transcribe_stage)
+    monkeypatch.setattr(full_pipeline, "align_stage", align_stage)
+    monkeypatch.setattr(full_pipeline, "diarize_stage", diarize_stage)
+    monkeypatch.setattr(full_pipeline, "save_stage", save_stage)
+    monkeypatch.setattr(full_pipeline, "get_transcriber", lambda *a, **k: _Transcriber())
+    monkeypatch.setattr(full_pipeline, "auto_align_batch", lambda align_batch, *a: align_batch)
+    monkeypatch.setattr(full_pipeline, "diarization_enabled", lambda *a: True)
+    return calls
+
+
+def _run(tmp_path, **kw):
+    return run_pipeline(audio_file=str(tmp_path / "a.wav"), output_jsonl=str(tmp_path / "a.jsonl"),
+                        **{**OPTIONS, **kw})
+
+
+def test_parallel_overlaps_diarization(tmp_path, stages):
+    path = _run(tmp_path, concurrency="parallel")
+    assert path == str(tmp_path / "a.jsonl")
+    assert stages["threads"]["diarize"].startswith("diarize")
+    assert stages["threads"]["asr"] == threading.main_thread().name
+    assert stages["align_during_diarize"]                  # la alineación también se solapa
+    diarize_df, result = stages["saved"]
+    assert list(diarize_df["speaker"]) == ["SPEAKER_00"] and result["segments"][0]["text"] == "hola"
+    assert stages["vad"] == 1                              # regiones compartidas por ambas ramas
+    np.testing.assert_array_equal(stages["diarize_regions"], [[0.0, 1.0]])
+
+
+def test_sequential_does_not_overlap(tmp_path, stages):
+    # Sin hilo de diarización el ASR espera a una diarización que aún no empezó
+    with pytest.raises(threading.BrokenBarrierError):
+        _run(tmp_path, concurrency="sequential")
+    assert "diarize" not in stages["threads"]
+
+
+def test_parallel_diarization_error_propagates(tmp_path, stages):
+    stages["fail"] = True
+    with pytest.raises(RuntimeError, match="diarización rota"):
+        _run(tmp_path, concurrency="parallel")
+    assert stages["saved"] is None
+
+
+def test_log_timings_reports_overlap(caplog):
+    timings = {"transcribe": (0.0, 4.0), "align": (4.0, 6.0), "diarize": (1.0, 8.0)}
+    with caplog.at_level("INFO", logger=full_pipeline.__name__):
+        log_timings(timings)
+    assert "Solapamiento ASR ↔ diarización: 5.0 s" in caplog.text
@@ -0,0 +1,108 @@
+# tests/test_emissions.py
+"""Emisiones wav2vec2 por lotes (asr/emissions.py) frente al forward por segmento."""
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("whisperx")
+
+from src.asr.emissions import BatchedEmissions, compare_alignment, padding_invariant  # noqa: E402
+
+from conftest import MODELS  # noqa: E402
+
+SR = 16000
+VOCAB = 32
+# Duraciones (s) exactas en muestras; varias iguales para que también se agrupen sin relleno
+DURATIONS = [0.5, 1.0, 1.0, 1.25, 2.0, 2.0, 2.0, 3.75]
+CONV = [(16, 10, 5)] + [(16, 3, 2)] * 4 + [(16, 2, 2)] * 2
+
+
+def _hf(norm: str):
+    transformers = pytest.importorskip("transformers")
+    config = transformers.Wav2Vec2Config(
+        vocab_size=VOCAB, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=37, conv_dim=[c for c, _, _ in CONV], conv_kernel=[k for _, k, _ in CONV],
+        conv_stride=[s for _, _, s in CONV], num_conv_pos_embeddings=16, num_conv_pos_embedding_groups=2,
+        feat_extract_norm=norm, do_stable_layer_norm=norm == "layer",
+        hidden_dropout=0.0, attention_dropout=0.0, activation_dropout=0.0, feat_proj_dropout=0.0,
+        layerdrop=0.0,
+    )
+    torch.manual_seed(0)
+    return transformers.Wav2Vec2ForCTC(config).eval(), "huggingface"
+
+
+def _torchaudio(norm: str):
+    torchaudio = pytest.importorskip("torchaudio")
+    torch.manual_seed(0)
+    model = torchaudio.models.wav2vec2_model(
+        extractor_mode=f"{norm}_norm", extractor_conv_layer_config=CONV, extractor_conv_bias=norm == "layer",
+        encoder_embed_dim=32, encoder_projection_dropout=0.0, encoder_pos_conv_kernel=16,
+        encoder_pos_conv_groups=2, encoder_num_layers=2, encoder_num_heads=2, encoder_attention_dropout=0.0,
+        encoder_ff_interm_features=37, encoder_ff_interm_dropout=0.0, encoder_dropout=0.0,
+        encoder_layer_norm_first=norm == "layer", encoder_layer_drop=0.0, aux_num_out=VOCAB,
+    )
+    return model.eval(), "torchaudio"
+
+
+def _segments():
+    rng = np.random.default_rng(0)
+    t, out = 0.25, []
+    for d in rng.permutation(DURATIONS):
+        out.append({"start": t, "end": t + float(d)})
+        t += float(d) + 0.25
+    return out, t
+
+
+def _reference(model, model_type, waveform):
+    # Lo que whisperx.align hace con cada segmento
+    if model_type == "torchaudio":
+        return model(waveform)[0]
+    return model(waveform).logits
+
+
+@pytest.mark.parametrize("factory", [_hf, _torchaudio])
+@pytest.mark.parametrize("norm", ["group", "layer"])
+def test_batched_matches_per_segment(factory, norm):
+    model, model_type = factory(norm)
+    segments, duration = _segments()
+    audio = torch.randn(1, int(duration * SR), generator=torch.Generator().manual_seed(1)) * 0.1
+
+    batched = BatchedEmissions(model, model_type, max_batch_s=60.0)
+    assert batched.padding == (norm == "layer") == padding_invariant(model, model_type)
+    batched.precompute(audio, segments)
+    # Con relleno, un forward; sin él, uno por longitud distinta
+    assert batched.forwards == (1 if norm == "layer" else len(set(DURATIONS)))
+
+    with torch.inference_mode():
+        for seg in segments:
+            view = audio[:, int(seg["start"] * SR):int(seg["end"] * SR)]
+            got = _reference(batched, model_type, view)
+            expected = _reference(model, model_type, view)
+            assert got.shape == expected.shape
+            torch.testing.assert_close(got, expected, rtol=1e-4, atol=1e-4)
+    assert not batched._emissions               # todas consumidas
+
+
+def test_group_norm_padding_changes_emissions():
+    # Lo que evita padding_invariant: con group norm, el relleno altera la emisión
+    model, _ = _hf("group")
+    x = torch.randn(1, SR, generator=torch.Generator().manual_seed(2)) * 0.1
+    padded = torch.cat([x, torch.zeros(1, SR)], dim=1)
+    with torch.inference_mode():
+        a = model(x).logits
+        b = model(padded).logits[:, :a.shape[1]]
+    assert not torch.allclose(a, b, atol=1e-3)
+
+
+def _align_models_available() -> bool:
+    align_dir = MODELS / "align" / "w2v_spanish"
+    return any((MODELS / "whisper").glob("*tiny*")) and align_dir.is_dir() and any(align_dir.iterdir())
+
+
+@pytest.mark.skipif(not _align_models_available(), reason="sin modelos Whisper tiny / alineación en models/")
+@pytest.mark.parametrize("dtype, tolerance_ms, min_within", [("float32", 20.0, 0.99), ("int8", 50.0, 0.95)])
+def test_alignment_parity(test_audio, dtype, tolerance_ms, min_within):
+    r = compare_alignment(str(test_audio), dtype=dtype, emission_s=30.0)
+    assert r["words"] > 0
+    within = float(np.mean(r["delta_ms"] <= tolerance_ms))
+    assert within >= min_within, f"{within:.1%} de palabras ≤ {tolerance_ms:g} ms"
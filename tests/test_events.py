@@ -0,0 +1,166 @@
+# tests/test_events.py
+"""Bus de eventos (utils/events.py) y sinks de telemetría (utils/telemetry.py)."""
+import io
+import json
+import logging
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.utils.events import (
+    AUDIO, BATCH_DONE, MEMORY, STAGE_END, STAGE_START, EventBus, ProgressPrints, PyannoteHook,
+)
+from src.utils.telemetry import JsonlMetricsSink, LogSink, PrometheusSink
+
+
+class _Collect(list):
+    def __call__(self, event):
+        self.append(event)
+
+
+def _stage_run(bus: EventBus, name: str = "asr", fail: bool = False) -> None:
+    with bus.stage(name, total=3, unit="lote", label="ASR") as advance:
+        advance()
+        advance(2)
+        bus.audio(name, 12.5)
+        if fail:
+            raise RuntimeError("fallo")
+
+
+# --- EventBus ----------------------------------------------------------------
+
+def test_stage_event_sequence():
+    bus, seen = EventBus(), _Collect()
+    with bus.subscribed(seen):
+        _stage_run(bus)
+    assert [e.kind for e in seen] == [STAGE_START, BATCH_DONE, BATCH_DONE, AUDIO, MEMORY, STAGE_END]
+    assert seen[0].data == {"total": 3, "unit": "lote", "label": "ASR", "progress": True}
+    assert [e.data["n"] for e in seen if e.kind == BATCH_DONE] == [1, 2]
+    assert seen[-1].data["ok"] is True and seen[-1].data["seconds"] >= 0
+    assert not bus.enabled                                   # subscribed() se desuscribe al salir
+
+
+def test_failed_stage_reports_not_ok():
+    bus, seen = EventBus(), _Collect()
+    with bus.subscribed(seen), pytest.raises(RuntimeError):
+        _stage_run(bus, fail=True)
+    assert seen[-1].kind == STAGE_END and seen[-1].data["ok"] is False
+
+
+def test_no_sinks_is_a_noop():
+    bus = EventBus()
+    with bus.stage("x") as advance:
+        advance(5)
+    assert bus.stage("x") is bus.stage("y")                  # objeto nulo compartido
+
+
+def test_failing_sink_does_not_stop_others(caplog):
+    def broken(event):
+        raise ValueError("sink roto")
+
+    bus, seen = EventBus(), _Collect()
+    with caplog.at_level(logging.ERROR), bus.subscribed(broken, seen):
+        bus.audio("decode", 1.0)
+    assert len(seen) == 1 and "Sink de eventos fallido" in caplog.text
+
+
+def test_pyannote_hook_steps():
+    bus, seen = EventBus(), _Collect()
+    hook = PyannoteHook(bus)
+    with bus.subscribed(seen):
+        hook("segmentation", None, total=4, completed=1)
+        hook("segmentation", None, total=4, completed=4)
+        hook("embeddings", None, total=2, completed=2)
+        hook("discrete_diarization", object())              # paso sin progreso propio
+        hook("embeddings", object())                         # ya visto: se ignora
+        hook.close()
+    stages = [(e.kind, e.stage) for e in seen if e.kind in (STAGE_START, STAGE_END)]
+    assert stages == [
+        (STAGE_START, "diarize/segmentation"), (STAGE_END, "diarize/segmentation"),
+        (STAGE_START, "diarize/embeddings"), (STAGE_END, "diarize/embeddings"),
+        (STAGE_START, "diarize/discrete_diarization"), (STAGE_END, "diarize/discrete_diarization"),
+    ]
+    assert [e.data["n"] for e in seen if e.stage == "diarize/segmentation" and e.kind == BATCH_DONE] == [1, 3]
+    (discrete,) = [e for e in seen if e.kind == STAGE_START and e.stage.endswith("discrete_diarization")]
+    assert discrete.data["since_previous"] is True
+
+
+def test_progress_prints_split_writes():
+    got, out = [], io.StringIO()
+    sink = ProgressPrints(got.append, out)
+    # print() escribe el texto y el fin de línea en dos write()
+    for chunk in ["Progress: 12.50%...", "\n", "otra ", "línea\nProgress: 100.00%...", "\n", "fin"]:
+        sink.write(chunk)
+    sink.flush()
+    assert got == [12.5, 100.0]
+    assert out.getvalue() == "otra línea\nfin"
+
+
+# --- sinks -------------------------------------------------------------------
+
+def test_log_sink(caplog):
+    bus = EventBus()
+    log = logging.getLogger("test-telemetry")
+    with caplog.at_level(logging.INFO, logger="test-telemetry"), bus.subscribed(LogSink(log)):
+        _stage_run(bus)
+        with pytest.raises(RuntimeError):
+            _stage_run(bus, "align", fail=True)
+    lines = [r.getMessage() for r in caplog.records]
+    assert lines[0] == "▶ asr (3 lote)"
+    assert lines[1].startswith("✓ asr ") and "RSS pico del proceso" in lines[1]
+    assert lines[3].startswith("✗ align ")
+
+
+def test_jsonl_metrics_sink(tmp_path):
+    path = tmp_path / "eventos.jsonl"
+    bus, sink = EventBus(), JsonlMetricsSink(str(path))
+    with bus.subscribed(sink):
+        _stage_run(bus, "diarización")
+    sink.close()
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [r["kind"] for r in rows] == [STAGE_START, BATCH_DONE, BATCH_DONE, AUDIO, MEMORY, STAGE_END]
+    assert rows[0]["stage"] == "diarización" and rows[0]["total"] == 3
+    assert rows[3]["seconds"] == 12.5 and isinstance(rows[0]["time"], float)
+
+
+def _metrics(text: str) -> dict:
+    return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+            for line in text.splitlines() if line and not line.startswith("#")}
+
+
+def test_prometheus_render():
+    bus, sink = EventBus(), PrometheusSink(prefix="t")
+    with bus.subscribed(sink):
+        _stage_run(bus)
+        _stage_run(bus)
+        with pytest.raises(RuntimeError):
+            _stage_run(bus, 'raro"\\\n', fail=True)
+    text = sink.render()
+    assert text.endswith("\n")
+    assert "# TYPE t_stage_runs_total counter" in text and "# TYPE t_stage_active gauge" in text
+    m = _metrics(text)
+    assert m['t_stage_runs_total{stage="asr"}'] == 2
+    assert m['t_batches_total{stage="asr"}'] == 6
+    assert m['t_audio_seconds_total{stage="asr"}'] == 25
+    assert m['t_stage_active{stage="asr"}'] == 0
+    assert m['t_memory_peak_mib{kind="rss"}'] > 0
+    # Escapado de etiquetas: \\ → \\\\, " → \\", salto de línea → \\n
+    assert m['t_stage_failures_total{stage="raro\\"\\\\\\n"}'] == 1
+    assert 't_stage_failures_total{stage="asr"}' not in m
+
+
+def test_prometheus_active_gauge_and_serve():
+    bus, sink = EventBus(), PrometheusSink(prefix="t")
+    with bus.subscribed(sink), bus.stage("asr"):
+        server = sink.serve(0)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as r:
+                assert r.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                body = r.read().decode("utf-8")
+            with pytest.raises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/otra", timeout=5)
+        finally:
+            server.shutdown()
+    assert _metrics(body)['t_stage_active{stage="asr"}'] == 1
@@ -0,0 +1,100 @@
+# tests/test_identity.py
+"""Caché de embeddings por ventana y el índice de identidades (diarization/*), sin modelos."""
+import numpy as np
+import pytest
+
+from src.diarization import identity
+from src.diarization.embedding_cache import EmbeddingCache
+from src.diarization.identity import VoiceprintIndex, index_fingerprint
+
+
+def _window(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal(16000).astype(np.float32)
+
+
+def test_embedding_cache_key():
+    cache = EmbeddingCache("unused", model_key="m1")
+    w = _window(0)
+    assert cache.key(w) == cache.key(w.astype(np.float64))            # mismo audio en float32
+    assert cache.key(w) == cache.key(np.repeat(w, 2)[::2])             # vista no contigua
+    assert cache.key(w) != cache.key(_window(1))
+    assert cache.key(w) != EmbeddingCache("unused", model_key="m2").key(w)   # otro modelo/opciones
+
+
+def test_embedding_cache_round_trip(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "m")
+    key = cache.key(_window(0))
+    assert cache.load(key) is None and cache.misses == 1
+    seg, binarized, emb = np.ones((1, 589, 3)), np.zeros((1, 589, 3)), np.full((1, 3, 256), 0.5)
+    cache.save(key, seg, binarized, emb)
+    out = cache.load(key)
+    assert cache.hits == 1 and (tmp_path / key[:2] / f"{key}.npz").exists()
+    for a, b in zip(out, (seg, binarized, emb)):
+        np.testing.assert_array_equal(a, b)
+    assert not list(tmp_path.rglob("*.tmp"))
+
+    cache.save(key, seg, binarized, None)                              # sin embeddings
+    assert cache.load(key)[2] is None
+
+
+@pytest.mark.parametrize("content", [b"", b"PK\x03\x04roto", b"no es npz"])
+def test_corrupt_cache_entry_is_a_miss(tmp_path, content):
+    cache = EmbeddingCache(str(tmp_path), "m")
+    key = cache.key(_window(0))
+    cache.save(key, np.ones(3), np.zeros(3), None)
+    path = tmp_path / key[:2] / f"{key}.npz"
+    path.write_bytes(content)                                          # escrita por otra versión / disco dañado
+    assert cache.load(key) is None and cache.misses == 1
+
+
+def _unit(*v) -> np.ndarray:
+    v = np.asarray(v, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_index_add_save_load_remove(tmp_path):
+    path = tmp_path / "idx" / "hablantes.npz"
+    assert index_fingerprint(str(path)) is None
+    index = VoiceprintIndex(str(path))
+    index.add("Ana", np.array([[3.0, 0.0, 0.0]]))                      # se aplana y normaliza
+    index.add("Íñigo", np.array([0.0, 2.0, 0.0]))
+    index.add("Ana", np.array([0.0, 0.0, 5.0]))                        # refuerzo: media de huellas
+    index.save()
+    fp = index_fingerprint(str(path))
+
+    loaded = VoiceprintIndex(str(path))
+    assert loaded.names == ["Ana", "Íñigo"] and loaded.counts.tolist() == [2, 1]
+    np.testing.assert_allclose(loaded.vectors[0], _unit(1, 0, 1), atol=1e-6)
+    assert loaded.remove("Ana") and not loaded.remove("Ana")
+    loaded.save()
+    assert index_fingerprint(str(path)) != fp
+    assert VoiceprintIndex(str(path)).names == ["Íñigo"]
+
+
+def test_match_is_one_to_one_above_threshold(tmp_path):
+    index = VoiceprintIndex(str(tmp_path / "i.npz"))
+    index.add("Ana", _unit(1, 0, 0))
+    index.add("Luis", _unit(0, 1, 0))
+    centroids = np.stack([
+        _unit(0.2, 1, 0),                                              # Luis
+        _unit(1, 0.1, 0),                                              # Ana
+        _unit(1, 0.3, 0),                                              # también Ana, pero peor: nadie
+        _unit(0, 0, 1),                                                # desconocido
+        np.full(3, np.nan, np.float32),                                # cluster sin embedding
+    ])
+    assert index.match(centroids) == {0: "Luis", 1: "Ana"}
+    assert index.match(centroids, threshold=0.999) == {}
+    assert VoiceprintIndex(str(tmp_path / "vacío.npz")).match(centroids) == {}
+    assert index.match(np.zeros((0, 3))) == {}
+
+
+def test_cli_list_and_remove(tmp_path, capsys):
+    path = str(tmp_path / "i.npz")
+    index = VoiceprintIndex(path)
+    index.add("Ana", _unit(1, 0, 0))
+    index.save()
+    identity.main(["--index", path, "list"])
+    assert "Ana\t1 muestras" in capsys.readouterr().out
+    identity.main(["--index", path, "remove", "Ana"])
+    identity.main(["--index", path, "remove", "Ana"])
+    assert capsys.readouterr().out.splitlines() == ["Ana: eliminada", "Ana: no existe"]
@@ -0,0 +1,25 @@
+# tests/test_importtime.py
+"""Presupuesto de arranque de la CLI (utils/importtime.py)."""
+import os
+from pathlib import Path
+
+import pytest
+
+from src.utils.importtime import DEFAULT_BUDGET_MS, HEAVY_MODULES, loaded_heavy, measure
+
+ROOT = Path(__file__).resolve().parents[1]
+BUDGET_MS = float(os.environ.get("IMPORTTIME_BUDGET_MS", DEFAULT_BUDGET_MS))
+
+
+def test_help_within_budget():
+    rows = measure(["-h"], ROOT)
+    total_ms = sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000
+    assert total_ms <= BUDGET_MS, f"{total_ms:.0f} ms > {BUDGET_MS:.0f} ms"
+    heavy = {name.split(".")[0] for name, *_ in rows} & set(HEAVY_MODULES)
+    assert not heavy
+
+
+@pytest.mark.parametrize("argv", [["-h"], ["--no-diarize"], ["--no-diarize", "--device", "cpu"]])
+def test_no_heavy_modules_after_parsing(argv):
+    # Sin audio, main() termina en parser.error tras parsear e importar lo imprescindible
+    assert loaded_heavy(argv, ROOT) == []
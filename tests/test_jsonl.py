@@ -0,0 +1,96 @@
+# tests/test_jsonl.py
+"""Codificación JSONL (formatting/jsonl.py): backends orjson/json, NaN, NumPy, redondeo y compresión."""
+import gzip
+import json
+import math
+
+import numpy as np
+import pytest
+
+from src.formatting import jsonl
+from src.formatting.jsonl import SegmentEncoder, write_jsonl
+
+
+def _segments() -> list:
+    return [
+        {"start": 0.0, "end": 1.5, "text": " Hola, ¿qué tal?", "speaker": "SPEAKER_00",
+         "words": [{"word": "Hola,", "start": 0.0, "end": 0.4, "score": 0.91},
+                   {"word": "¿qué", "start": 0.5, "end": 0.8, "score": float("nan")},
+                   {"word": "tal?", "start": 0.9, "end": 1.5}]},
+        {"start": np.float64(2.0), "end": np.float32(3.25), "text": " ñandú", "id": np.int64(7),
+         "words": [{"word": "ñandú", "start": np.float64(2.0), "end": np.float64(3.25),
+                    "score": np.float32("nan"), "ok": np.bool_(True)}]},
+        {"start": 4.0, "end": 5.0, "text": "  "},
+    ]
+
+
+def _encode(monkeypatch, backend, segments, precision=None) -> bytes:
+    if backend == "json":
+        monkeypatch.setattr(jsonl, "orjson", None)
+    else:
+        pytest.importorskip("orjson")
+    data, _ = SegmentEncoder(precision).encode_many(segments)
+    return data
+
+
+def _parse(data: bytes) -> list:
+    def strict(token):                         # NaN/Infinity no son JSON
+        raise AssertionError(f"{token} en la salida")
+
+    return [json.loads(line, parse_constant=strict) for line in data.decode("utf-8").splitlines()]
+
+
+def test_json_backend_keeps_baseline_format(monkeypatch):
+    seg = {"start": 0.0, "end": 1.5, "text": " Hola, ¿qué tal?", "words": [{"word": "Hola,", "score": 0.5}]}
+    data = _encode(monkeypatch, "json", [dict(seg)])
+    assert data == (json.dumps(seg, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def test_json_backend_nan_and_numpy(monkeypatch):
+    segments = _segments()
+    lines = _parse(_encode(monkeypatch, "json", segments))
+    assert len(lines) == 2                     # el segmento sin texto se omite
+    assert lines[0]["words"][1]["score"] is None
+    assert lines[1]["id"] == 7 and lines[1]["end"] == 3.25
+    assert lines[1]["words"][0]["score"] is None and lines[1]["words"][0]["ok"] is True
+    assert math.isnan(segments[0]["words"][1]["score"])      # la entrada no se modifica
+
+
+@pytest.mark.parametrize("precision", [None, 2])
+def test_backends_equivalent(monkeypatch, precision):
+    pytest.importorskip("orjson")
+    fast = _parse(_encode(monkeypatch, "orjson", _segments(), precision))
+    slow = _parse(_encode(monkeypatch, "json", _segments(), precision))
+    assert fast == slow
+
+
+def test_precision_rounds_segments_words_chars(monkeypatch):
+    seg = {"start": 0.123456, "end": 1.987654, "text": " a",
+           "words": [{"word": "a", "start": 0.123456, "end": 0.55555, "score": 0.876543}],
+           "chars": [{"char": "a", "start": 0.123456, "end": 0.2, "score": None}]}
+    (line,) = _parse(_encode(monkeypatch, "json", [seg], precision=3))
+    assert (line["start"], line["end"]) == (0.123, 1.988)
+    assert line["words"][0] == {"word": "a", "start": 0.123, "end": 0.556, "score": 0.877}
+    assert line["chars"][0]["start"] == 0.123 and line["chars"][0]["score"] is None
+
+
+def test_iter_blocks_splits_writes():
+    segments = [{"start": float(i), "end": i + 0.5, "text": f" s{i}"} for i in range(10)]
+    blocks = list(SegmentEncoder().iter_blocks(segments, per_write=4))
+    assert len(blocks) == 3
+    assert b"".join(blocks) == SegmentEncoder().encode_many(segments)[0]
+
+
+@pytest.mark.parametrize("compress, suffix", [("none", ".jsonl"), ("gzip", ".jsonl.gz"), ("zstd", ".jsonl.zst")])
+def test_write_jsonl_roundtrip(tmp_path, compress, suffix):
+    zstandard = pytest.importorskip("zstandard") if compress == "zstd" else None
+    out = write_jsonl(_segments(), str(tmp_path / "out.jsonl"), compress=compress)
+    assert out.endswith(suffix)
+    if zstandard is not None:
+        with open(out, "rb") as f:
+            data = zstandard.ZstdDecompressor().stream_reader(f).read()
+    else:
+        with (gzip.open if compress == "gzip" else open)(out, "rb") as f:
+            data = f.read()
+    lines = _parse(data)
+    assert [seg["text"] for seg in lines] == [" Hola, ¿qué tal?", " ñandú"]
@@ -0,0 +1,288 @@
+# tests/test_live.py
+"""Modo en vivo (pipelines/live.py): cabecera WAV, lector PCM, corte y LiveSession.step."""
+import io
+import json
+import struct
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pytest
+
+pytest.importorskip("whisperx")
+
+from src.pipelines import live  # noqa: E402
+from src.pipelines.live import (  # noqa: E402
+    KEEP_S, SAMPLE_RATE, LiveSession, PcmReader, quietest_point, read_wav_header,
+)
+
+
+def _wav(samples: bytes, tag: int = 1, bits: int = 16, rate: int = SAMPLE_RATE, channels: int = 1,
+         extra: bytes = b"") -> bytes:
+    block = channels * bits // 8
+    fmt = struct.pack("<HHIIHH", tag, channels, rate, rate * block, block, bits)
+    chunks = b"fmt " + struct.pack("<I", len(fmt)) + fmt
+    if extra:
+        chunks += b"LIST" + struct.pack("<I", len(extra)) + extra + b"\0" * (len(extra) & 1)
+    chunks += b"data" + struct.pack("<I", len(samples)) + samples
+    return b"RIFF" + struct.pack("<I", 4 + len(chunks)) + b"WAVE" + chunks
+
+
+# ----------------------------------------------------------------------
+# read_wav_header
+# ----------------------------------------------------------------------
+def test_wav_header_s16():
+    pcm = np.arange(10, dtype="<i2").tobytes()
+    stream = io.BytesIO(_wav(pcm, extra=b"odd"))        # chunk impar: relleno de 1 byte
+    assert read_wav_header(stream, "f32le") == ("s16le", b"")
+    assert stream.read() == pcm
+
+
+def test_wav_header_f32():
+    pcm = np.linspace(-1, 1, 10, dtype="<f4").tobytes()
+    stream = io.BytesIO(_wav(pcm, tag=3, bits=32))
+    assert read_wav_header(stream, "s16le") == ("f32le", b"")
+    assert stream.read() == pcm
+
+
+def test_raw_pcm_passthrough():
+    pcm = np.arange(10, dtype="<i2").tobytes()
+    stream = io.BytesIO(pcm)
+    fmt, head = read_wav_header(stream, "s16le")
+    assert fmt == "s16le" and head + stream.read() == pcm
+
+
+@pytest.mark.parametrize("kwargs, match", [
+    ({"rate": 44100}, "44100 Hz"),
+    ({"channels": 2}, "2 canales"),
+    ({"bits": 24}, "24 bits"),
+    ({"tag": 3, "bits": 64}, "64 bits"),
+])
+def test_wav_header_rejected(kwargs, match):
+    with pytest.raises(ValueError, match=match):
+        read_wav_header(io.BytesIO(_wav(b"", **kwargs)), "s16le")
+
+
+def test_wav_header_truncated():
+    with pytest.raises(ValueError, match="incompleta"):
+        read_wav_header(io.BytesIO(_wav(b"")[:16]), "s16le")
+
+
+# ----------------------------------------------------------------------
+# PcmReader
+# ----------------------------------------------------------------------
+class _Chunked(io.RawIOBase):
+    """Flujo que entrega los bytes en los trozos dados (como mucho uno por lectura)."""
+
+    def __init__(self, parts):
+        self.parts = list(parts)
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        if not self.parts:
+            return b""
+        part = self.parts.pop(0)
+        if 0 <= n < len(part):
+            part, rest = part[:n], part[n:]
+            self.parts.insert(0, rest)
+        return part
+
+
+def _run(reader: PcmReader) -> np.ndarray:
+    reader.start()
+    reader.join(5)
+    out, eof = reader.take(0)
+    assert eof and reader.error is None
+    return out
+
+
+def test_reader_splits_samples_across_reads():
+    pcm = (np.arange(-50, 50, dtype="<i2") * 300).tobytes()
+    # Cortes a mitad de muestra: el byte sobrante pasa a la lectura siguiente
+    parts = [pcm[:3], pcm[3:4], pcm[4:101], pcm[101:]]
+    out = _run(PcmReader(_Chunked(parts), "s16le"))
+    np.testing.assert_array_equal(out, np.frombuffer(pcm, "<i2").astype(np.float32) / 32768.0)
+
+
+def test_reader_f32_from_wav():
+    samples = np.linspace(-1, 1, 1000, dtype="<f4")
+    wav = _wav(samples.tobytes(), tag=3, bits=32)
+    reader = PcmReader(_Chunked([wav[:30], wav[30:1000], wav[1000:]]), "s16le")
+    np.testing.assert_array_equal(_run(reader), samples)
+    assert reader.fmt == "f32le"
+
+
+def test_reader_reports_error():
+    reader = PcmReader(io.BytesIO(_wav(b"", rate=8000)))
+    reader.start()
+    reader.join(5)
+    with pytest.raises(ValueError):
+        reader.take(0)
+
+
+def test_arrival_and_forget():
+    reader = PcmReader(io.BytesIO())
+    with reader._cond:
+        for n in range(1, 301):                     # 300 bloques de 100 muestras: varios crecimientos
+            reader._mark(100)
+            reader._times[reader._hi - 1] = float(n)
+    assert reader.arrival(0) == 1.0
+    assert reader.arrival(99) == 1.0
+    assert reader.arrival(100) == 2.0
+    assert reader.arrival(29_999) == 300.0
+    assert reader.arrival(10 ** 9) == 300.0          # más allá del final: el último bloque
+    reader.forget(15_050)                            # bloques que terminan en ≤ 15 000 fuera
+    assert reader._hi - reader._lo == 150
+    assert reader.arrival(15_050) == 151.0
+    assert reader.arrival(29_999) == 300.0
+    reader.forget(10 ** 9)                           # siempre queda el último
+    assert reader._hi - reader._lo == 1 and reader.arrival(0) == 300.0
+    with reader._cond:
+        for _ in range(200):                         # tras descartar, compacta sin crecer
+            reader._mark(100)
+    assert len(reader._ends) == 512 and reader.arrival(30_000) > 0
+
+
+# ----------------------------------------------------------------------
+# quietest_point
+# ----------------------------------------------------------------------
+def test_quietest_point():
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-0.5, 0.5, 3 * SAMPLE_RATE).astype(np.float32)
+    frame = int(live.FRAME_S * SAMPLE_RATE)
+    quiet = int(2.3 * SAMPLE_RATE)
+    audio[quiet:quiet + frame] *= 0.01
+    t = quietest_point(audio, 2.0, 3.0)
+    assert abs(t - 2.31) < live.FRAME_S
+    assert quietest_point(audio, 2.0, 2.01) == 2.01      # menos de una trama: el final
+
+
+# ----------------------------------------------------------------------
+# LiveSession.step con VAD y transcriptor de prueba
+# ----------------------------------------------------------------------
+@dataclass(frozen=True)
+class _Options:
+    initial_prompt: Optional[str] = None
+
+
+class _Model:
+    options = _Options("base")
+
+
+class _Transcriber:
+    """Un segmento por ventana con una palabra por cada 2 s completos de voz."""
+    chunk_size, vad_onset, vad_offset, language = 30, 0.5, 0.363, "es"
+
+    def __init__(self):
+        self.model = _Model()
+        self.prompts = []
+
+    def transcribe_chunks(self, audio, chunks, batch_size):
+        self.prompts.append(self.model.options.initial_prompt)
+        return [{"start": c["start"], "end": c["end"], "text": " " + "la " * int((c["end"] - c["start"]) / 2 + 1e-6)}
+                for c in chunks]
+
+
+class _Vad:
+    """Voz en `speech` (s absolutos del flujo); la ventana empieza en session.t0."""
+
+    def __init__(self, speech):
+        self.speech = speech
+        self.session = None
+
+    def regions(self, n_samples: int) -> np.ndarray:
+        t0 = self.session.t0
+        t1 = t0 + n_samples / SAMPLE_RATE
+        out = [(max(s, t0) - t0, min(e, t1) - t0) for s, e in self.speech if min(e, t1) > max(s, t0)]
+        return np.array(out, dtype=np.float64).reshape(-1, 2)
+
+
+class _Reader:
+    def __init__(self):
+        self.forgotten = 0
+
+    def arrival(self, sample):
+        return time.monotonic()
+
+    def forget(self, sample):
+        self.forgotten = sample
+
+
+@pytest.fixture
+def session(monkeypatch):
+    from src.asr import vad as vad_module
+
+    vad = _Vad([(1.0, 3.0), (5.0, 17.0)])
+    monkeypatch.setattr(vad_module, "speech_regions", lambda v, audio, *a: v.regions(len(audio)))
+    monkeypatch.setattr(vad_module, "merge_regions",
+                        lambda regions, *a: [{"start": float(s), "end": float(e)} for s, e in regions])
+    out = io.BytesIO()
+    s = LiveSession(_Transcriber(), vad, _Reader(), out, "cpu", batch_size=1, align=False,
+                    step_s=1.0, silence_s=0.6, max_segment_s=10.0, context_chars=8, partials=True)
+    vad.session = s
+    return s
+
+
+def _feed(session: LiveSession, seconds: int):
+    """Audio con ruido y una pausa de una trama a 14.5 s; un step por segundo."""
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-0.5, 0.5, seconds * SAMPLE_RATE).astype(np.float32)
+    quiet = int(14.5 * SAMPLE_RATE)
+    audio[quiet:quiet + int(live.FRAME_S * SAMPLE_RATE)] = 0.0
+    lines = []
+    for i in range(seconds):
+        session.buf = np.concatenate([session.buf, audio[i * SAMPLE_RATE:(i + 1) * SAMPLE_RATE]])
+        eof = i == seconds - 1
+        session.step(eof)
+        # t0 + ventana pendiente = audio recibido
+        assert session.t0 + len(session.buf) / SAMPLE_RATE == pytest.approx(i + 1)
+        assert session.reader.forgotten == round(session.t0 * SAMPLE_RATE)
+        new = session.out.getvalue().splitlines()[len(lines):]
+        lines.extend(json.loads(line) | {"step": i + 1} for line in new)
+    return lines
+
+
+def test_step_finals_partials_and_t0(session):
+    lines = _feed(session, 20)
+    finals = [rec for rec in lines if rec["type"] == "final"]
+    partials = [rec for rec in lines if rec["type"] == "partial"]
+
+    # [1, 3]: se cierra cuando hay `silence` s de audio tras su final
+    assert (finals[0]["start"], finals[0]["end"], finals[0]["step"]) == (1.0, 3.0, 4)
+    # [5, 17] dura más que max_segment: corte forzado en la pausa de 14.5 s
+    cut = finals[1]["end"]
+    assert finals[1]["start"] == 5.0 and abs(cut - 14.51) < 0.02 and finals[1]["step"] == 15
+    assert (finals[2]["start"], finals[2]["end"], finals[2]["step"]) == (cut, 17.0, 18)
+    assert [rec["id"] for rec in finals] == [0, 1, 2] and session.next_id == 3
+
+    # Parciales de la voz abierta sólo si su texto cambió (ni vacíos ni repetidos)
+    assert [(rec["start"], rec["end"], rec["step"], rec["text"]) for rec in partials] == [
+        (1.0, 3.0, 3, "la"),
+        (5.0, 7.0, 7, "la"), (5.0, 9.0, 9, "la la"), (5.0, 11.0, 11, "la la la"), (5.0, 13.0, 13, "la la la la"),
+        (cut, 17.0, 17, "la"),
+    ]
+    assert all(rec["latency"] >= 0 for rec in lines)
+
+    # Sin voz al final: la ventana conserva sólo KEEP_S s; al EOF, nada
+    assert session.t0 == pytest.approx(20.0) and len(session.buf) == 0
+    assert session.partial_text is None
+
+
+def test_step_silence_keeps_tail(session):
+    session.vad.speech = []
+    session.buf = np.zeros(2 * SAMPLE_RATE, np.float32)
+    session.step(False)
+    assert session.t0 == pytest.approx(2.0 - KEEP_S)
+    assert len(session.buf) == int(round(KEEP_S * SAMPLE_RATE))
+    assert session.out.getvalue() == b""
+
+
+def test_context_prompt(session):
+    _feed(session, 20)
+    # Contexto deslizante acotado a context_chars, tras el prompt base
+    assert session.t.model.options.initial_prompt.startswith("base ")
+    assert len(session.context) <= 8
+    assert session.t.prompts[0] == "base"
@@ -0,0 +1,73 @@
+# tests/test_loader.py
+"""Decodificación única del audio (audio/loader.py): caché .f32 y memmap copy-on-write."""
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("whisperx")
+
+from src.audio import loader  # noqa: E402
+from src.audio.loader import duration_seconds, load_waveform  # noqa: E402
+
+SR = loader.SAMPLE_RATE
+
+
+@pytest.fixture
+def decoder(monkeypatch):
+    """Sustituye ffmpeg: el «audio» es una rampa cuya longitud depende del archivo."""
+    calls = []
+
+    def fake_load_audio(path, sr=SR):
+        calls.append(path)
+        n = os.path.getsize(path) * 10
+        return (np.arange(n, dtype=np.float32) / max(1, n)).astype(np.float32)
+
+    monkeypatch.setattr(loader, "load_audio", fake_load_audio)
+    return calls
+
+
+def _audio_file(tmp_path, size: int = 1600):
+    path = tmp_path / "voz.wav"
+    path.write_bytes(b"\0" * size)
+    return str(path)
+
+
+def test_without_cache_decodes_in_memory(tmp_path, decoder):
+    audio, seconds = load_waveform(_audio_file(tmp_path))
+    assert type(audio) is np.ndarray and audio.dtype == np.float32
+    assert duration_seconds(audio) == 1.0 and seconds >= 0
+    assert len(decoder) == 1
+
+
+def test_cache_decodes_once(tmp_path, decoder):
+    path, cache = _audio_file(tmp_path), tmp_path / "cache"
+    first, _ = load_waveform(path, cache_dir=str(cache))
+    second, _ = load_waveform(path, cache_dir=str(cache))
+    assert len(decoder) == 1                                 # la segunda vez sale del .f32
+    assert isinstance(second, np.memmap)
+    np.testing.assert_array_equal(first, second)
+    assert [p.suffix for p in cache.iterdir()] == [".f32"]   # sin .tmp a medias
+
+
+def test_cached_waveform_is_copy_on_write(tmp_path, decoder):
+    path, cache = _audio_file(tmp_path), str(tmp_path / "cache")
+    audio, _ = load_waveform(path, cache_dir=cache)
+    original = np.array(audio)
+    audio[:100] = 5.0                                       # modifica sólo la vista del proceso
+    again, _ = load_waveform(path, cache_dir=cache)
+    np.testing.assert_array_equal(again, original)
+
+
+def test_changed_file_is_decoded_again(tmp_path, decoder):
+    path, cache = _audio_file(tmp_path), str(tmp_path / "cache")
+    load_waveform(path, cache_dir=cache)
+    with open(path, "ab") as f:
+        f.write(b"\0" * 800)                                # cambia tamaño (y mtime)
+    audio, _ = load_waveform(path, cache_dir=cache)
+    assert len(decoder) == 2 and duration_seconds(audio) == 1.5
+
+
+def test_empty_audio(tmp_path, decoder):
+    audio, _ = load_waveform(_audio_file(tmp_path, size=0), cache_dir=str(tmp_path / "cache"))
+    assert audio.shape == (0,) and audio.dtype == np.float32
@@ -0,0 +1,43 @@
+# tests/test_memory_sampler.py
+"""MemorySampler (utils/batch_planner.py): aislamiento de ventanas y muestreo sin registrarse."""
+import threading
+
+import numpy as np
+
+from src.utils.batch_planner import MemorySampler, memory_activity
+
+
+def test_isolated_window():
+    with MemorySampler("cpu", interval=0.01) as mem:
+        pass
+    assert mem.isolated and mem.peak_mib >= mem.base_mib > 0
+
+
+def test_overlapping_activity_breaks_isolation():
+    with MemorySampler("cpu", interval=0.01) as mem:
+        with memory_activity():                         # p. ej. decodificación del archivo siguiente
+            pass
+    assert not mem.isolated
+
+    with memory_activity():                             # ya en curso al empezar
+        with MemorySampler("cpu", interval=0.01) as mem:
+            pass
+    assert not mem.isolated
+
+
+def test_job_sampler_does_not_count_as_activity():
+    # El pico por job (activity=False) envuelve etapas que sí calibran
+    with MemorySampler("cpu", interval=0.01, activity=False) as job:
+        with MemorySampler("cpu", interval=0.01) as stage:
+            pass
+    assert stage.isolated
+    assert not job.isolated                              # no calibra: sólo mide
+
+
+def test_peak_tracks_allocation():
+    done = threading.Event()
+    with MemorySampler("cpu", interval=0.005, activity=False) as mem:
+        block = np.ones(64 * 2**20 // 8)                 # 64 MiB tocados
+        done.wait(0.05)
+        del block
+    assert mem.delta_mib > 32
@@ -0,0 +1,46 @@
+# tests/test_onnx_backend.py
+"""Backend ONNX de la diarización (diarization/onnx_backend.py)."""
+import pytest
+
+pytest.importorskip("torch")
+
+from src.diarization import onnx_backend  # noqa: E402
+from src.diarization.onnx_backend import MAX_DER, compare_backends, resolve_backend  # noqa: E402
+
+from conftest import PYANNOTE_CHECKPOINTS  # noqa: E402
+
+MAX_DER_INT8 = 0.05
+
+
+@pytest.fixture
+def unsupported(monkeypatch):
+    # pyannote.audio sin ResNet.forward_frames/forward_embedding
+    monkeypatch.setattr(onnx_backend, "onnx_supported", lambda: False)
+
+
+@pytest.mark.parametrize("backend", ["auto", "onnx", "torch"])
+def test_falls_back_to_torch_without_resnet_methods(unsupported, backend):
+    assert resolve_backend(backend, "cpu") == "torch"
+
+
+@pytest.mark.parametrize("backend", ["auto", "onnx"])
+def test_gpu_is_always_torch(backend):
+    assert resolve_backend(backend, "cuda") == "torch"
+
+
+def test_explicit_onnx_kept_when_supported(monkeypatch):
+    monkeypatch.setattr(onnx_backend, "onnx_supported", lambda: True)
+    assert resolve_backend("onnx", "cpu") == "onnx"
+
+
+@pytest.mark.parametrize("int8, max_der", [(False, MAX_DER), (True, MAX_DER_INT8)])
+def test_der_parity(test_audio, int8, max_der):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("pyannote.audio")
+    missing = [p.name for p in PYANNOTE_CHECKPOINTS if not p.exists()]
+    if missing:
+        pytest.skip(f"faltan modelos: {', '.join(missing)}")
+    if not onnx_backend.onnx_supported():
+        pytest.skip("pyannote.audio sin ResNet.forward_frames/forward_embedding")
+    result = compare_backends(str(test_audio), int8=int8)
+    assert result["der"] <= max_der, f"DER ONNX vs torch {result['der']:.2%} > {max_der:.0%}"
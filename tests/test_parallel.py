@@ -0,0 +1,86 @@
+# tests/test_parallel.py
+"""ASR multiproceso (asr/parallel.py): reparto de regiones y memoria compartida sin modelos."""
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from conftest import ROOT
+from src.asr.parallel import split_chunks
+from src.utils.registry import ModelRegistry
+
+
+def _chunks(durations) -> list:
+    out, t = [], 0.0
+    for d in durations:
+        out.append({"start": t, "end": t + d})
+        t += d + 0.5
+    return out
+
+
+@pytest.mark.parametrize("n_shards", [1, 2, 3, 7, 50])
+def test_split_chunks_contiguous_and_balanced(n_shards):
+    chunks = _chunks([30.0] * 20 + [5.0] * 40)
+    shards = split_chunks(chunks, n_shards)
+    assert [c for shard in shards for c in shard] == chunks          # orden y cobertura
+    assert len(shards) <= n_shards and all(shards)
+    if n_shards == 2:
+        load = [sum(c["end"] - c["start"] for c in s) for s in shards]
+        assert abs(load[0] - load[1]) <= 30.0                        # a lo sumo una región de desequilibrio
+
+
+def test_split_chunks_empty():
+    assert split_chunks([], 4) == []
+
+
+def test_attach_leaves_parent_tracker_alone(tmp_path):
+    # Los workers spawn comparten el resource_tracker del principal: si _attach
+    # desregistrase el bloque, el unlink del principal haría fallar al tracker
+    (tmp_path / "shm_child.py").write_text(textwrap.dedent("""
+        from src.asr.parallel import _attach
+
+        def touch(name):
+            shm = _attach(name)
+            value = shm.buf[0]
+            shm.close()
+            return value
+    """))
+    script = textwrap.dedent(f"""
+        import sys
+        sys.path[:0] = [{str(ROOT)!r}, {str(tmp_path)!r}]
+        import multiprocessing as mp
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import shared_memory
+        import shm_child
+
+        if __name__ == "__main__":
+            shm = shared_memory.SharedMemory(create=True, size=16)
+            shm.buf[0] = 7
+            with ProcessPoolExecutor(2, mp_context=mp.get_context("spawn")) as ex:
+                assert list(ex.map(shm_child.touch, [shm.name] * 4)) == [7] * 4
+            shm.close()
+            shm.unlink()
+            print("ok")
+    """)
+    script_path = tmp_path / "main_script.py"
+    script_path.write_text(script)
+    proc = subprocess.run([sys.executable, str(script_path)], capture_output=True, text=True, timeout=120,
+                          env={"PYTHONPATH": f"{ROOT}:{tmp_path}", "PATH": ""})
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == "ok"
+    assert "KeyError" not in proc.stderr and "leaked" not in proc.stderr, proc.stderr
+
+
+def test_registry_clear_shuts_down_models():
+    class Pooled:
+        closed = 0
+
+        def shutdown(self):
+            Pooled.closed += 1
+
+    reg = ModelRegistry()
+    reg.get("a", Pooled)
+    reg.get("b", object)
+    reg.clear()
+    assert Pooled.closed == 1 and reg.keys() == []
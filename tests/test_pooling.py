@@ -0,0 +1,84 @@
+# tests/test_pooling.py
+"""StatsPool vectorizado (utils/monkeypatch_pooling.py) frente al bucle por hablante."""
+import warnings
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("pyannote.audio")
+
+from benchmarks.reference import reference_pool_forward  # noqa: E402
+from src.utils.monkeypatch_pooling import _patched_forward  # noqa: E402
+
+BATCH, FEATURES = 4, 256
+
+
+def _weights(kind: str, speakers: int, frames: int) -> torch.Tensor:
+    g = torch.Generator().manual_seed(1)
+    if kind == "zeros":
+        return torch.zeros(BATCH, speakers, frames)
+    if kind == "ones":
+        return torch.ones(BATCH, speakers, frames)
+    if kind == "binary":
+        return (torch.rand(BATCH, speakers, frames, generator=g) > 0.6).float()
+    if kind == "fractional":
+        return torch.rand(BATCH, speakers, frames, generator=g)
+    if kind == "tiny":
+        # Σw ~ 1e-8: la normalización deja un total lejos de 0 y de 1
+        return torch.rand(BATCH, speakers, frames, generator=g) * 1e-9
+    if kind == "mixed":
+        w = torch.rand(BATCH, speakers, frames, generator=g)
+        w[:, 0] = 0.0                   # hablante sin actividad
+        if speakers > 1:
+            w[:, 1] = 1.0
+        return w
+    raise ValueError(kind)
+
+
+def _sequences(frames: int, dtype=torch.float64) -> torch.Tensor:
+    g = torch.Generator().manual_seed(0)
+    # Desplazadas de cero: estresa la cancelación de E[x²] − E[x]²
+    return (torch.randn(BATCH, FEATURES, frames, generator=g) * 3 + 10).to(dtype)
+
+
+@pytest.mark.parametrize("kind", ["zeros", "ones", "binary", "fractional", "tiny", "mixed"])
+@pytest.mark.parametrize("speakers", [1, 3, 7])
+@pytest.mark.parametrize("frames", [1, 2, 50, 589])
+def test_matches_per_speaker_loop(kind, speakers, frames):
+    seq = _sequences(frames)
+    w = _weights(kind, speakers, frames).double()
+    expected = reference_pool_forward(None, seq, w)
+    got = _patched_forward(None, seq, w)
+    assert got.shape == expected.shape == (BATCH, speakers, 2 * FEATURES)
+    torch.testing.assert_close(got, expected, rtol=1e-6, atol=1e-6)
+
+
+def test_float32_close():
+    seq = torch.randn(BATCH, FEATURES, 589, generator=torch.Generator().manual_seed(2))
+    w = _weights("fractional", 3, 589)
+    torch.testing.assert_close(_patched_forward(None, seq, w), reference_pool_forward(None, seq, w),
+                               rtol=1e-4, atol=1e-4)
+
+
+def test_without_speaker_dimension():
+    seq = _sequences(50)
+    w = _weights("fractional", 1, 50)[:, 0].double()
+    got = _patched_forward(None, seq, w)
+    assert got.shape == (BATCH, 2 * FEATURES)
+    torch.testing.assert_close(got, reference_pool_forward(None, seq, w), rtol=1e-6, atol=1e-6)
+
+
+def test_interpolated_weights():
+    seq = _sequences(100)
+    w = _weights("binary", 3, 37).double()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        got = _patched_forward(None, seq, w)
+    torch.testing.assert_close(got, reference_pool_forward(None, seq, w), rtol=1e-6, atol=1e-6)
+
+
+def test_unweighted():
+    seq = _sequences(50)
+    out = _patched_forward(None, seq)
+    torch.testing.assert_close(out[:, :FEATURES], seq.mean(dim=-1))
+    torch.testing.assert_close(out[:, FEATURES:], seq.std(dim=-1, correction=1))
@@ -0,0 +1,117 @@
+# tests/test_profiler.py
+"""Perfil por etapa (utils/profiler.py) alimentado por el bus de eventos, sin modelos."""
+import json
+import threading
+import time
+
+import pytest
+
+from src.utils.events import STAGE_END, STAGE_START, EventBus
+from src.utils.profiler import StageProfiler, _percentile, trace_path_for
+
+
+def _busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _job(bus: EventBus) -> None:
+    with bus.stage("decode"):
+        bus.audio("decode", 120.0)
+    with bus.stage("transcribe", 3, "lote") as adv:
+        for _ in range(3):
+            _busy(0.01)
+            adv(1)
+    with bus.stage("save"):
+        with bus.stage("save/merge", progress=False):
+            bus.count("save", "words", 40)
+        with bus.stage("save/write", progress=False):
+            pass
+
+
+@pytest.fixture
+def profiled():
+    bus, prof = EventBus(), StageProfiler(interval=0.005)
+    with prof, bus.subscribed(prof):
+        _job(bus)
+    return prof
+
+
+def test_runs_and_nesting(profiled):
+    runs = {r["stage"]: r for r in profiled.runs}
+    assert [r["stage"] for r in profiled.runs] == ["decode", "transcribe", "save/merge", "save/write", "save"]
+    assert runs["save/merge"]["parent"] == "save" and runs["save"]["parent"] is None
+    assert runs["transcribe"]["batches"] == 3 and runs["transcribe"]["cpu_s"] > 0
+    assert runs["transcribe"]["batch_s"]["max"] >= runs["transcribe"]["batch_s"]["p50"] > 0
+    assert runs["save"]["counts"] == {"words": 40} and "batch_s" not in runs["decode"]
+    assert all(r["ok"] and r["rss_peak_mib"] > 0 for r in profiled.runs)
+
+
+def test_report(profiled):
+    rep = profiled.report(audio_file="a.wav")
+    assert rep["audio_file"] == "a.wav" and rep["audio_s"] == 120.0 and rep["words"] == 40
+    assert rep["rtf"] == pytest.approx(rep["wall_s"] / 120.0)
+    assert rep["totals"]["transcribe"]["runs"] == 1
+    assert rep["totals"]["transcribe"]["rtf"] == pytest.approx(rep["totals"]["transcribe"]["wall_s"] / 120.0)
+    assert all("tid" not in s for s in rep["stages"])
+    json.dumps(rep, allow_nan=False)
+
+
+def test_totals_sum_repeated_stages():
+    bus, prof = EventBus(), StageProfiler()
+    with prof, bus.subscribed(prof):
+        _job(bus)
+        _job(bus)                                           # modo lote: dos archivos
+    totals = prof.report()["totals"]
+    assert totals["transcribe"]["runs"] == 2 and totals["transcribe"]["batches"] == 6
+    assert prof.audio_seconds == 240.0 and totals["save"]["counts"] == {"words": 80}
+
+
+def test_failed_stage_and_threads():
+    bus, prof = EventBus(), StageProfiler()
+
+    def worker():
+        with bus.stage("diarize"):
+            _busy(0.01)
+
+    with prof, bus.subscribed(prof):
+        t = threading.Thread(target=worker, name="diarize_0")
+        with pytest.raises(RuntimeError), bus.stage("transcribe"):
+            t.start()                                       # misma etapa abierta en dos hilos
+            t.join()
+            raise RuntimeError("OOM")
+    runs = {r["stage"]: r for r in prof.runs}
+    assert runs["transcribe"]["ok"] is False and runs["diarize"]["ok"] is True
+    assert runs["diarize"]["thread"] == "diarize_0" and runs["diarize"]["parent"] is None
+
+
+def test_since_previous_starts_at_previous_end():
+    bus, prof = EventBus(), StageProfiler()
+    with prof, bus.subscribed(prof):
+        with bus.stage("diarize/segmentation"):
+            pass
+        _busy(0.05)                                         # trabajo de pyannote sin hook
+        bus.emit(STAGE_START, "diarize/embeddings", since_previous=True)     # como PyannoteHook
+        bus.emit(STAGE_END, "diarize/embeddings", ok=True)
+    seg, emb = prof.runs[0], prof.runs[-1]
+    assert emb["wall_s"] >= 0.05
+    assert emb["start_s"] == pytest.approx(seg["start_s"] + seg["wall_s"], abs=1e-6)
+
+
+def test_write_report_and_trace(tmp_path, profiled):
+    path = tmp_path / "perfil" / "run.json"
+    profiled.write(str(path), audio_file="a.wav")
+    assert json.loads(path.read_text(encoding="utf-8"))["audio_file"] == "a.wav"
+    trace = json.loads((tmp_path / "perfil" / "run.trace.json").read_text(encoding="utf-8"))
+    complete = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert [e["name"] for e in complete] == [r["stage"] for r in profiled.runs]
+    assert all(e["dur"] >= 0 and e["ts"] >= 0 for e in complete)
+    assert any(e["ph"] == "M" and e["args"]["name"] == threading.main_thread().name
+               for e in trace["traceEvents"])
+
+
+def test_helpers():
+    assert trace_path_for("out/p.json") == "out/p.trace.json"
+    assert trace_path_for("out/p") == "out/p.trace.json"
+    assert _percentile([3.0, 1.0, 2.0], 0.5) == 2.0 and _percentile([5.0], 0.95) == 5.0
@@ -0,0 +1,94 @@
+# tests/test_result_cache.py
+"""Caché de resultados (pipelines/result_cache.py): clave, aciertos, expulsión LRU y CLI."""
+import os
+import sys
+
+import pytest
+
+from src.pipelines import result_cache
+from src.pipelines.result_cache import ResultCache
+
+
+def _jsonl(tmp_path, name: str, size: int) -> str:
+    path = tmp_path / name
+    path.write_bytes(b'{"text": "x"}\n'.ljust(size, b" "))
+    return str(path)
+
+
+def _age(cache: ResultCache, key: str, seconds_ago: float) -> None:
+    t = os.path.getmtime(cache._jsonl(key)) - seconds_ago
+    os.utime(cache._jsonl(key), (t, t))
+
+
+def test_key_covers_audio_and_options():
+    k = ResultCache.key("h", model="large-v3", beam_size=5, diarize=True)
+    assert k == ResultCache.key("h", diarize=True, beam_size=5, model="large-v3")
+    assert k != ResultCache.key("h", model="large-v3", beam_size=5, diarize=False)
+    assert k != ResultCache.key("h2", model="large-v3", beam_size=5, diarize=True)
+    assert k != ResultCache.key("h", model="large-v3", beam_size=5, diarize=True, compress="gzip")
+
+
+def test_store_and_fetch(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    assert cache.fetch("k", str(tmp_path / "out.jsonl")) is None
+    src = _jsonl(tmp_path, "a.jsonl", 100)
+    cache.store("k", src, {"audio_file": "a.wav", "model": "tiny"})
+    out = str(tmp_path / "out.jsonl")
+    assert cache.fetch("k", out) == out
+    assert open(out, "rb").read() == open(src, "rb").read()
+    (entry,) = cache.entries()
+    assert entry["key"] == "k" and entry["size"] == 100 and entry["audio_file"] == "a.wav"
+    assert "created" in entry and not list((tmp_path / "cache").glob("*.tmp"))
+
+
+def test_lru_eviction_by_size(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=250)
+    for i, key in enumerate(("a", "b")):
+        cache.store(key, _jsonl(tmp_path, f"{key}.jsonl", 100), {})
+        _age(cache, key, 100 - i * 10)                     # «a» es la más antigua
+    cache.fetch("a", str(tmp_path / "out.jsonl"))          # un acierto la renueva
+    cache.store("c", _jsonl(tmp_path, "c.jsonl", 100), {})
+    assert {e["key"] for e in cache.entries()} == {"a", "c"}   # sale «b», la menos usada
+    assert not (tmp_path / "cache" / "b.meta.json").exists()
+
+
+def test_oversized_entry_is_kept(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=10)
+    cache.store("a", _jsonl(tmp_path, "a.jsonl", 100), {})
+    _age(cache, "a", 10)
+    cache.store("b", _jsonl(tmp_path, "b.jsonl", 100), {})
+    assert [e["key"] for e in cache.entries()] == ["b"]
+
+
+def test_entry_without_meta(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    cache.store("a", _jsonl(tmp_path, "a.jsonl", 20), {"audio_file": "a.wav"})
+    cache._meta("a").write_text("{roto", encoding="utf-8")
+    (entry,) = cache.entries()
+    assert entry["key"] == "a" and "audio_file" not in entry
+
+
+@pytest.mark.parametrize("argv, left", [
+    (["purge", "--all"], []),
+    (["purge", "aa"], ["bb1"]),                            # por prefijo
+    (["purge", "--older-than-days", "1"], ["aa1"]),
+])
+def test_cli_purge(tmp_path, monkeypatch, capsys, argv, left):
+    root = tmp_path / "cache"
+    cache = ResultCache(str(root))
+    cache.store("aa1", _jsonl(tmp_path, "a.jsonl", 20), {})
+    cache.store("bb1", _jsonl(tmp_path, "b.jsonl", 20), {})
+    _age(cache, "bb1", 2 * 86400)
+    monkeypatch.setattr(sys, "argv", ["result_cache", "--dir", str(root), *argv])
+    result_cache.main()
+    assert "entradas eliminadas" in capsys.readouterr().out
+    assert [e["key"] for e in cache.entries()] == left
+
+
+def test_cli_list(tmp_path, monkeypatch, capsys):
+    cache = ResultCache(str(tmp_path / "cache"))
+    cache.store("aa1", _jsonl(tmp_path, "a.jsonl", 20), {"audio_file": "charla.wav"})
+    monkeypatch.setattr(sys, "argv", ["result_cache", "--dir", str(tmp_path / "cache"), "list"])
+    result_cache.main()
+    out = capsys.readouterr().out
+    assert "charla.wav" in out and "1 entradas" in out
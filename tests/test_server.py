@@ -0,0 +1,142 @@
+# tests/test_server.py
+"""Servidor HTTP (service/server.py): opciones de trabajo y respuesta NDJSON."""
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("whisperx")
+
+from main import build_parser  # noqa: E402
+from src.service import server  # noqa: E402
+from src.service.server import _SERVER_ONLY, _job_args  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def parser():
+    return build_parser()
+
+
+def test_job_options_applied(parser):
+    args = _job_args(parser, {"audio": "a.wav", "max_speakers": 3, "beam_size": "2", "model": "tiny",
+                              "no_align": True, "initial_prompt": "hola", "asr_batch": None})
+    assert (args.audio, args.max_speakers, args.beam_size, args.model) == ("a.wav", 3, 2, "tiny")
+    assert args.no_align is True and args.initial_prompt == "hola" and args.asr_batch is None
+
+
+def test_base_options_kept(parser):
+    base = parser.parse_args(["--checkpoint-dir", "/srv/ckpt", "--model-dir", "/srv/models", "--resume"])
+    args = _job_args(parser, {"audio": "a.wav"}, base)
+    assert (args.checkpoint_dir, args.model_dir, args.resume) == ("/srv/ckpt", "/srv/models", False)
+    assert base.audio == []                         # la base no se modifica
+
+
+@pytest.mark.parametrize("key", sorted(_SERVER_ONLY))
+def test_server_only_rejected(parser, key):
+    with pytest.raises(ValueError, match="reservada al servidor"):
+        _job_args(parser, {"audio": "a.wav", key: "/etc/passwd"})
+
+
+def test_path_options_are_server_only():
+    assert {"output", "resume", "audio_cache_dir", "checkpoint_dir", "embedding_cache_dir",
+            "result_cache_dir", "result_cache_mb", "model_dir", "speaker_index"} <= _SERVER_ONLY
+
+
+@pytest.mark.parametrize("body, match", [
+    ({}, "falta 'audio'"),
+    ([], "objeto JSON"),
+    ("a.wav", "objeto JSON"),
+    ({"audio": ["a.wav"]}, "ruta"),
+    ({"audio": "a.wav", "nope": 1}, "desconocida"),
+    ({"audio": "a.wav", "help": True}, "desconocida"),
+    ({"audio": "a.wav", "model": "foo"}, "no está entre"),
+    ({"audio": "a.wav", "compute_type": 1}, "texto"),
+    ({"audio": "a.wav", "max_speakers": "tres"}, "no válido"),
+    ({"audio": "a.wav", "max_speakers": 3.5}, "no válido"),
+    ({"audio": "a.wav", "max_speakers": True}, "no válido"),
+    ({"audio": "a.wav", "max_speakers": None}, "null"),
+    ({"audio": "a.wav", "no_align": "yes"}, "true/false"),
+    ({"audio": "a.wav", "concurrency": "fast"}, "no está entre"),
+])
+def test_bad_body(parser, body, match):
+    with pytest.raises(ValueError, match=match):
+        _job_args(parser, body)
+
+
+# ----------------------------------------------------------------------
+# Handler con un pipeline de prueba
+# ----------------------------------------------------------------------
+@pytest.fixture
+def post(parser, monkeypatch):
+    threads = []
+
+    def fake_pipeline(output_jsonl, stream_output, audio_file, **_):
+        if audio_file == "falla.wav":
+            raise RuntimeError("audio ilegible")
+        lines = [json.dumps({"start": i, "text": f"s{i}"}) + "\n" for i in range(3)]
+        if not stream_output:
+            Path(output_jsonl).write_text("".join(lines))
+            return output_jsonl
+        part = Path(output_jsonl + ".part")
+        with part.open("w") as f:
+            for line in lines:
+                f.write(line[:5])
+                f.flush()
+                time.sleep(0.05)                    # líneas a medias entre sondeos
+                f.write(line[5:])
+                f.flush()
+        if audio_file == "corte.wav":
+            raise RuntimeError("fallo a mitad")
+        part.rename(output_jsonl)
+        return output_jsonl
+
+    monkeypatch.setattr(server, "run_pipeline", fake_pipeline)
+    monkeypatch.setattr(server, "TAIL_INTERVAL_S", 0.01)
+    handler = server.make_handler(parser, lambda a: a, lambda a: dict(
+        output_jsonl=a.output, stream_output=a.stream_output, audio_file=a.audio),
+        set_threads=threads.append)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    def send(body: dict):
+        req = urllib.request.Request(f"http://127.0.0.1:{httpd.server_port}/jobs",
+                                     data=json.dumps(body).encode(), method="POST")
+        try:
+            with urllib.request.urlopen(req) as r:
+                return r.status, [json.loads(line) for line in r.read().splitlines()]
+        except urllib.error.HTTPError as err:
+            return err.code, json.loads(err.read())
+
+    send.threads = threads
+    yield send
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_job_response(post, stream):
+    status, lines = post({"audio": "a.wav", "stream_output": stream, "threads": 2})
+    assert status == 200 and [rec["text"] for rec in lines] == ["s0", "s1", "s2"]
+    assert post.threads == [2]
+
+
+def test_job_failure_before_output(post):
+    for stream in (False, True):
+        status, payload = post({"audio": "falla.wav", "stream_output": stream})
+        assert status == 500 and "ilegible" in payload["error"]
+
+
+def test_stream_failure_after_output(post):
+    status, lines = post({"audio": "corte.wav", "stream_output": True})
+    assert status == 200 and [rec.get("text") for rec in lines[:3]] == ["s0", "s1", "s2"]
+    assert "fallo a mitad" in lines[-1]["error"]
+
+
+def test_bad_request(post):
+    assert post(["a.wav"]) == (400, {"error": "el cuerpo debe ser un objeto JSON"})
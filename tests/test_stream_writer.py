@@ -0,0 +1,89 @@
+# tests/test_stream_writer.py
+"""Salida incremental (formatting/formatter.py): .part, cierre atómico y reanudación tras un corte."""
+import json
+
+import pytest
+
+from src.formatting.formatter import JsonlStreamWriter
+
+
+def _seg(i: int, text: str = "hola") -> dict:
+    return {"start": float(i), "end": i + 0.75, "text": text, "speaker": "SPEAKER_00"}
+
+
+def _lines(path) -> list:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_write_and_close(tmp_path):
+    out = tmp_path / "a.jsonl"
+    w = JsonlStreamWriter(str(out))
+    w.write([_seg(0), _seg(1)])
+    part = tmp_path / "a.jsonl.part"
+    assert _lines(part) == [_seg(0), _seg(1)] and not out.exists()    # volcado en cada write()
+    w.write([_seg(2)])
+    assert w.close() == str(out) and not part.exists()
+    assert _lines(out) == [_seg(0), _seg(1), _seg(2)] and w.count == 3
+
+
+def test_abort_keeps_part(tmp_path):
+    w = JsonlStreamWriter(str(tmp_path / "a.jsonl"))
+    w.write([_seg(0)])
+    w.abort()
+    w.abort()                                                          # idempotente
+    assert _lines(tmp_path / "a.jsonl.part") == [_seg(0)]
+    assert not (tmp_path / "a.jsonl").exists()
+
+
+def _interrupted(tmp_path, tail: bytes):
+    w = JsonlStreamWriter(str(tmp_path / "a.jsonl"))
+    w.write([_seg(0), _seg(1, "ñandú")])
+    w.abort()
+    part = tmp_path / "a.jsonl.part"
+    with part.open("ab") as f:
+        f.write(tail)
+    return part
+
+
+@pytest.mark.parametrize("tail", [
+    b"",                                                               # corte entre líneas
+    b'{"start": 2.0, "end": 2.7',                                      # línea a medias
+    '{"start": 2.0, "end": 2.75, "text": "ca'.encode() + "ñ".encode()[:1],  # a mitad de un carácter
+])
+def test_resume_truncates_partial_line(tmp_path, tail):
+    part = _interrupted(tmp_path, tail)
+    w = JsonlStreamWriter(str(tmp_path / "a.jsonl"), resume=True)
+    assert w.count == 2 and w.resume_from == 1.75
+    assert _lines(part) == [_seg(0), _seg(1, "ñandú")]                 # resto descartado en disco
+    w.write([_seg(2)])
+    w.close()
+    assert _lines(tmp_path / "a.jsonl") == [_seg(0), _seg(1, "ñandú"), _seg(2)]
+
+
+def test_resume_complete_line_without_newline(tmp_path):
+    part = _interrupted(tmp_path, json.dumps(_seg(2)).encode())
+    w = JsonlStreamWriter(str(tmp_path / "a.jsonl"), resume=True)
+    assert w.count == 3 and w.resume_from == 2.75
+    w.write([_seg(3)])
+    w.close()
+    assert [s["start"] for s in _lines(tmp_path / "a.jsonl")] == [0.0, 1.0, 2.0, 3.0]
+    assert not part.exists()
+
+
+def test_resume_drops_lines_after_corruption(tmp_path):
+    _interrupted(tmp_path, b"{roto\n" + json.dumps(_seg(5)).encode() + b"\n")
+    w = JsonlStreamWriter(str(tmp_path / "a.jsonl"), resume=True)
+    assert w.count == 2 and w.resume_from == 1.75
+    w.abort()
+
+
+def test_resume_without_part_starts_fresh(tmp_path):
+    w = JsonlStreamWriter(str(tmp_path / "a.jsonl"), resume=True)
+    assert w.count == 0 and w.resume_from == 0.0
+    w.close()
+    assert (tmp_path / "a.jsonl").read_bytes() == b""
+
+
+def test_resume_rejects_compression(tmp_path):
+    with pytest.raises(ValueError, match="comprimida"):
+        JsonlStreamWriter(str(tmp_path / "a.jsonl"), resume=True, compress="gzip")
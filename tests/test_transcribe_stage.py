@@ -0,0 +1,73 @@
+# tests/test_transcribe_stage.py
+"""Etapa de transcripción (pipelines/full_pipeline.py): progreso por lote y reanudación tras OOM."""
+import math
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("whisperx")
+
+from src.pipelines import full_pipeline  # noqa: E402
+from src.pipelines.full_pipeline import transcribe_stage  # noqa: E402
+from src.utils.events import AUDIO, BATCH_DONE, EventBus  # noqa: E402
+
+
+class _FakeTranscriber:
+    """Un segmento por región; con `oom_after`, la primera llamada falla en esa región."""
+
+    model_name, compute_type, device, language, pool = "tiny", "int8", "cpu", "es", object()
+
+    def __init__(self, n_chunks: int, oom_after: int = -1):
+        self.chunks = [{"start": 2.0 * i, "end": 2.0 * i + 1.5} for i in range(n_chunks)]
+        self.oom_after = oom_after
+        self.calls = []
+
+    def vad_chunks(self, audio, regions=None):
+        return self.chunks
+
+    def transcribe_chunks(self, audio, chunks, batch_size, on_batch_end=lambda: None):
+        self.calls.append(batch_size)
+        for i, c in enumerate(chunks):
+            if len(self.calls) == 1 and i == self.oom_after:
+                raise RuntimeError("CUDA out of memory. Tried to allocate 2.00 GiB")
+            yield {"text": f" {c['start']:g}", "start": c["start"], "end": c["end"]}
+            if (i + 1) % batch_size == 0 or i + 1 == len(chunks):
+                on_batch_end()
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    bus, seen = EventBus(), []
+    monkeypatch.setattr(full_pipeline, "events", bus)
+    monkeypatch.setattr(full_pipeline.planner, "record", lambda *a: None)
+    monkeypatch.setattr(full_pipeline.planner, "record_oom", lambda *a: None)
+    with bus.subscribed(seen.append):
+        yield seen
+
+
+def _run(t: _FakeTranscriber, seen: list, asr_batch: int):
+    result = transcribe_stage(t, np.zeros(16000, np.float32), asr_batch, regions=np.zeros((0, 2)))
+    ticks = sum(e.data["n"] for e in seen if e.kind == BATCH_DONE and e.stage == "transcribe")
+    audio = sum(e.data["seconds"] for e in seen if e.kind == AUDIO and e.stage == "transcribe")
+    return result, ticks, audio
+
+
+@pytest.mark.parametrize("n_chunks", [8, 10])
+def test_one_tick_per_batch(bus, n_chunks):
+    t = _FakeTranscriber(n_chunks)
+    result, ticks, audio = _run(t, bus, asr_batch=4)
+    assert len(result["segments"]) == n_chunks
+    assert ticks == math.ceil(n_chunks / 4)
+    assert audio == pytest.approx(1.5 * n_chunks)
+
+
+def test_ticks_follow_batches_after_oom(bus):
+    # 10 regiones, lote 4: el 2.º lote falla tras 1 segmento; se sigue con lote 2
+    # desde el 6.º → lotes [4], [2, 2, 1]: 4 ticks (con el módulo global eran 5)
+    t = _FakeTranscriber(10, oom_after=5)
+    result, ticks, audio = _run(t, bus, asr_batch=4)
+    assert t.calls == [4, 2]
+    assert [s["text"] for s in result["segments"]] == [f" {2.0 * i:g}" for i in range(10)]
+    assert ticks == 4
+    assert audio == pytest.approx(15.0)                      # cada región cuenta una sola vez
@@ -0,0 +1,105 @@
+# tests/test_transcript.py
+"""Transcripción columnar (formatting/transcript.py): ida y vuelta, checkpoints y hablantes."""
+import copy
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.formatting.speaker_assign import SpeakerIndex, assign_word_speakers
+from src.formatting.transcript import Transcript
+
+
+def _aligned(chars: bool = False) -> dict:
+    """Salida de whisperx.align: orden de claves de WhisperX, palabras sin tiempos y acentos."""
+    segments = [
+        {"start": 0.5, "end": 2.25, "text": " Hola, señor.",
+         "words": [{"word": "Hola,", "start": 0.5, "end": 1.0, "score": 0.9},
+                   {"word": "señor.", "start": 1.25, "end": 2.25, "score": 0.75}]},
+        {"start": 3.0, "end": 4.5, "text": " Son 1,5 €",
+         "words": [{"word": "Son", "start": 3.0, "end": 3.5, "score": 0.5},
+                   {"word": "1,5"}, {"word": "€"}],
+         "avg_logprob": -0.25},
+        {"start": 5.0, "end": 5.0, "text": "", "words": []},
+    ]
+    if chars:
+        for seg in segments:
+            seg["chars"] = [{"char": ch, "start": seg["start"], "end": seg["end"], "score": 0.5}
+                            if ch != " " else {"char": ch} for ch in seg["text"]]
+            if "avg_logprob" in seg:
+                seg["avg_logprob"] = seg.pop("avg_logprob")     # al final, tras "chars"
+    return {"segments": segments, "language": "es"}
+
+
+def _dump(segments) -> list:
+    return [json.dumps(s, ensure_ascii=False) for s in segments]   # orden de claves incluido
+
+
+@pytest.mark.parametrize("chars", [False, True])
+def test_from_result_round_trip(chars):
+    result = _aligned(chars)
+    tr = Transcript.from_result(copy.deepcopy(result))
+    assert len(tr) == 3 and tr.n_words == 5 and tr.has_chars == chars
+    assert _dump(tr.iter_segments()) == _dump(result["segments"])
+    assert tr.to_result()["language"] == "es"
+
+
+def test_unaligned_round_trip():
+    result = {"segments": [{"text": " hola", "start": 0.0, "end": 1.5},
+                           {"text": " adiós", "start": 1.5, "end": 3.0, "avg_logprob": -0.5}],
+              "language": "es"}
+    tr = Transcript.from_result(copy.deepcopy(result))
+    assert not tr.aligned
+    assert _dump(tr.iter_segments()) == _dump(result["segments"])
+
+
+def test_extend_in_batches_matches_single_pass():
+    segs = _aligned(chars=True)["segments"]
+    tr = Transcript(language="es", aligned=True, has_chars=True)
+    for seg in segs:                                        # un lote por segmento (salida incremental)
+        tr.extend([copy.deepcopy(seg)])
+    assert _dump(tr.iter_segments()) == _dump(segs)
+
+
+@pytest.mark.parametrize("chars", [False, True])
+def test_checkpoint_json_round_trip(chars):
+    tr = Transcript.from_result(_aligned(chars))
+    obj = json.loads(json.dumps(tr.to_json(), allow_nan=False))    # JSON estándar: NaN → null
+    back = Transcript.from_json(obj)
+    assert _dump(back.iter_segments()) == _dump(tr.iter_segments())
+    assert (back.language, back.aligned, back.has_chars) == ("es", True, chars)
+
+
+def test_from_json_accepts_whisperx_result():
+    back = Transcript.from_json(_aligned())                  # checkpoints previos al formato columnar
+    assert _dump(back.iter_segments()) == _dump(_aligned()["segments"])
+
+
+def test_assign_speakers_matches_dicts():
+    df = pd.DataFrame({"start": [0.0, 1.1, 2.9], "end": [1.1, 2.9, 6.0],
+                       "speaker": ["SPEAKER_01", "SPEAKER_00", "SPEAKER_01"]})
+    index = SpeakerIndex(df)
+    expected = assign_word_speakers(df, _aligned(), index=index)["segments"]
+    tr = Transcript.from_result(_aligned()).assign_speakers(index)
+    assert _dump(tr.iter_segments()) == _dump(expected)
+    assert [w.get("speaker") for w in expected[1]["words"]] == ["SPEAKER_01", None, None]
+
+    # Tras asignar, el transcript sigue admitiendo lotes nuevos
+    tr.extend([{"start": 7.0, "end": 8.0, "text": " fin", "words": [{"word": "fin", "start": 7.0, "end": 8.0}]}])
+    assert len(tr) == 4
+
+
+def test_round_times_and_columns():
+    tr = Transcript.from_result(_aligned()).round_times(0)
+    segs = list(tr.iter_segments())
+    assert [s["start"] for s in segs] == [0.0, 3.0, 5.0] and segs[0]["words"][1]["start"] == 1.0
+    assert "start" not in segs[1]["words"][1]               # NaN sigue siendo «ausente»
+
+    seg_cols, word_cols = tr.segment_columns(), tr.word_columns()
+    assert seg_cols["n_words"].tolist() == [2, 3, 0]
+    assert word_cols["segment"].tolist() == [0, 0, 1, 1, 1]
+    assert word_cols["word"] == ["Hola,", "señor.", "Son", "1,5", "€"]
+    assert np.isnan(word_cols["start"][3]) and word_cols["speaker"].tolist() == [-1] * 5
+    tr.extend(_aligned()["segments"][:1])                    # las vistas de round_times ya se liberaron
+    assert tr.n_words == 7
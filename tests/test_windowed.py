@@ -0,0 +1,166 @@
+# tests/test_windowed.py
+"""Diarización por ventanas (diarization/windowed.py): rejilla, hilos y clustering global."""
+import threading
+import time
+import types
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("pyannote.audio")
+
+from src.diarization import windowed  # noqa: E402
+from src.diarization.windowed import WindowedDiarization, window_bounds  # noqa: E402
+
+from conftest import MODELS, PYANNOTE_CHECKPOINTS  # noqa: E402
+
+SR, DURATION, STEP = 100, 10.0, 1.0          # rejilla pequeña: 1000 muestras por chunk, paso 100
+
+
+@pytest.mark.parametrize("num_samples", [500, 1000, 1050, 9999, 10000, 12345])
+@pytest.mark.parametrize("per_window", [1, 7, 20])
+def test_window_bounds_follow_chunk_grid(num_samples, per_window):
+    window, step = int(DURATION * SR), int(STEP * SR)
+    bounds = window_bounds(num_samples, window, step, per_window)
+    assert bounds[0][0] == 0 and bounds[-1][1] == num_samples
+    for (a0, a1), (b0, _) in zip(bounds, bounds[1:]):
+        assert b0 - a0 == per_window * step          # inicios sobre la rejilla de chunks
+        assert a1 - b0 == window - step              # solape de duration − step
+
+
+# --- hilos: cada worker con sus propios objetos de inferencia ----------------
+
+class _Inference:
+    """Falla si dos hilos la usan a la vez (como un modelo no reentrante)."""
+
+    def __init__(self, reentrant: bool = False):
+        self.reentrant = reentrant
+        self.busy = False
+        self.threads: set = set()
+        self.duration, self.step = DURATION, STEP
+        self.model = types.SimpleNamespace(
+            audio=types.SimpleNamespace(get_num_samples=lambda d: int(d * SR)),
+            specifications=types.SimpleNamespace(powerset=True),
+        )
+
+    def __call__(self, waveform: np.ndarray) -> np.ndarray:
+        assert self.reentrant or not self.busy, "objeto de inferencia usado por dos hilos a la vez"
+        self.busy = True
+        self.threads.add(threading.current_thread().name)
+        try:
+            time.sleep(0.005)
+            n = max(1, (waveform.shape[-1] - int(DURATION * SR)) // int(STEP * SR) + 1)
+            starts = waveform[0, ::int(STEP * SR)][:n]
+            return np.repeat(starts[:, None, None], 3, axis=2).repeat(4, axis=1)
+        finally:
+            self.busy = False
+
+
+class _FakePipeline:
+    klustering = "AgglomerativeClustering"
+    embedding_exclude_overlap = False
+
+    def __init__(self, reentrant: bool = False):
+        self._segmentation = _Inference(reentrant)
+        self._embedding = _Inference(reentrant)
+
+    def set_num_speakers(self, num_speakers=None, min_speakers=None, max_speakers=None):
+        return None, 1, 2
+
+    def get_segmentations(self, file):
+        return types.SimpleNamespace(data=self._segmentation(file["waveform"].numpy()))
+
+    def get_embeddings(self, file, binary_segmentations, exclude_overlap=False):
+        return self._embedding(file["waveform"].numpy())[:, :, :2] * 2
+
+
+def _run(monkeypatch, pipeline, workers: int, copy_models: bool = True):
+    captured = {}
+
+    def fake_global(self, file, segmentations, binarized, embeddings, *counts):
+        captured.update(seg=segmentations.data, emb=embeddings)
+        return "diarización", None
+
+    monkeypatch.setattr(WindowedDiarization, "_global", fake_global)
+    waveform = torch.arange(12000, dtype=torch.float32).unsqueeze(0)
+    out = WindowedDiarization(pipeline, workers, window_s=20.0, copy_models=copy_models)(waveform, SR)
+    assert out == "diarización"
+    return captured
+
+
+def test_workers_get_their_own_models(monkeypatch):
+    base = _FakePipeline()
+    created = []
+    view = windowed._WorkerView
+
+    def tracking_view(p):
+        created.append(view(p))
+        return created[-1]
+
+    monkeypatch.setattr(windowed, "_WorkerView", tracking_view)
+    single = _run(monkeypatch, _FakePipeline(), workers=1)
+    many = _run(monkeypatch, base, workers=4)
+
+    np.testing.assert_array_equal(many["seg"], single["seg"])      # mismo orden y contenido
+    np.testing.assert_array_equal(many["emb"], single["emb"])
+    assert len(created) == 3                                        # el original + 3 copias = workers
+    models = [base._segmentation] + [v._segmentation for v in created]
+    assert len({id(m) for m in models}) == len(models)
+    assert all(v._base is base for v in created)
+
+
+def test_shared_pipeline_without_copies(monkeypatch):
+    # copy_models=False (sesiones ONNX, reentrantes): todos los hilos usan el original
+    monkeypatch.setattr(windowed, "_WorkerView", lambda p: pytest.fail("no debería copiar"))
+    pipeline = _FakePipeline(reentrant=True)
+    shared = _run(monkeypatch, pipeline, workers=4, copy_models=False)
+    single = _run(monkeypatch, _FakePipeline(), workers=1)
+    np.testing.assert_array_equal(shared["seg"], single["seg"])
+    assert len(pipeline._segmentation.threads) > 1
+
+
+# --- clustering global sobre embeddings sintéticos ---------------------------
+
+def test_global_clustering_on_synthetic_embeddings():
+    missing = [p.name for p in PYANNOTE_CHECKPOINTS if not p.exists()]
+    if missing:
+        pytest.skip(f"faltan checkpoints de pyannote: {', '.join(missing)}")
+    from pyannote.core import SlidingWindow, SlidingWindowFeature
+
+    from src.diarization.pipeline_loader import load_local_pipeline
+
+    p = load_local_pipeline(models_root=str(MODELS / "pyannote"), use_cuda=False)
+    sr = 16000
+    probe = p.get_segmentations({"waveform": torch.zeros(1, 10 * sr), "sample_rate": sr})
+    _, frames, local = probe.data.shape
+    duration, step = p._segmentation.duration, p._segmentation.step
+
+    # 60 s: hablante X hasta 30 s, Y después; en cada chunk, X es el local 0 e Y el 1
+    total, change = 60.0, 30.0
+    n_chunks = int((total - duration) / step) + 1
+    t = np.arange(n_chunks)[:, None] * step + (np.arange(frames)[None, :] + 0.5) * duration / frames
+    seg = np.zeros((n_chunks, frames, local), dtype=np.float32)
+    seg[:, :, 0] = t < change
+    seg[:, :, 1] = t >= change
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((2, 256))
+    emb = np.stack([centers[0] + 0.05 * rng.standard_normal((n_chunks, 256)),
+                    centers[1] + 0.05 * rng.standard_normal((n_chunks, 256)),
+                    rng.standard_normal((n_chunks, 256))], axis=1)
+    sw = SlidingWindow(start=0.0, duration=duration, step=step)
+    seg_f = SlidingWindowFeature(seg, sw)
+
+    wd = WindowedDiarization(p, workers=1)
+    num, lo, hi = p.set_num_speakers(num_speakers=None, min_speakers=None, max_speakers=None)
+    file = {"waveform": torch.zeros(1, int(total * sr)), "sample_rate": sr, "uri": "sintético"}
+    diarization, centroids = wd._global(file, seg_f, seg_f, emb, num, lo, hi)
+
+    labels = diarization.labels()
+    assert len(labels) == 2 and centroids.shape == (2, 256)
+    first = {lab: min(s.start for s, _, l in diarization.itertracks(yield_label=True) if l == lab) for lab in labels}
+    x, y = sorted(labels, key=first.get)
+    for (segment, _, label) in diarization.itertracks(yield_label=True):
+        assert label == (x if segment.middle < change else y)
+    cos = centroids @ centers.T / np.linalg.norm(centroids, axis=1)[:, None] / np.linalg.norm(centers, axis=1)
+    assert cos[labels.index(x), 0] > 0.9 and cos[labels.index(y), 1] > 0.9